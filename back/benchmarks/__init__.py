@@ -0,0 +1,5 @@
+"""
+Performance benchmarks. Run from the back/ directory, e.g.
+
+    python -m benchmarks.async_views
+"""
@@ -0,0 +1,101 @@
+"""
+Compare the synchronous DRF read endpoints with their async variants under
+concurrent load, driving the ASGI application in-process.
+
+    python -m benchmarks.async_views [--properties 200] [--requests 400] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import random
+from datetime import timedelta
+
+from . import common
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from core.asgi import application  # noqa: E402
+from listings.models import Amenity, Municipality, Property, PropertyImage  # noqa: E402
+from tours.models import Tour  # noqa: E402
+
+
+ENDPOINTS = (
+    ('property list', '/api/properties/', '/api/async/properties/'),
+    ('property detail', '/api/properties/{pk}/', '/api/async/properties/{pk}/'),
+    ('municipalities', '/api/municipalities/', '/api/async/municipalities/'),
+    ('property tours', '/api/properties/{pk}/tours/', '/api/async/properties/{pk}/tours/'),
+)
+
+
+def seed(property_count, rng):
+    owner = User.objects.create_user('bench-owner', password='bench-password')
+    agent = User.objects.create_user('bench-agent', password='bench-password')
+    municipalities = Municipality.objects.bulk_create(
+        Municipality(municipality_name=f'Municipality {i}', price_per_sqm=rng.randint(20000, 200000))
+        for i in range(20)
+    )
+    properties = Property.objects.bulk_create(
+        Property(
+            property_name=f'Property {i}',
+            property_address=f'{i} Benchmark St.',
+            property_municipality=rng.choice(municipalities),
+            owner=owner,
+            agent=agent,
+            property_size=rng.randint(30, 500),
+            num_bedrooms=rng.randint(0, 6),
+            num_bathrooms=rng.randint(0, 4),
+            price=rng.randint(1, 200) * 100000,
+            type=rng.choice(['SALE', 'RENT', 'LEASE']),
+            is_available_for_tour=True,
+        )
+        for i in range(property_count)
+    )
+    Amenity.objects.bulk_create(
+        Amenity(property=property_obj, name=f'Amenity {j}', price=rng.randint(0, 100000))
+        for property_obj in properties for j in range(3)
+    )
+    PropertyImage.objects.bulk_create(
+        PropertyImage(property=property_obj, image=f'propertyimg/property_{property_obj.pk}/{j}.jpg')
+        for property_obj in properties for j in range(2)
+    )
+    start = timezone.now() + timedelta(days=1)
+    Tour.objects.bulk_create(
+        Tour(property=property_obj, agent=agent, buyer=owner,
+             start_time=start + timedelta(hours=2 * j), end_time=start + timedelta(hours=2 * j + 1))
+        for property_obj in properties for j in range(2)
+    )
+    return owner, [property_obj.pk for property_obj in properties]
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    with common.test_database():
+        user, property_ids = seed(args.properties, rng)
+        headers = [(b'authorization', f'Bearer {AccessToken.for_user(user)}'.encode())]
+
+        print(f"{args.requests} requests per endpoint, {args.concurrency} concurrent, "
+              f"{args.properties} properties\n")
+        print(f"{'endpoint':<18}{'variant':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for label, sync_path, async_path in ENDPOINTS:
+            for variant, template in (('sync', sync_path), ('async', async_path)):
+                paths = [template.format(pk=rng.choice(property_ids)) for _ in range(args.requests)]
+                latencies, elapsed, errors = asyncio.run(
+                    common.drive(application, paths, args.concurrency, headers)
+                )
+                stats = common.summarize(latencies, elapsed)
+                print(f"{label:<18}{variant:<8}{stats['throughput']:>10.1f}"
+                      f"{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}{errors:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--properties', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Shared setup for the benchmark scripts."""
+import asyncio
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+
+@contextmanager
+def test_database():
+    """Run the block against a freshly migrated throwaway database."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and latency percentiles (milliseconds) for a run."""
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def asgi_get(application, path, headers=()):
+    """Send one GET through an ASGI application; returns (status, body)."""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+    request_sent = False
+    response = {'status': None, 'body': []}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['body'].append(message.get('body', b''))
+
+    await application(scope, receive, send)
+    return response['status'], b''.join(response['body'])
+
+
+async def drive(application, paths, concurrency, headers=()):
+    """
+    Issue every path in ``paths`` with at most ``concurrency`` requests in
+    flight; returns (latencies, elapsed seconds, error count).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(path):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            status, _body = await asgi_get(application, path, headers)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(path) for path in paths))
+    return latencies, time.perf_counter() - started, errors
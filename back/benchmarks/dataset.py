@@ -0,0 +1,328 @@
+"""
+Deterministic synthetic dataset for benchmarks.
+
+The same seed and size always produce the same rows (apart from
+created_at/updated_at, which are the load time). The large tables are
+written with executemany over precomputed column values, one transaction
+per batch, skipping per-object ORM overhead, so large volumes load in
+minutes:
+
+    SQLITE_PATH=/tmp/bench.sqlite3 python -m benchmarks.dataset --preset large
+
+The target database is migrated first. Loading into a non-empty database
+adds to what is there.
+"""
+import argparse
+import math
+import random
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from . import common
+
+from django.contrib.auth.models import Group, User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.db.models import Max  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from deals.models import Commission, Sale  # noqa: E402
+from listings import counters, geo  # noqa: E402
+from listings.models import Amenity, Municipality, Property, PropertyImage  # noqa: E402
+from tours.models import Tour  # noqa: E402
+
+
+# Fixed reference point, so generated dates do not depend on when the data is loaded
+ANCHOR = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+GROUPS = ('Admin', 'Agent', 'Owner', 'Buyer')
+LISTING_TYPES = ('SALE', 'SALE', 'SALE', 'RENT', 'LEASE', 'FORECLOSURE')
+AMENITY_NAMES = ('Pool', 'Gym', 'Garage', 'Garden', 'Balcony', 'Security', 'Elevator', 'Solar panels',
+                 'Generator', 'Roof deck', 'Clubhouse', 'Playground')
+TOUR_SLOT = timedelta(hours=3)
+TOUR_LENGTH = timedelta(hours=1)
+
+# Rough bounding box of the Philippines
+MIN_LAT, MAX_LAT = 5.0, 19.0
+MIN_LNG, MAX_LNG = 117.0, 127.0
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    municipalities: int = 50
+    users: int = 500
+    properties: int = 2000
+    amenities: int = 10000
+    images: int = 4000
+    tours: int = 1000
+    sales: int = 400
+
+
+PRESETS = {
+    'tiny': DatasetSize(municipalities=10, users=50, properties=200, amenities=1000, images=400, tours=100,
+                        sales=40),
+    'small': DatasetSize(),
+    'medium': DatasetSize(municipalities=400, users=10000, properties=100_000, amenities=500_000,
+                          images=200_000, tours=50_000, sales=20_000),
+    'large': DatasetSize(municipalities=1600, users=50000, properties=1_000_000, amenities=5_000_000,
+                         images=2_000_000, tours=500_000, sales=200_000),
+}
+
+
+def _spread(total, slots, rng):
+    """Split ``total`` items over ``slots`` buckets, at random but summing exactly."""
+    counts = [total // slots] * slots
+    for index in rng.sample(range(slots), total % slots):
+        counts[index] += 1
+    return counts
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+class DatasetGenerator:
+
+    def __init__(self, size, seed=1, batch_size=10000, log=print):
+        self.size = size
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log
+        self.created = {}
+        self.now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    def _count(self, label, amount):
+        self.created[label] = self.created.get(label, 0) + amount
+
+    def _insert(self, model, field_names, rows):
+        """INSERT ``rows`` (tuples of database-ready values for ``field_names``) into the model's table."""
+        if not rows:
+            return
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(model._meta.get_field(name).column) for name in field_names)
+        placeholders = ', '.join(['%s'] * len(field_names))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})', rows
+            )
+
+    def generate(self):
+        started = time.perf_counter()
+        if connection.vendor == 'sqlite':
+            # Bulk load: durability is irrelevant until the load completes
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous=OFF')
+                cursor.execute('PRAGMA temp_store=MEMORY')
+        self._users()
+        self._municipalities()
+        self._properties()
+        self._tours()
+        self._sales()
+        # Rows were inserted around the ORM, so no signal kept the card fields current
+        counters.repair_all(self.batch_size)
+        self.log(f"Generated {', '.join(f'{count} {label}' for label, count in self.created.items())} "
+                 f"in {time.perf_counter() - started:.1f}s")
+        return self.created
+
+    def _users(self):
+        groups = {name: Group.objects.get_or_create(name=name)[0] for name in GROUPS}
+        first_id = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        users = User.objects.bulk_create(
+            (User(username=f'bench-user-{first_id + index}', password='!', email=f'user{first_id + index}@example.com')
+             for index in range(self.size.users)),
+            batch_size=self.batch_size,
+        )
+        # 5% admins, 20% agents, 35% owners, 40% buyers
+        memberships = []
+        self.agents, self.owners, self.buyers = [], [], []
+        for index, user in enumerate(users):
+            share = index % 20
+            if share == 0:
+                role = 'Admin'
+            elif share <= 4:
+                role = 'Agent'
+                self.agents.append(user.pk)
+            elif share <= 11:
+                role = 'Owner'
+                self.owners.append(user.pk)
+            else:
+                role = 'Buyer'
+                self.buyers.append(user.pk)
+            memberships.append(User.groups.through(user_id=user.pk, group_id=groups[role].pk))
+        User.groups.through.objects.bulk_create(memberships, batch_size=self.batch_size)
+        self._count('users', len(users))
+
+    def _municipalities(self):
+        rng = self.rng
+        municipalities = Municipality.objects.bulk_create(
+            Municipality(municipality_name=f'Municipality {index + 1}', price_per_sqm=rng.randrange(20000, 250000, 500))
+            for index in range(self.size.municipalities)
+        )
+        self.municipalities = [
+            (municipality.pk, municipality.price_per_sqm,
+             rng.uniform(MIN_LAT + 0.5, MAX_LAT - 0.5), rng.uniform(MIN_LNG + 0.5, MAX_LNG - 0.5))
+            for municipality in municipalities
+        ]
+        self._count('municipalities', len(municipalities))
+
+    def _properties(self):
+        rng = self.rng
+        size = self.size
+        now = self.now
+        sold = set(rng.sample(range(size.properties), min(size.sales, size.properties)))
+        amenity_counts = _spread(size.amenities, size.properties, rng)
+        image_counts = _spread(size.images, size.properties, rng)
+        property_id, amenity_id, image_id = _next_id(Property), _next_id(Amenity), _next_id(PropertyImage)
+        self.property_rows = []     # (pk, agent_id, owner_id, price, sold)
+
+        for start in range(0, size.properties, self.batch_size):
+            properties, amenities, images = [], [], []
+            for index in range(start, min(start + self.batch_size, size.properties)):
+                municipality_id, price_per_sqm, center_lat, center_lng = rng.choice(self.municipalities)
+                latitude = round(center_lat + rng.gauss(0, 0.05), 6)
+                longitude = round(center_lng + rng.gauss(0, 0.05), 6)
+                property_size = int(rng.lognormvariate(math.log(120), 0.6)) + 20
+                owner_id = rng.choice(self.owners) if self.owners else None
+                agent_id = rng.choice(self.agents) if self.agents else None
+                amenity_total = 0
+                for _ in range(amenity_counts[index]):
+                    amenity_type = 'Luxury' if rng.random() < 0.3 else 'Basic'
+                    # Stored capped, as Amenity.save() and the property serializer store it
+                    price = Amenity.capped_price(amenity_type, rng.randrange(0, 400000, 1000))
+                    amenity_total += price
+                    amenities.append((amenity_id, property_id, rng.choice(AMENITY_NAMES), amenity_type, price,
+                                      owner_id, now, now))
+                    amenity_id += 1
+                for position in range(image_counts[index]):
+                    images.append((image_id, property_id, f'propertyimg/property_{property_id}/{position}.jpg',
+                                   f'Property {index + 1}', position == 0, now, now))
+                    image_id += 1
+                price = property_size * price_per_sqm + amenity_total
+                status = 'SOLD' if index in sold else ('UNDER_REVIEW' if rng.random() < 0.1 else 'ACTIVE')
+                properties.append((
+                    property_id, f'Property {index + 1}', f'Synthetic listing {index + 1}',
+                    f'{rng.randint(1, 9999)} {rng.choice(AMENITY_NAMES)} St.', latitude, longitude,
+                    geo.encode(latitude, longitude), municipality_id, owner_id, agent_id, property_size,
+                    rng.randint(0, 6), rng.randint(1, 4), price, rng.choice(LISTING_TYPES),
+                    rng.random() < 0.7, status, now, now, 0, 0, 0,
+                ))
+                self.property_rows.append((property_id, agent_id, owner_id, price, status == 'SOLD'))
+                property_id += 1
+
+            with transaction.atomic():
+                self._insert(Property, (
+                    'id', 'property_name', 'property_description', 'property_address', 'latitude', 'longitude',
+                    'geo_cell', 'property_municipality', 'owner', 'agent', 'property_size', 'num_bedrooms',
+                    'num_bathrooms', 'price', 'type', 'is_available_for_tour', 'status', 'created_at',
+                    'updated_at', 'image_count', 'amenity_count', 'upcoming_tour_count',
+                ), properties)
+                self._insert(Amenity, ('id', 'property', 'name', 'amenity_type', 'price', 'added_by',
+                                       'created_at', 'updated_at'), amenities)
+                self._insert(PropertyImage, ('id', 'property', 'image', 'alt_text', 'is_primary', 'created_at',
+                                             'updated_at'), images)
+            self._count('properties', len(properties))
+            self._count('amenities', len(amenities))
+            self._count('images', len(images))
+
+    def _tours(self):
+        """
+        Tours are spread over a year around ANCHOR and never overlap for a
+        property or an agent: each starts no earlier than the next slot free
+        for both.
+        """
+        rng = self.rng
+        tourable = [row for row in self.property_rows if not row[4]]
+        if not tourable or not self.size.tours:
+            return
+        next_slot = {}
+        last_slot = int(timedelta(days=182) / TOUR_SLOT)
+        adapt = connection.ops.adapt_datetimefield_value
+        tour_id = _next_id(Tour)
+        batch = []
+        for _ in range(self.size.tours):
+            property_id, agent_id, _owner_id, _price, _sold = rng.choice(tourable)
+            slot = max(rng.randint(-last_slot, last_slot),
+                       next_slot.get(('property', property_id), -last_slot),
+                       next_slot.get(('agent', agent_id), -last_slot))
+            next_slot[('property', property_id)] = next_slot[('agent', agent_id)] = slot + 1
+            start_time = ANCHOR + slot * TOUR_SLOT
+            if start_time + TOUR_LENGTH <= ANCHOR:
+                # Nothing marks tours completed automatically, so many past tours are still Scheduled
+                roll = rng.random()
+                status = 'Cancelled' if roll < 0.1 else ('Completed' if roll < 0.6 else 'Scheduled')
+            else:
+                status = 'Cancelled' if rng.random() < 0.05 else 'Scheduled'
+            batch.append((tour_id, property_id, agent_id, rng.choice(self.buyers) if self.buyers else None,
+                          adapt(start_time), adapt(start_time + TOUR_LENGTH), status, self.now, self.now))
+            tour_id += 1
+            if len(batch) >= self.batch_size:
+                self._write_tours(batch)
+                batch = []
+        self._write_tours(batch)
+
+    def _write_tours(self, tours):
+        with transaction.atomic():
+            self._insert(Tour, ('id', 'property', 'agent', 'buyer', 'start_time', 'end_time', 'status',
+                                'created_at', 'updated_at'), tours)
+        self._count('tours', len(tours))
+
+    def _sales(self):
+        rng = self.rng
+        sold = [row for row in self.property_rows if row[4]]
+        sale_id, commission_id = _next_id(Sale), _next_id(Commission)
+        today = connection.ops.adapt_datefield_value(ANCHOR.date())
+        for start in range(0, len(sold), self.batch_size):
+            sales, commissions = [], []
+            for property_id, agent_id, _owner_id, price, _sold in sold[start:start + self.batch_size]:
+                final_price = Decimal(round(price * rng.lognormvariate(0, 0.12), -3)).quantize(Decimal('0.01'))
+                date_sold = connection.ops.adapt_datefield_value(
+                    ANCHOR.date() - timedelta(days=rng.randint(1, 3 * 365))
+                )
+                sales.append((sale_id, property_id, date_sold, str(final_price),
+                              rng.choice(self.buyers) if self.buyers else None,
+                              'APPROVED' if rng.random() < 0.1 else 'COMPLETED', self.now, self.now))
+                if agent_id:
+                    commissions.append((commission_id, sale_id, agent_id, str(final_price * 5 / 100), '5.00',
+                                        today, False))
+                    commission_id += 1
+                sale_id += 1
+            with transaction.atomic():
+                self._insert(Sale, ('id', 'property', 'date_sold', 'final_price', 'buyer', 'approval_status',
+                                    'created_at', 'updated_at'), sales)
+                self._insert(Commission, ('id', 'sale', 'agent', 'amount_calculated', 'commission_rate',
+                                          'date_paid', 'is_paid'), commissions)
+            self._count('sales', len(sales))
+
+
+def generate(size=PRESETS['small'], seed=1, batch_size=10000, log=print):
+    return DatasetGenerator(size, seed, batch_size, log).generate()
+
+
+def size_from_args(args):
+    size = PRESETS[args.preset]
+    overrides = {field.name: getattr(args, field.name) for field in fields(DatasetSize)
+                 if getattr(args, field.name, None) is not None}
+    return DatasetSize(**{**asdict(size), **overrides})
+
+
+def add_size_arguments(parser):
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    for field in fields(DatasetSize):
+        parser.add_argument(f'--{field.name}', type=int, help=f"Override the preset's {field.name} count.")
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_size_arguments(parser)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    generate(size_from_args(args), args.seed, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
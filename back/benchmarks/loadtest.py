@@ -0,0 +1,401 @@
+"""
+HTTP load test against a locally started server.
+
+Creates a fresh SQLite database with a synthetic dataset, starts the
+server on it, and lets concurrent virtual users authenticate through
+/api/token/ and replay a weighted mix of scenarios:
+
+    browse       municipalities, a map viewport search and its clusters
+    view         a property's detail, similar listings and tours
+    book_tour    schedule a tour on one of the user's listings
+    create_sale  record the sale of one of the user's listings
+
+Throughput and p50/p95/p99 latency are reported per route, and the report
+can be saved as JSON and diffed against an earlier one:
+
+    python -m benchmarks.loadtest --clients 32 --duration 30 --output before.json
+    python -m benchmarks.loadtest --clients 32 --duration 30 --output after.json --compare before.json
+    python -m benchmarks.loadtest --diff before.json after.json
+
+The server defaults to `manage.py runserver`; pass --server-command to run
+something else, e.g. --server-command "gunicorn core.wsgi -b {host}:{port} -w 4".
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = 'load-test-password'
+DEFAULT_MIX = 'browse=50,view=35,book_tour=10,create_sale=5'
+
+
+# --- Preparation (runs with Django configured against the load-test database) ---
+
+def prepare(args):
+    """Migrate and fill the database; return the plan the virtual users follow."""
+    from . import dataset
+
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from listings import similarity
+    from listings.models import Property
+
+    call_command('migrate', verbosity=0)
+    dataset.generate(dataset.size_from_args(args), args.seed)
+    similarity.rebuild_all()
+
+    # Agents log in as the virtual users: they can book tours on and sell the listings they represent
+    agents = list(
+        User.objects.filter(groups__name='Agent', listed_properties__status='ACTIVE')
+        .distinct().order_by('id').values_list('id', 'username')[:args.clients]
+    )
+    User.objects.filter(pk__in=[pk for pk, _username in agents]).update(password=make_password(PASSWORD))
+
+    accounts = []
+    for user_id, username in agents:
+        listings = list(
+            Property.objects.filter(agent_id=user_id, status='ACTIVE')
+            .order_by('id').values_list('id', 'is_available_for_tour', 'price')
+        )
+        accounts.append({
+            'username': username,
+            'tour_properties': [pk for pk, available, _price in listings if available],
+            'sale_properties': [[pk, price] for pk, available, price in listings if not available],
+        })
+
+    viewable = list(Property.objects.filter(status='ACTIVE').order_by('id').values_list('id', flat=True)[:5000])
+    locations = list(
+        Property.objects.filter(status='ACTIVE', latitude__isnull=False)
+        .order_by('id').values_list('latitude', 'longitude')[:1000]
+    )
+    return {'accounts': accounts, 'property_ids': viewable, 'locations': locations}
+
+
+# --- Server ---
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, env, log_file):
+    if args.server_command:
+        command = shlex.split(args.server_command.format(host=args.host, port=args.port))
+    else:
+        command = [sys.executable, 'manage.py', 'runserver', f'{args.host}:{args.port}', '--noreload']
+    server = subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}")
+        try:
+            with socket.create_connection((args.host, args.port), timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start within 60s")
+
+
+# --- Virtual users ---
+
+class VirtualUser:
+
+    def __init__(self, index, account, plan, args, recorder, deadline):
+        self.index = index
+        self.account = account
+        self.plan = plan
+        self.args = args
+        self.record = recorder
+        self.deadline = deadline
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.connection = None
+        self.token = None
+        self.tours_booked = 0
+
+    def request(self, method, path, route, body=None, authenticated=True):
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if authenticated:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = json.dumps(body).encode() if body is not None else None
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.args.host, self.args.port, timeout=60)
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+            if response.getheader('Connection', '').lower() == 'close':
+                self.connection.close()
+                self.connection = None
+        except (OSError, http.client.HTTPException):
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            data, status = b'', 0
+        self.record(f'{method} {route}', status, time.perf_counter() - started)
+        return status, data
+
+    def login(self):
+        status, data = self.request('POST', '/api/token/', '/api/token/', {
+            'username': self.account['username'], 'password': PASSWORD,
+        }, authenticated=False)
+        if status != 200:
+            raise RuntimeError(f"Login failed for {self.account['username']}: {status} {data[:200]!r}")
+        self.token = json.loads(data)['access']
+
+    def browse(self):
+        self.request('GET', '/api/municipalities/', '/api/municipalities/')
+        latitude, longitude = self.rng.choice(self.plan['locations'])
+        bbox = f'{longitude - 0.05:.5f},{latitude - 0.05:.5f},{longitude + 0.05:.5f},{latitude + 0.05:.5f}'
+        self.request('GET', f'/api/properties/geo/?bbox={bbox}', '/api/properties/geo/')
+        self.request('GET', f'/api/properties/clusters/?bbox={bbox}&zoom=13', '/api/properties/clusters/')
+
+    def view(self):
+        property_id = self.rng.choice(self.plan['property_ids'])
+        self.request('GET', f'/api/properties/{property_id}/', '/api/properties/{id}/')
+        self.request('GET', f'/api/properties/{property_id}/similar/', '/api/properties/{id}/similar/')
+        self.request('GET', f'/api/properties/{property_id}/tours/', '/api/properties/{id}/tours/')
+
+    def book_tour(self):
+        if not self.account['tour_properties']:
+            return self.view()
+        property_id = self.rng.choice(self.account['tour_properties'])
+        # Distinct future slots per virtual user, so bookings don't collide
+        start = self.plan['tour_epoch'] + timedelta(days=30, hours=2 * (self.tours_booked * 1000 + self.index))
+        self.tours_booked += 1
+        self.request('POST', f'/api/properties/{property_id}/tours/', '/api/properties/{id}/tours/', {
+            'property': property_id,
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(hours=1)).isoformat(),
+        })
+
+    def create_sale(self):
+        if not self.account['sale_properties']:
+            return self.view()
+        property_id, price = self.account['sale_properties'].pop()
+        # Sold at the listed price, as most sales are
+        self.request('POST', '/api/sales/', '/api/sales/', {
+            'property_id': property_id, 'date_sold': datetime.now(timezone.utc).date().isoformat(),
+            'final_price': str(price),
+        })
+
+    def run(self, scenarios, weights):
+        self.login()
+        while time.monotonic() < self.deadline:
+            scenario = self.rng.choices(scenarios, weights)[0]
+            getattr(self, scenario)()
+            if self.args.think_ms:
+                time.sleep(self.rng.expovariate(1000 / self.args.think_ms))
+        if self.connection is not None:
+            self.connection.close()
+
+
+class Recorder:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}       # route -> [(status, seconds), ...]
+
+    def __call__(self, route, status, seconds):
+        with self._lock:
+            self.samples.setdefault(route, []).append((status, seconds))
+
+
+def _stats(samples, elapsed):
+    # Imported here: benchmarks.common sets Django up, which must wait for main() to pick the database
+    from .common import percentile
+
+    latencies = [seconds for _status, seconds in samples]
+    statuses = {}
+    for status, _seconds in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for status, _seconds in samples if status == 0 or status >= 500),
+        'statuses': dict(sorted(statuses.items())),
+        'throughput': round(len(samples) / elapsed, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def run_load(args, plan):
+    scenarios, weights = zip(*parse_mix(args.mix).items())
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    plan['tour_epoch'] = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    users = [
+        VirtualUser(index, plan['accounts'][index % len(plan['accounts'])], plan, args, recorder, deadline)
+        for index in range(args.clients)
+    ]
+    failures = []
+
+    def run_user(user):
+        try:
+            user.run(scenarios, weights)
+        except Exception as error:
+            failures.append(error)
+
+    threads = [threading.Thread(target=run_user, args=(user,)) for user in users]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    if failures:
+        raise failures[0]
+
+    all_samples = [sample for samples in recorder.samples.values() for sample in samples]
+    return {
+        'routes': {route: _stats(samples, elapsed) for route, samples in sorted(recorder.samples.items())},
+        'total': _stats(all_samples, elapsed),
+        'elapsed_s': round(elapsed, 2),
+    }
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('browse', 'view', 'book_tour', 'create_sale'):
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}")
+        mix[name] = float(weight)
+    return mix
+
+
+# --- Reports ---
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    meta = report['meta']
+    print(f"{meta['clients']} clients for {meta['duration_s']}s against {meta['server']} "
+          f"({meta['settings']}), revision {meta['revision']}\n")
+    print(f"{'route':<42}{'req':>7}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in list(report['routes'].items()) + [('TOTAL', report['total'])]:
+        print(f"{route:<42}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+
+
+def print_diff(before, after):
+    print(f"{before['meta']['revision']} -> {after['meta']['revision']}\n")
+    print(f"{'route':<42}{'req/s':>16}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}")
+    routes = sorted(set(before['routes']) | set(after['routes'])) + ['TOTAL']
+    for route in routes:
+        old = before['total'] if route == 'TOTAL' else before['routes'].get(route)
+        new = after['total'] if route == 'TOTAL' else after['routes'].get(route)
+        if old is None or new is None:
+            print(f"{route:<42}{'only in ' + ('after' if old is None else 'before'):>16}")
+            continue
+        cells = []
+        for key in ('throughput', 'p50_ms', 'p95_ms', 'p99_ms'):
+            change = new[key] / old[key] - 1 if old[key] else 0.0
+            cells.append(f"{new[key]:>9.1f} {change:>+6.0%}")
+        print(f"{route:<42}" + ''.join(f"{cell:>18}" for cell in cells))
+
+
+def main():
+    # Settings read SQLITE_PATH on import, so point it at the load-test
+    # database before anything imports Django
+    directory = tempfile.mkdtemp(prefix='loadtest-')
+    database = os.path.join(directory, 'loadtest.sqlite3')
+    os.environ.update(SQLITE_PATH=database, DATABASE_REPLICAS='')
+    try:
+        run(directory, database)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(directory, database):
+    from . import dataset
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    dataset.add_size_arguments(parser)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30, help="Seconds of load.")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX}).")
+    parser.add_argument('--think-ms', type=float, default=0, help="Mean pause between scenarios per client.")
+    parser.add_argument('--settings', default='core.settings', help="Settings module for the server.")
+    parser.add_argument('--server-command', help="Server command line; {host} and {port} are substituted.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--output', type=Path, help="Write the report as JSON.")
+    parser.add_argument('--compare', type=Path, help="Diff against an earlier JSON report.")
+    parser.add_argument('--diff', nargs=2, type=Path, metavar=('BEFORE', 'AFTER'),
+                        help="Only diff two saved reports.")
+    args = parser.parse_args()
+
+    if args.diff:
+        print_diff(*(json.loads(path.read_text()) for path in args.diff))
+        return
+    parse_mix(args.mix)
+    args.port = args.port or _free_port()
+
+    print("Preparing database...", file=sys.stderr)
+    plan = prepare(args)
+
+    env = dict(os.environ, SQLITE_PATH=database, DJANGO_SETTINGS_MODULE=args.settings,
+               ALLOWED_HOSTS=f'{args.host},localhost')
+    with open(os.path.join(directory, 'server.log'), 'w+') as log_file:
+        server = start_server(args, env, log_file)
+        try:
+            print(f"Running {args.clients} clients for {args.duration:g}s...", file=sys.stderr)
+            results = run_load(args, plan)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+            if server.returncode not in (0, -15):
+                log_file.seek(0)
+                print(log_file.read()[-4000:], file=sys.stderr)
+
+    report = {
+        'meta': {
+            'revision': _git_revision(),
+            'clients': args.clients,
+            'duration_s': args.duration,
+            'mix': parse_mix(args.mix),
+            'settings': args.settings,
+            'server': args.server_command or 'runserver',
+            'preset': args.preset,
+            'seed': args.seed,
+        },
+        **results,
+    }
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+    if args.compare:
+        print()
+        print_diff(json.loads(args.compare.read_text()), report)
+
+
+if __name__ == '__main__':
+    main()
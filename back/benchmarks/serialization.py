@@ -0,0 +1,110 @@
+"""
+Serialization and rendering throughput of the list payloads.
+
+Serializes the same rows with DRF's ListSerializer and JSONRenderer, with
+CompiledListSerializer (core.serializers) and ORJSONRenderer, and with
+MessagePack when msgpack is installed. Checks that every variant produces
+the same data and reports rows per second and payload sizes.
+
+    python -m benchmarks.serialization [--preset small] [--repeat 5]
+"""
+import argparse
+import gc
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+from . import common, dataset
+
+from rest_framework import serializers  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer, msgpack  # noqa: E402
+from core.serializers import CompiledListSerializer  # noqa: E402
+from listings.serializers import PropertyCardSerializer, PropertySerializer  # noqa: E402
+from listings.views import property_card_queryset, property_read_queryset  # noqa: E402
+from sync.serializers import TourSyncSerializer  # noqa: E402
+from tours.models import Tour  # noqa: E402
+
+
+PAYLOADS = (
+    ('property cards', PropertyCardSerializer, lambda: property_card_queryset()),
+    ('full properties', PropertySerializer,
+     lambda: property_read_queryset().filter(status__in=['ACTIVE', 'UNDER_REVIEW'])[:2000]),
+    ('tour sync feed', TourSyncSerializer, lambda: Tour.objects.order_by('updated_at', 'id')[:5000]),
+)
+
+
+def variants():
+    yield 'drf + json', False, JSONRenderer()
+    yield 'compiled + orjson', True, ORJSONRenderer()
+    if msgpack is not None:
+        yield 'compiled + msgpack', True, MessagePackRenderer()
+
+
+@contextmanager
+def uncompiled():
+    """Serialize lists, nested ones included, with DRF's ListSerializer."""
+    compiled = CompiledListSerializer.to_representation
+    CompiledListSerializer.to_representation = serializers.ListSerializer.to_representation
+    try:
+        yield
+    finally:
+        CompiledListSerializer.to_representation = compiled
+
+
+def serialize(serializer_class, rows, compiled, context):
+    with nullcontext() if compiled else uncompiled():
+        return serializer_class(rows, many=True, context=context).data
+
+
+def timed(function, repeat):
+    """Best time of ``repeat`` runs, with the collector out of the way."""
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return min(timings), result
+
+
+def run(repeat):
+    context = {'request': APIRequestFactory().get('/api/properties/')}
+    for label, serializer_class, load in PAYLOADS:
+        rows = list(load())
+        print(f"\n{label} ({len(rows)} rows)")
+        print(f"{'variant':<22}{'serialize ms':>14}{'render ms':>11}{'rows/s':>11}{'bytes':>11}{'speedup':>9}")
+        reference = None
+        baseline_seconds = None
+        for name, compiled, renderer in variants():
+            serialize_seconds, data = timed(lambda: serialize(serializer_class, rows, compiled, context), repeat)
+            render_seconds, body = timed(lambda: renderer.render(data), repeat)
+            if reference is None:
+                reference = data
+            elif data != reference:
+                raise SystemExit(f"{name} produced different data for {label}")
+            total = serialize_seconds + render_seconds
+            baseline_seconds = baseline_seconds or total
+            print(f"{name:<22}{serialize_seconds * 1000:>14.1f}{render_seconds * 1000:>11.1f}"
+                  f"{len(rows) / total:>11.0f}{len(body):>11}{baseline_seconds / total:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    dataset.add_size_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with common.test_database():
+        dataset.generate(dataset.size_from_args(args), args.seed, log=lambda message: print(message, file=sys.stderr))
+        run(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Mixed read/write throughput of the SQLite configuration in core.settings
+versus the tuned profile in core.settings_production.
+
+Each profile runs in its own process against a fresh database file. Worker
+threads issue a mix of listing reads and read-modify-write price updates,
+closing connections between operations the way Django does between
+requests, so CONN_MAX_AGE takes effect.
+
+    python -m benchmarks.sqlite_concurrency [--threads 16] [--seconds 10] [--write-ratio 0.2]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+PROFILES = (
+    ('default', 'core.settings'),
+    ('production', 'core.settings_production'),
+)
+
+
+def worker_main(args):
+    import random
+
+    from . import common  # noqa: F401  (configures Django)
+
+    from django.core.management import call_command
+    from django.db import OperationalError, close_old_connections, connections, transaction
+    from django.contrib.auth.models import User
+
+    from listings.models import Municipality, Property
+
+    call_command('migrate', verbosity=0)
+    rng = random.Random(args.seed)
+    owner = User.objects.create_user('bench-owner')
+    municipalities = Municipality.objects.bulk_create(
+        Municipality(municipality_name=f'Municipality {i}', price_per_sqm=rng.randint(20000, 200000))
+        for i in range(20)
+    )
+    Property.objects.bulk_create(
+        Property(property_name=f'Property {i}', property_address=f'{i} Benchmark St.',
+                 property_municipality=rng.choice(municipalities), owner=owner,
+                 property_size=rng.randint(30, 500), price=rng.randint(1, 200) * 100000)
+        for i in range(args.properties)
+    )
+    property_ids = list(Property.objects.values_list('id', flat=True))
+    municipality_ids = [municipality.pk for municipality in municipalities]
+    connections.close_all()
+
+    deadline = time.perf_counter() + args.seconds
+    lock = threading.Lock()
+    totals = {'reads': 0, 'writes': 0, 'errors': 0, 'latencies': []}
+
+    def run(thread_seed):
+        thread_rng = random.Random(thread_seed)
+        reads = writes = errors = 0
+        latencies = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if thread_rng.random() < args.write_ratio:
+                    with transaction.atomic():
+                        pk = thread_rng.choice(property_ids)
+                        price = Property.objects.values_list('price', flat=True).get(pk=pk)
+                        Property.objects.filter(pk=pk).update(price=price + 1)
+                    writes += 1
+                else:
+                    list(
+                        Property.objects.filter(property_municipality_id=thread_rng.choice(municipality_ids))
+                        .order_by('-id').values('id', 'property_name', 'price')[:20]
+                    )
+                    reads += 1
+                latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                errors += 1
+            finally:
+                close_old_connections()
+        connections.close_all()
+        with lock:
+            totals['reads'] += reads
+            totals['writes'] += writes
+            totals['errors'] += errors
+            totals['latencies'].extend(latencies)
+
+    threads = [threading.Thread(target=run, args=(args.seed + i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats = common.summarize(totals['latencies'], elapsed)
+    stats.update(reads=totals['reads'], writes=totals['writes'], errors=totals['errors'])
+    print(json.dumps(stats))
+
+
+def run_profile(settings_module, args):
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module,
+                   SQLITE_PATH=os.path.join(directory, 'bench.sqlite3'), DATABASE_REPLICAS='')
+        command = [sys.executable, '-m', 'benchmarks.sqlite_concurrency', '--worker',
+                   '--threads', str(args.threads), '--seconds', str(args.seconds),
+                   '--write-ratio', str(args.write_ratio), '--properties', str(args.properties),
+                   '--seed', str(args.seed)]
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--properties', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker_main(args)
+        return
+
+    print(f"{args.threads} threads, {args.seconds:g}s, {args.write_ratio:.0%} writes\n")
+    print(f"{'profile':<12}{'ops/s':>10}{'reads':>9}{'writes':>9}{'errors':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for label, settings_module in PROFILES:
+        stats = run_profile(settings_module, args)
+        print(f"{label:<12}{stats['throughput']:>10.1f}{stats['reads']:>9}{stats['writes']:>9}"
+              f"{stats['errors']:>9}{stats['p50_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
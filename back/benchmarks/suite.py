@@ -0,0 +1,257 @@
+"""
+Benchmark suite for the main endpoints and model methods.
+
+Loads a synthetic dataset (benchmarks.dataset) into a throwaway database,
+times every case and counts its queries, and compares the results with a
+stored baseline. Exits with status 1 when a case got slower than the
+tolerance allows or issues more queries than before.
+
+    python -m benchmarks.suite                      # compare with benchmarks/baseline.json
+    python -m benchmarks.suite --save-baseline      # record a new baseline
+    python -m benchmarks.suite --preset tiny -k api.property
+
+Timings depend on the machine: record the baseline on the machine that
+runs the comparison. Query counts are machine-independent.
+"""
+import argparse
+import json
+import logging
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+
+from . import common, dataset
+
+import django  # noqa: E402
+from django.contrib.auth.models import Group, User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from deals.scoring import price_scorer  # noqa: E402
+from deals.valuation import comparable_sales  # noqa: E402
+from listings import similarity  # noqa: E402
+from listings.models import Municipality, Property  # noqa: E402
+from tours.models import Tour  # noqa: E402
+
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline.json')
+DEFAULT_TOLERANCE = 0.25
+# Timing changes smaller than this are noise, whatever the ratio
+MIN_REGRESSION_MS = 1.0
+
+
+class Context:
+    """Users, sample rows and API clients shared by the cases."""
+
+    def __init__(self):
+        admin_group = Group.objects.get_or_create(name='Admin')[0]
+        self.admin, _created = User.objects.get_or_create(
+            username='bench-admin', defaults={'is_staff': True, 'password': '!'}
+        )
+        self.admin.groups.add(admin_group)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+        active = Property.objects.filter(status='ACTIVE', owner__isnull=False).order_by('id')
+        self.property = active.first()
+        self.sample_ids = list(active.values_list('id', flat=True)[:200])
+        self.sale_candidates = list(active.values_list('id', 'owner_id', 'price')[:1000])
+        self.municipality = Municipality.objects.get(pk=self.property.property_municipality_id)
+        self.tour = Tour.objects.filter(agent__isnull=False).order_by('id').first()
+        self.owner_clients = {}
+
+        located = Property.objects.filter(latitude__isnull=False, pk=self.property.pk).values(
+            'latitude', 'longitude').first()
+        lat, lng = located['latitude'], located['longitude']
+        self.bbox = f'{lng - 0.1},{lat - 0.1},{lng + 0.1},{lat + 0.1}'
+
+    def client_for(self, user_id):
+        client = self.owner_clients.get(user_id)
+        if client is None:
+            client = self.owner_clients[user_id] = APIClient()
+            client.force_authenticate(User.objects.get(pk=user_id))
+        return client
+
+
+def _get(path):
+    def case(ctx):
+        response = ctx.client.get(path.format(ctx=ctx))
+        assert response.status_code == 200, f'{path} returned {response.status_code}'
+    return case
+
+
+def total_price(ctx):
+    for property_obj in Property.objects.filter(pk__in=ctx.sample_ids).select_related('property_municipality'):
+        property_obj.total_price()
+
+
+def tour_clean(ctx):
+    existing = ctx.tour
+    tour = Tour(property_id=existing.property_id, agent_id=existing.agent_id,
+                start_time=existing.end_time + timedelta(minutes=30),
+                end_time=existing.end_time + timedelta(minutes=90))
+    tour.clean()
+
+
+def sale_create(ctx):
+    property_id, owner_id, price = ctx.sale_candidates[ctx.iteration % len(ctx.sale_candidates)]
+    with transaction.atomic():
+        # Sold at the listed price: scored and completed rather than sent for review
+        response = ctx.client_for(owner_id).post('/api/sales/', {
+            'property_id': property_id, 'date_sold': '2026-01-01', 'final_price': str(price),
+        }, format='json')
+        assert response.status_code == 201, f'sale creation returned {response.status_code}: {response.data}'
+        transaction.set_rollback(True)
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    run: object
+    repeat: int = 5
+
+
+CASES = (
+    Case('model.total_price[200]', total_price),
+    Case('model.tour_clean', tour_clean, repeat=20),
+    Case('api.sale_create', sale_create, repeat=10),
+    Case('api.property_list', _get('/api/properties/'), repeat=3),
+    Case('api.property_detail', _get('/api/properties/{ctx.property.pk}/'), repeat=20),
+    Case('api.property_geo', _get('/api/properties/geo/?bbox={ctx.bbox}')),
+    Case('api.property_clusters', _get('/api/properties/clusters/?bbox={ctx.bbox}&zoom=12'), repeat=20),
+    Case('api.property_similar', _get('/api/properties/{ctx.property.pk}/similar/'), repeat=20),
+    Case('api.property_valuation', _get('/api/properties/{ctx.property.pk}/valuation/'), repeat=20),
+    Case('api.property_tours', _get('/api/properties/{ctx.tour.property_id}/tours/'), repeat=20),
+    Case('api.municipality_list', _get('/api/municipalities/'), repeat=20),
+    Case('api.sale_list', _get('/api/sales/')),
+    Case('api.sync_properties', _get('/api/sync/properties/'), repeat=20),
+)
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(case, ctx):
+    ctx.iteration = 0
+    case.run(ctx)       # warm-up: caches, scorer and valuation indexes
+    timings = []
+    queries = 0
+    for iteration in range(1, case.repeat + 1):
+        ctx.iteration = iteration
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            case.run(ctx)
+            timings.append(time.perf_counter() - started)
+        queries = max(queries, counter.count)
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'p95_ms': round(common.percentile(timings, 0.95) * 1000, 3),
+        'queries': queries,
+    }
+
+
+def run_cases(pattern=None):
+    ctx = Context()
+    similarity.rebuild_all()
+    price_scorer.refresh()
+    comparable_sales.refresh()
+    results = {}
+    for case in CASES:
+        if pattern and pattern not in case.name:
+            continue
+        results[case.name] = measure(case, ctx)
+        print(f"  {case.name:<28}{results[case.name]['median_ms']:>10.2f} ms{results[case.name]['queries']:>6} queries",
+              file=sys.stderr)
+    return results
+
+
+def environment(size):
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'dataset': asdict(size) if size else 'existing database',
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print a comparison table; return the names of regressed cases."""
+    regressions = []
+    print(f"{'case':<28}{'base ms':>10}{'now ms':>10}{'change':>9}{'base q':>8}{'now q':>7}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<28}{'-':>10}{current['median_ms']:>10.2f}{'new':>9}{'-':>8}{current['queries']:>7}")
+            continue
+        change = current['median_ms'] / previous['median_ms'] - 1 if previous['median_ms'] else 0.0
+        slower = (change > tolerance
+                  and current['median_ms'] - previous['median_ms'] > MIN_REGRESSION_MS)
+        more_queries = current['queries'] > previous['queries']
+        flag = '  <-- regression' if slower or more_queries else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<28}{previous['median_ms']:>10.2f}{current['median_ms']:>10.2f}{change:>+9.0%}"
+              f"{previous['queries']:>8}{current['queries']:>7}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    dataset.add_size_arguments(parser)
+    parser.add_argument('--existing', action='store_true',
+                        help="Benchmark the configured database as it is instead of generating a dataset.")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown of the median before a case counts as regressed (0.25 = 25%%).")
+    parser.add_argument('-k', dest='pattern', help="Only run cases whose name contains this text.")
+    args = parser.parse_args()
+    # The suite reports its own timings; don't interleave slow-request warnings
+    logging.getLogger('monitoring.requests').setLevel(logging.ERROR)
+
+    if args.existing:
+        size = None
+        results = run_cases(args.pattern)
+    else:
+        size = dataset.size_from_args(args)
+        with common.test_database():
+            dataset.generate(size, args.seed, log=lambda message: print(message, file=sys.stderr))
+            results = run_cases(args.pattern)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(
+            {'environment': environment(size), 'results': results}, indent=2, sort_keys=True
+        ) + '\n')
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(json.dumps(results, indent=2))
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline['environment'].get('dataset') != environment(size)['dataset']:
+        print("Warning: the baseline was recorded on a different dataset.", file=sys.stderr)
+    regressions = compare(results, baseline['results'], args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Building blocks for async read endpoints.
+
+DRF views are synchronous, so under ASGI each request occupies a worker
+thread for its whole lifetime. These views authenticate with the same JWT
+settings, load data with Django's async ORM and render with the same
+renderers as the synchronous endpoints, chosen from the Accept header. Querysets
+must select/prefetch everything the serializer touches: serialization runs
+on the event loop, where a lazy query would raise SynchronousOnlyOperation.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework.utils.mediatypes import media_type_matches, order_by_precedence
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .renderers import ORJSONRenderer
+
+
+async def authenticate_jwt(request, allow_query_token=False):
+    """Return the active user for the request's access token, or None."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None and allow_query_token:
+        raw_token = request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        user = await sync_to_async(authentication.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user if user.is_active else None
+
+
+class AsyncReadView(View):
+    """Async GET-only view for authenticated users."""
+    http_method_names = ['get', 'head', 'options']
+    # Non-HTML renderers from DEFAULT_RENDERER_CLASSES
+    renderers = [
+        renderer_class() for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES
+        if renderer_class.format != 'api'
+    ] or [ORJSONRenderer()]
+
+    async def dispatch(self, request, *args, **kwargs):
+        # A batched sub-request (core.batch) arrives already authenticated
+        request.user = getattr(request, '_force_auth_user', None) or await authenticate_jwt(request)
+        if request.user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def select_renderer(self, request):
+        """The first renderer matching the Accept header; the default one when none does."""
+        accept = request.headers.get('Accept', '*/*')
+        for media_types in order_by_precedence([token.strip() for token in accept.split(',') if token.strip()]):
+            for renderer in self.renderers:
+                if any(media_type_matches(renderer.media_type, media_type) for media_type in media_types):
+                    return renderer
+        return self.renderers[0]
+
+    def render(self, data, status=200):
+        renderer = self.select_renderer(self.request)
+        return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+    def not_found(self):
+        return JsonResponse({'detail': 'No object matches the given query.'}, status=404)
@@ -0,0 +1,186 @@
+"""
+Several API calls in one request.
+
+POST /api/batch/ with
+
+    {"requests": [{"method": "GET", "path": "/api/properties/1/"},
+                  {"method": "PATCH", "path": "/api/properties/1/", "body": {"price": 250000}}],
+     "parallel": true}
+
+runs each sub-request against the existing routes and answers with
+``{"responses": [{"status": 200, "body": ...}, ...]}`` in the same order
+(an ``id`` given on a sub-request is echoed back on its response).
+
+The batch is authenticated once: sub-requests are handed the user and
+token DRF resolved for it, and share what is cached per user (group
+names, see core.permissions) and per process (core.response_cache).
+Sub-requests send and receive JSON and skip the middleware, which runs
+once around the whole batch. Each one stands alone, as separate calls
+would: a failing sub-request does not undo the ones before it.
+
+With ``"parallel": true``, consecutive GET sub-requests run concurrently
+on up to MAX_WORKERS threads; any other method waits for the reads before
+it and runs before the ones after it.
+"""
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+import orjson
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .permissions import group_names
+
+
+logger = logging.getLogger('core.batch')
+
+DEFAULTS = {
+    'MAX_REQUESTS': 20,
+    'MAX_WORKERS': 4,
+}
+
+BATCH_PATH = '/api/batch/'
+# META entries describing the batch request's own body
+_BODY_META = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_CONTENT_ENCODING', 'HTTP_ACCEPT_ENCODING')
+
+
+def batch_setting(name):
+    return getattr(settings, 'BATCH', {}).get(name, DEFAULTS[name])
+
+
+class BatchItemSerializer(serializers.Serializer):
+    id = serializers.CharField(required=False)
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'], default='GET')
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith('/api/') or path == BATCH_PATH:
+            raise serializers.ValidationError("Must be an API path other than the batch endpoint.")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if len(value) > batch_setting('MAX_REQUESTS'):
+            raise serializers.ValidationError(f"At most {batch_setting('MAX_REQUESTS')} requests per batch.")
+        return value
+
+
+def build_request(request, item):
+    """A Django request for ``item`` carrying the batch request's authentication."""
+    url = urlsplit(item['path'])
+    body = orjson.dumps(item['body']) if 'body' in item else b''
+    sub_request = HttpRequest()
+    sub_request.method = item['method']
+    sub_request.path = sub_request.path_info = url.path
+    sub_request.META = {key: value for key, value in request.META.items() if key not in _BODY_META}
+    sub_request.META.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'HTTP_ACCEPT': 'application/json',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+    })
+    sub_request.GET = QueryDict(url.query)
+    sub_request.COOKIES = request.COOKIES
+    sub_request._stream = io.BytesIO(body)
+    sub_request._read_started = False
+    # Picked up by rest_framework.request.Request (and AsyncReadView) instead of authenticating again
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    sub_request.user = request.user
+    return sub_request
+
+
+def response_body(response):
+    if isinstance(response, Response):
+        return response.data
+    if not response.content:
+        return None
+    if response.get('Content-Type', '').startswith('application/json'):
+        return orjson.loads(response.content)
+    return response.content.decode(response.charset)
+
+
+def run_item(request, item):
+    """Dispatch one sub-request and return its entry in the batch response."""
+    try:
+        match = resolve(urlsplit(item['path']).path)
+    except Resolver404:
+        result = {'status': 404, 'body': {'detail': 'Not found.'}}
+    else:
+        sub_request = build_request(request, item)
+        sub_request.resolver_match = match
+        try:
+            if iscoroutinefunction(match.func):
+                response = async_to_sync(match.func)(sub_request, *match.args, **match.kwargs)
+            else:
+                response = match.func(sub_request, *match.args, **match.kwargs)
+            if response.streaming:
+                response.close()
+                result = {'status': 400, 'body': {'detail': 'Streaming responses cannot be batched.'}}
+            else:
+                if hasattr(response, 'render'):
+                    # Rendering also runs post-render callbacks such as the response cache's
+                    response.render()
+                result = {'status': response.status_code, 'body': response_body(response)}
+        except Exception:
+            logger.exception("Batched %s %s failed", item['method'], item['path'])
+            result = {'status': 500, 'body': {'detail': 'Internal server error.'}}
+    if 'id' in item:
+        result['id'] = item['id']
+    return result
+
+
+def run_in_thread(request, item):
+    try:
+        return run_item(request, item)
+    finally:
+        connections.close_all()
+
+
+def read_runs(items, parallel):
+    """Split ``items`` into runs executed together: consecutive GETs when parallel, else singletons."""
+    runs = []
+    for item in items:
+        if parallel and item['method'] == 'GET' and runs and runs[-1][0]['method'] == 'GET':
+            runs[-1].append(item)
+        else:
+            runs.append([item])
+    return runs
+
+
+class BatchView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['requests']
+        # Loaded here so concurrent sub-requests all find it cached on the user
+        group_names(request.user)
+
+        parallel = serializer.validated_data['parallel']
+        results = []
+        with ThreadPoolExecutor(max_workers=batch_setting('MAX_WORKERS')) if parallel else nullcontext() as executor:
+            for run in read_runs(items, parallel):
+                if len(run) == 1:
+                    results.append(run_item(request, run[0]))
+                else:
+                    results.extend(executor.map(lambda item: run_in_thread(request, item), run))
+        return Response({'responses': results})
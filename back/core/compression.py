@@ -0,0 +1,120 @@
+"""
+gzip and Brotli compression of response bodies.
+
+Brotli is used when the optional ``brotli`` package is installed and the
+client accepts it, gzip otherwise. Only bodies of at least MIN_SIZE bytes
+with an allowlisted content type are compressed. Responses served from
+core.response_cache carry the bodies compressed on earlier requests;
+newly compressed ones are stored back into their cache entry.
+"""
+import gzip
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .response_cache import store_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DEFAULTS = {
+    'MIN_SIZE': 1024,
+    'CONTENT_TYPES': (
+        'application/json', 'application/msgpack', 'text/html', 'text/plain', 'text/css', 'text/csv',
+        'application/javascript',
+    ),
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+_ACCEPT_ENCODING = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def compression_setting(name):
+    return getattr(settings, 'COMPRESSION', {}).get(name, DEFAULTS[name])
+
+
+def accepted_encodings(header):
+    """Encodings the Accept-Encoding header allows (q > 0)."""
+    accepted = set()
+    for part in header.split(','):
+        match = _ACCEPT_ENCODING.match(part)
+        if match and float(match.group(2) or 1) > 0:
+            accepted.add(match.group(1).lower())
+    return accepted
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=compression_setting('BROTLI_QUALITY'))
+    return gzip.compress(body, compresslevel=compression_setting('GZIP_LEVEL'), mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with the best encoding the client accepts. Place it
+    before any middleware that reads or changes the response body.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def choose_encoding(self, request):
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def compressible(self, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return (content_type in compression_setting('CONTENT_TYPES')
+                and len(response.content) >= compression_setting('MIN_SIZE'))
+
+    def process_response(self, request, response):
+        if not self.compressible(response):
+            return response
+        # The body depends on Accept-Encoding from here on, compressed or not
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+
+        precompressed = getattr(response, 'precompressed', {})
+        body = precompressed.get(encoding)
+        if body is None:
+            body = compress(response.content, encoding)
+            cache_key = getattr(response, 'response_cache_key', None)
+            if cache_key is not None:
+                store_encoding(cache_key, encoding, body)
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # The compressed body is not byte-for-byte the entity the strong ETag named
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,127 @@
+"""
+Read-replica routing.
+
+Reads of listings, tours and deals data go to a replica only while serving
+a safe (GET/HEAD/OPTIONS) request; everything else - writes, management
+commands, signal handlers, background work - uses the primary. A client
+that has just written is pinned to the primary for REPLICA_PIN_SECONDS, so
+it reads its own writes even when the replicas lag behind.
+
+Clients are identified by the user id in their access token, so a pin
+outlives token refreshes; the token is validated here, without a query,
+since DRF has not authenticated the request yet when the middleware runs.
+Without a valid token a client is identified by a hash of its session
+cookie, then by its remote address. Pins are kept in the default cache,
+which must be shared between workers for pinning to hold across processes.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+PRIMARY = 'default'
+REPLICATED_APPS = {'listings', 'tours', 'deals'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_CACHE_KEY_PREFIX = 'replica-pin'
+
+_use_replicas = ContextVar('use_replicas', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in REPLICATED_APPS and _use_replicas.get():
+            replicas = replica_aliases()
+            if replicas:
+                return random.choice(replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, never migrated directly
+        return db == PRIMARY
+
+
+def _token_user_id(request):
+    """The user id in the request's access token, or None when it carries no valid one."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except InvalidToken:
+        return None
+
+
+def _client_key(request):
+    user_id = _token_user_id(request)
+    if user_id is not None:
+        return f'{PIN_CACHE_KEY_PREFIX}:user:{user_id}'
+    identity = request.COOKIES.get(settings.SESSION_COOKIE_NAME) or request.META.get('REMOTE_ADDR', '')
+    digest = hashlib.sha256(identity.encode()).hexdigest()[:32]
+    return f'{PIN_CACHE_KEY_PREFIX}:{digest}'
+
+
+def _pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+class ReplicaRoutingMiddleware:
+    """Enable replica reads for safe requests from clients that are not pinned."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = bool(replica_aliases())
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        key = _client_key(request)
+        if request.method in SAFE_METHODS:
+            token = _use_replicas.set(not cache.get(key))
+            try:
+                return self.get_response(request)
+            finally:
+                _use_replicas.reset(token)
+        response = self.get_response(request)
+        cache.set(key, True, _pin_seconds())
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        key = _client_key(request)
+        if request.method in SAFE_METHODS:
+            token = _use_replicas.set(not await cache.aget(key))
+            try:
+                return await self.get_response(request)
+            finally:
+                _use_replicas.reset(token)
+        response = await self.get_response(request)
+        await cache.aset(key, True, _pin_seconds())
+        return response
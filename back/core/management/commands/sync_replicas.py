@@ -0,0 +1,36 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db_router import PRIMARY, replica_aliases
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database onto every configured replica."
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[PRIMARY]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("sync_replicas only copies SQLite databases; use the database's own replication.")
+        replicas = replica_aliases()
+        if not replicas:
+            self.stdout.write("No replicas configured (set DATABASE_REPLICAS).")
+            return
+
+        source = sqlite3.connect(primary['NAME'])
+        try:
+            for alias in replicas:
+                started = time.perf_counter()
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    # The backup API copies a consistent snapshot while the primary stays writable
+                    source.backup(target, pages=1024)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(
+                    f"Synced {alias} in {time.perf_counter() - started:.1f}s."
+                ))
+        finally:
+            source.close()
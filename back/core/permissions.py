@@ -1,41 +1,51 @@
 from rest_framework import permissions
 
+
+def group_names(user):
+    """The user's group names, queried once per user instance and so once per request."""
+    if not user.is_authenticated:
+        return frozenset()
+    if not hasattr(user, '_group_names'):
+        user._group_names = frozenset(user.groups.values_list('name', flat=True))
+    return user._group_names
+
+
 class IsAdminGroup(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.groups.filter(name='Admin').exists()
+        return request.user.is_authenticated and 'Admin' in group_names(request.user)
 
 class IsAgentGroup(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.groups.filter(name='Agent').exists()
+        return request.user.is_authenticated and 'Agent' in group_names(request.user)
 
 class IsOwnerGroup(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.groups.filter(name='Owner').exists()
+        return request.user.is_authenticated and 'Owner' in group_names(request.user)
 
 class IsBuyerGroup(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.groups.filter(name='Buyer').exists()
+        return request.user.is_authenticated and 'Buyer' in group_names(request.user)
 
 class IsAdminOrAgent(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and (
-            request.user.groups.filter(name='Admin').exists() or
-            request.user.groups.filter(name='Agent').exists()
+            'Admin' in group_names(request.user) or
+            'Agent' in group_names(request.user)
         )
 
 class IsOwnerOrBuyerGroup(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and (
-            request.user.groups.filter(name='Owner').exists() or
-            request.user.groups.filter(name='Buyer').exists()
+            'Owner' in group_names(request.user) or
+            'Buyer' in group_names(request.user)
         )
 
 class IsAdminOrAgentOrOwnerGroup(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and (
-            request.user.groups.filter(name='Admin').exists() or
-            request.user.groups.filter(name='Agent').exists() or
-            request.user.groups.filter(name='Owner').exists()
+            'Admin' in group_names(request.user) or
+            'Agent' in group_names(request.user) or
+            'Owner' in group_names(request.user)
         )
 
 class IsOwner(permissions.BasePermission):
@@ -0,0 +1,82 @@
+"""
+Cache of rendered read responses that do not depend on the user.
+
+Entries are keyed by a version number that writes to the underlying data
+bump (see listings.signals), so a write invalidates every cached response
+at once instead of each key being tracked. With several worker processes
+the default cache must be shared, or a write only invalidates its own
+process's entries until RESPONSE_CACHE_TIMEOUT expires them.
+
+CompressionMiddleware stores the compressed bodies it produces next to the
+rendered one, so a hot response is compressed once per encoding.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from monitoring.metrics import registry
+
+
+VERSION_CACHE_KEY = 'response-cache:version'
+# Formats whose output depends only on the data; the browsable API shows the user
+CACHED_FORMATS = ('json', 'msgpack')
+
+
+def cache_timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+
+def current_version():
+    return cache.get_or_set(VERSION_CACHE_KEY, 1, timeout=None)
+
+
+def bump_version(**kwargs):
+    """Invalidate every cached response; usable as a signal receiver."""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+
+
+def response_cache_key(request):
+    path = hashlib.sha256(request.get_full_path().encode()).hexdigest()
+    return f'response-cache:{current_version()}:{request.accepted_renderer.format}:{path}'
+
+
+def store_encoding(key, encoding, body):
+    """Keep a compressed body next to the cached response it was made from."""
+    entry = cache.get(key)
+    if entry is not None:
+        entry['encodings'][encoding] = body
+        cache.set(key, entry, cache_timeout())
+
+
+class CachedResponseMixin:
+    """
+    Serves GET requests of a DRF view from the response cache. Authentication
+    and permissions still run; only the queries and rendering are skipped.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if request.accepted_renderer.format not in CACHED_FORMATS:
+            return super().get(request, *args, **kwargs)
+
+        key = response_cache_key(request)
+        entry = cache.get(key)
+        registry.record_cache('responses', hits=int(entry is not None), misses=int(entry is None))
+        if entry is not None:
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+            response.precompressed = entry['encodings']
+        else:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.add_post_render_callback(lambda rendered: cache.set(key, {
+                'content': rendered.content,
+                'content_type': rendered['Content-Type'],
+                'encodings': {},
+            }, cache_timeout()))
+        response.response_cache_key = key
+        return response
@@ -0,0 +1,106 @@
+"""
+Read-only list serialization without per-field machinery.
+
+ModelSerializer.to_representation walks every bound field for every row:
+source lookups through get_attribute(), SkipField handling and a
+to_representation() call even for values that are already plain strings
+and numbers. CompiledListSerializer compiles the child serializer's fields
+once per list into a plan: fields whose representation is the model value
+itself read the attribute directly, the rest still go through the DRF
+field. The output is the same as ListSerializer's; writes are unchanged.
+
+Use it with ``list_serializer_class = CompiledListSerializer`` in a
+serializer's Meta.
+"""
+from functools import cached_property
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.utils import timezone
+from rest_framework import ISO_8601, fields, relations, serializers
+from rest_framework.fields import SkipField
+from rest_framework.settings import api_settings
+
+from monitoring.instrumentation import TimedSerializerMixin
+
+# Serializer field -> model fields whose values it represents unchanged
+PASSTHROUGH_FIELDS = {
+    fields.CharField: (models.CharField, models.TextField),
+    fields.ChoiceField: (models.CharField,),
+    fields.IntegerField: (models.IntegerField,),
+    fields.FloatField: (models.FloatField,),
+    fields.BooleanField: (models.BooleanField,),
+}
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except (AttributeError, FieldDoesNotExist):
+        return None
+
+
+def _datetime_reader(field, attname):
+    """DateTimeField.to_representation for ISO 8601 output with the timezone resolved once."""
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    get_value = attrgetter(attname)
+
+    def read(instance):
+        value = get_value(instance)
+        if not value:
+            return None
+        if field_timezone is None or not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return read
+
+
+def _compile_field(field, model):
+    """Return a callable reading the field's representation from an instance."""
+    model_field = None
+    if field.source != '*' and '.' not in field.source:
+        model_field = _model_field(model, field.source)
+    if model_field is not None and model_field.concrete:
+        field_type = type(field)
+        if isinstance(model_field, PASSTHROUGH_FIELDS.get(field_type, ())):
+            return attrgetter(model_field.attname)
+        if field_type is relations.PrimaryKeyRelatedField and field.pk_field is None and model_field.is_relation:
+            return attrgetter(model_field.attname)
+        if (field_type is fields.DateTimeField and isinstance(model_field, models.DateTimeField)
+                and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601):
+            return _datetime_reader(field, model_field.attname)
+
+    def represent(instance):
+        attribute = field.get_attribute(instance)
+        if attribute is None:
+            return None
+        return field.to_representation(attribute)
+    return represent
+
+
+class CompiledListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+
+    @cached_property
+    def plan(self):
+        # Compiled once per bound list serializer: a nested list is reused for every parent row
+        model = getattr(getattr(self.child, 'Meta', None), 'model', None)
+        return [
+            (field.field_name, _compile_field(field, model))
+            for field in self.child._readable_fields
+        ]
+
+    def to_representation(self, data):
+        rows = data.all() if isinstance(data, models.manager.BaseManager) else data
+        plan = self.plan
+        representation = []
+        for instance in rows:
+            item = {}
+            for name, read in plan:
+                try:
+                    item[name] = read(instance)
+                except SkipField:
+                    pass
+            representation.append(item)
+        return representation
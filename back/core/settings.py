@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 
@@ -44,23 +46,36 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'corsheaders',
     #Apps
+    'core',
     'tours',
     'listings',
     'deals',
+    'sync',
+    'monitoring',
 
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestTimingMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # After AuthenticationMiddleware, so staff session users can ask for a profile
+    'monitoring.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
 ]
 
+# JSON goes through orjson (core.renderers); MessagePack is negotiated with
+# Accept: application/msgpack when the optional msgpack package is installed.
+
+MSGPACK_AVAILABLE = find_spec('msgpack') is not None
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -68,6 +83,17 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        *(['core.renderers.MessagePackRenderer'] if MSGPACK_AVAILABLE else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        *(['core.parsers.MessagePackParser'] if MSGPACK_AVAILABLE else []),
+    ],
 }
 
 SIMPLE_JWT = {
@@ -100,7 +126,110 @@ WSGI_APPLICATION = 'core.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+# Read replicas: a comma-separated list of SQLite files, e.g.
+# DATABASE_REPLICAS=replica1.sqlite3,replica2.sqlite3. Refresh them from the
+# primary with `manage.py sync_replicas`. Safe requests read listings, tours
+# and deals from a replica unless the client wrote within REPLICA_PIN_SECONDS.
+
+for index, replica_path in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / replica_path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+
+# SOLD properties older than this many days are moved to the archive tables
+# by `manage.py archive_sold_listings` (listings.archive).
+
+ARCHIVE_SOLD_AFTER_DAYS = int(os.environ.get('ARCHIVE_SOLD_AFTER_DAYS', 365))
+
+
+# `manage.py expire_tours` (tours.lifecycle) marks Scheduled tours Completed
+# TOUR_COMPLETE_AFTER_MINUTES after they end, and deletes Cancelled tours
+# that ended more than CANCELLED_TOUR_RETENTION_DAYS ago.
+
+TOUR_COMPLETE_AFTER_MINUTES = int(os.environ.get('TOUR_COMPLETE_AFTER_MINUTES', 30))
+CANCELLED_TOUR_RETENTION_DAYS = int(os.environ.get('CANCELLED_TOUR_RETENTION_DAYS', 90))
+
+
+# Request instrumentation (monitoring.middleware.RequestTimingMiddleware):
+# requests slower than SLOW_REQUEST_MS or issuing more than MAX_QUERIES are
+# logged with their slowest statements, and a query repeated
+# N_PLUS_ONE_THRESHOLD times in one request is reported as a likely N+1.
+# Staff requests sending an X-Profile header, plus a PROFILE_SAMPLE_RATE
+# share of all requests, are profiled and kept in the admin
+# (monitoring.middleware.ProfilingMiddleware).
+
+MONITORING = {
+    'SLOW_REQUEST_MS': 500,
+    'MAX_QUERIES': 50,
+    'N_PLUS_ONE_THRESHOLD': 10,
+    'LOGGED_SLOW_QUERIES': 5,
+    'PROFILE_SAMPLE_RATE': float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    'MAX_STORED_PROFILES': 500,
+}
+
+# Prometheus metrics at /metrics. With several worker processes, point
+# METRICS_DIR at a directory shared by them so any worker can report the
+# totals of all. Scrapers send METRICS_TOKEN as a bearer token; without one
+# /metrics is only served when DEBUG is on.
+
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+# Response compression (core.compression.CompressionMiddleware): gzip, or
+# Brotli when the optional brotli package is installed, for allowlisted
+# content types of at least MIN_SIZE bytes.
+
+COMPRESSION = {
+    'MIN_SIZE': 1024,
+    'CONTENT_TYPES': (
+        'application/json', 'application/msgpack', 'text/html', 'text/plain', 'text/css', 'text/csv',
+        'application/javascript',
+    ),
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+# Rendered listing responses (core.response_cache) are kept this many
+# seconds at most; writes to listings invalidate them sooner.
+
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60))
+
+
+# Per-user dashboards (deals.dashboard) are kept this many seconds at most;
+# writes touching a user drop theirs sooner.
+
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 300))
+
+
+# Batch endpoint (core.batch): at most MAX_REQUESTS sub-requests per call;
+# with "parallel": true, consecutive GETs run on up to MAX_WORKERS threads.
+
+BATCH = {
+    'MAX_REQUESTS': int(os.environ.get('BATCH_MAX_REQUESTS', 20)),
+    'MAX_WORKERS': int(os.environ.get('BATCH_MAX_WORKERS', 4)),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Process-local by default; point this at a shared backend when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'realestate-default',
     }
 }
 
@@ -0,0 +1,52 @@
+"""
+Production settings profile.
+
+    DJANGO_SETTINGS_MODULE=core.settings_production
+
+Builds on core.settings and tunes SQLite for concurrent traffic:
+
+- WAL journaling lets readers proceed while a write is in progress.
+- synchronous=NORMAL is durable under WAL except for the last commits
+  before a power loss, and avoids an fsync per transaction.
+- A busy timeout makes writers wait for the lock instead of failing with
+  "database is locked", and IMMEDIATE transactions take the write lock up
+  front, so a read-then-write transaction cannot deadlock with another.
+- Memory-mapped I/O and a larger page cache cut syscalls for reads.
+- Persistent connections keep the per-connection PRAGMAs and page cache
+  warm instead of reopening the file on every request.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, SECRET_KEY
+
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+
+
+SQLITE_BUSY_TIMEOUT = 20                 # seconds
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024     # bytes
+SQLITE_CACHE_SIZE = -64 * 1024           # negative = KiB, i.e. 64 MiB per connection
+
+SQLITE_INIT_COMMAND = ';'.join((
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+    f'PRAGMA cache_size={SQLITE_CACHE_SIZE}',
+    'PRAGMA temp_store=MEMORY',
+))
+
+for database in DATABASES.values():
+    if database['ENGINE'] != 'django.db.backends.sqlite3':
+        continue
+    database['CONN_MAX_AGE'] = int(os.environ.get('CONN_MAX_AGE', 600))
+    database['CONN_HEALTH_CHECKS'] = True
+    database.setdefault('OPTIONS', {}).update({
+        'timeout': SQLITE_BUSY_TIMEOUT,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': SQLITE_INIT_COMMAND,
+    })
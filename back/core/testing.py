@@ -0,0 +1,21 @@
+"""Helpers shared by the apps' tests."""
+from django.core.signals import request_started
+
+
+class NoIndexWarmingMixin:
+    """
+    Keeps the first request of a test from loading the sales indexes on
+    worker threads (see deals.apps), which would read the test database
+    while the test writes to it.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from deals.scoring import price_scorer
+        from deals.valuation import comparable_sales
+
+        for index, dispatch_uid in ((price_scorer, 'deals-warm-price-scorer'),
+                                    (comparable_sales, 'deals-warm-comparable-sales')):
+            request_started.disconnect(dispatch_uid=dispatch_uid)
+            cls.addClassCleanup(request_started.connect, index.warm, dispatch_uid=dispatch_uid)
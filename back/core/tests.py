@@ -0,0 +1,99 @@
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from listings.models import Municipality, Property
+from .db_router import _client_key
+from .testing import NoIndexWarmingMixin
+
+
+class BatchTestMixin(NoIndexWarmingMixin):
+
+    def create_rows(self):
+        self.owner = User.objects.create_user('owner', password='password')
+        self.stranger = User.objects.create_user('stranger', password='password')
+        municipality = Municipality.objects.create(municipality_name='Oslo', price_per_sqm=1000)
+        self.property = Property.objects.create(
+            property_name='Flat', property_address='Street 1', property_municipality=municipality,
+            property_size=50, type='SALE', price=100000, owner=self.owner,
+        )
+
+    def batch(self, user, requests, parallel=False):
+        client = APIClient()
+        if user is not None:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client.post('/api/batch/', {'requests': requests, 'parallel': parallel}, format='json')
+
+
+class BatchTests(BatchTestMixin, TestCase):
+
+    def setUp(self):
+        self.create_rows()
+
+    def test_unauthenticated_batch_is_rejected(self):
+        response = self.batch(None, [{'method': 'GET', 'path': f'/api/properties/{self.property.pk}/'}])
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_sub_requests_act_as_the_batch_user(self):
+        patch = {'method': 'PATCH', 'path': f'/api/properties/{self.property.pk}/', 'body': {'price': 1}}
+
+        response = self.batch(self.stranger, [{'id': 'patch', **patch}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['responses'][0]['status'], 403)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.price, 100000)
+
+        response = self.batch(self.owner, [{'id': 'patch', **patch}])
+
+        self.assertEqual(response.data['responses'][0]['status'], 200)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.price, 1)
+
+
+class ParallelBatchTests(BatchTestMixin, TransactionTestCase):
+    # Parallel reads run on pool threads with their own connections, which only see committed rows
+
+    def setUp(self):
+        self.create_rows()
+
+    def test_writes_keep_their_place_between_parallel_reads(self):
+        path = f'/api/properties/{self.property.pk}/'
+        read = {'method': 'GET', 'path': path}
+
+        response = self.batch(self.owner, [
+            {'id': 'before', **read}, {'id': 'also-before', **read},
+            {'id': 'write', 'method': 'PATCH', 'path': path, 'body': {'price': 120000}},
+            {'id': 'after', **read},
+        ], parallel=True)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data['responses']
+        self.assertEqual([result['id'] for result in results], ['before', 'also-before', 'write', 'after'])
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 200])
+        self.assertEqual([result['body']['price'] for result in results], [100000, 100000, 120000, 120000])
+
+
+class ReplicaPinTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user', password='password')
+        cls.other = User.objects.create_user('other', password='password')
+
+    def key_for(self, user=None, **headers):
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+        return _client_key(RequestFactory().get('/', **headers))
+
+    def test_pin_outlives_a_token_refresh(self):
+        self.assertEqual(self.key_for(self.user), self.key_for(self.user))
+        self.assertNotEqual(self.key_for(self.user), self.key_for(self.other))
+
+    def test_invalid_token_falls_back_to_the_address(self):
+        key = self.key_for(HTTP_AUTHORIZATION='Bearer not-a-token', REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(key, self.key_for(REMOTE_ADDR='10.0.0.1'))
+        self.assertNotEqual(key, self.key_for(REMOTE_ADDR='10.0.0.2'))
@@ -8,9 +8,13 @@ from rest_framework_simplejwt.views import (
 from listings.views import *
 from tours.views import *
 from deals.views import *
+from sync.views import *
+from monitoring.views import MetricsView
+from core.batch import BatchView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     #Auth
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -18,12 +22,18 @@ urlpatterns = [
 
     # Listings
     path('api/properties/', PropertyListCreateView.as_view(), name='property-list-create'),
+    path('api/properties/geo/', PropertyGeoSearchView.as_view(), name='property-geo-search'),
+    path('api/properties/clusters/', PropertyClusterView.as_view(), name='property-clusters'),
     path('api/properties/<int:pk>/', PropertyDetailView.as_view(), name='property-detail'),
+    path('api/properties/<int:pk>/similar/', SimilarPropertyListView.as_view(), name='property-similar-list'),
     path('api/properties/<int:property_id>/images/', PropertyImageListCreateView.as_view(), name='property-image-list-create'),
     path('api/properties/<int:property_id>/amenities/', AmenityListCreateView.as_view(), name='property-amenities-list-create'),
     path('api/properties/<int:property_id>/amenities/<int:pk>/', AmenityDetailView.as_view(), name='property-amenity-detail'),
     path('api/images/<int:pk>/', PropertyImageDetailView.as_view(), name='property-image-detail'),
     path('api/amenities/<int:pk>/', AmenityDetailView.as_view(), name='amenity-detail'),
+    path('api/saved-searches/', SavedSearchListCreateView.as_view(), name='saved-search-list-create'),
+    path('api/saved-searches/<int:pk>/', SavedSearchDetailView.as_view(), name='saved-search-detail'),
+    path('api/saved-searches/notifications/', SavedSearchNotificationListView.as_view(), name='saved-search-notification-list'),
     path('api/municipalities/', MunicipalityListCreateView.as_view(), name='municipality-list-create'),
     path('api/municipalities/<int:pk>/', MunicipalityDetailView.as_view(), name='municipality-detail'),
 
@@ -35,10 +45,25 @@ urlpatterns = [
     path('api/pending-sales/', PendingSaleRequestListView.as_view(), name='pending-sale-request-list'),
     path('api/pending-sales/<int:pk>/', PendingSaleRequestDetailView.as_view(), name='pending-sale-request-detail'),
     path('api/admin-sales/approve/<int:pk>/', AdminSaleApprovalView.as_view(), name='admin-sale-approval'),
+    path('api/properties/<int:pk>/valuation/', PropertyValuationView.as_view(), name='property-valuation'),
+    path('api/me/dashboard/', DashboardView.as_view(), name='dashboard'),
 
     # Tours
     path('api/properties/<int:property_id>/tours/', TourListCreateView.as_view(), name='property-tours-list-create'),
     path('api/properties/<int:property_id>/tours/<int:pk>/', TourDetailView.as_view(), name='property-tour-detail'),
     path('api/tours/<int:pk>/', TourDetailView.as_view(), name='tour-detail'),
 
+    # Async read path
+    path('api/async/properties/', AsyncPropertyListView.as_view(), name='async-property-list'),
+    path('api/async/properties/<int:pk>/', AsyncPropertyDetailView.as_view(), name='async-property-detail'),
+    path('api/async/properties/<int:property_id>/tours/', AsyncTourListView.as_view(), name='async-property-tours-list'),
+    path('api/async/municipalities/', AsyncMunicipalityListView.as_view(), name='async-municipality-list'),
+
+    # Batch
+    path('api/batch/', BatchView.as_view(), name='batch'),
+
+    # Sync
+    path('api/sync/<str:resource>/', ChangeFeedView.as_view(), name='change-feed'),
+    path('api/events/', EventStreamView.as_view(), name='event-stream'),
+
 ]
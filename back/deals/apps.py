@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class DealsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'deals'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .scoring import price_scorer
+        from .valuation import comparable_sales
+
+        # Load the sales history on worker threads before the first sale or valuation needs it
+        request_started.connect(price_scorer.warm, dispatch_uid='deals-warm-price-scorer')
+        request_started.connect(comparable_sales.warm, dispatch_uid='deals-warm-comparable-sales')
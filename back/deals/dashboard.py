@@ -0,0 +1,125 @@
+"""
+The owner and agent dashboard behind /api/me/dashboard/.
+
+One response with the user's listings grouped by status, their upcoming
+tours, the recent sales of their listings and their commission totals,
+built with one query per section whatever the size of the portfolio:
+
+- listings: properties the user owns or is the agent of
+  (property_owner_status_idx, property_agent_status_idx);
+- upcoming tours: scheduled tours the user leads, attends or that are of
+  their listings (tour_agent_start_idx, tour_buyer_start_idx,
+  tour_property_start_idx);
+- recent sales: Sale.objects.visible_to(), archived listings included;
+- commissions: one conditional aggregate (commission_agent_paid_idx).
+
+Dashboards are cached per user, under a key carrying a per-user version.
+The receivers in deals.signals bump the versions of the users a write
+touches once it commits; a dashboard built from data read before the bump
+is stored under the old version and never served. An entry also expires
+when its first upcoming tour starts, so tours age out on time.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from listings.models import Property
+from listings.serializers import PropertySummarySerializer
+from monitoring.metrics import registry
+from tours.models import Tour
+from tours.serializers import TourSerializer
+from .models import Commission, Sale
+from .serializers import CommissionTotalsSerializer, DashboardSaleSerializer
+
+
+CACHE_KEY_PREFIX = 'dashboard'
+UPCOMING_TOURS_LIMIT = 20
+RECENT_SALES_LIMIT = 10
+
+
+def cache_timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def dashboard_version_key(user_id):
+    return f'{CACHE_KEY_PREFIX}-version:{user_id}'
+
+
+def dashboard_cache_key(user_id, version):
+    return f'{CACHE_KEY_PREFIX}:{user_id}:{version}'
+
+
+def _bump_versions(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def invalidate_dashboards(user_ids):
+    """Make the cached dashboards of these users stale once the current transaction commits."""
+    keys = [dashboard_version_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: _bump_versions(keys))
+
+
+def build_dashboard(user):
+    """Return the user's dashboard and how many seconds it may be cached."""
+    now = timezone.now()
+    listings = Property.objects.filter(Q(owner=user) | Q(agent=user))
+    grouped = {status: [] for status, _ in Property.STATUS_TYPES}
+    for listing in PropertySummarySerializer(listings.order_by('-updated_at', '-id'), many=True).data:
+        grouped[listing['status']].append(listing)
+
+    tours = list(
+        Tour.objects.filter(
+            Q(agent=user) | Q(buyer=user) | Q(property__in=listings.values('pk')),
+            status='Scheduled', start_time__gte=now,
+        ).select_related('property', 'agent', 'buyer').order_by('start_time', 'id')[:UPCOMING_TOURS_LIMIT]
+    )
+
+    sales = (
+        Sale.objects.visible_to(user).with_property_facts()
+        .order_by('-date_sold', '-id')[:RECENT_SALES_LIMIT]
+    )
+
+    zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=15, decimal_places=2))
+    commissions = Commission.objects.filter(agent=user).aggregate(
+        unpaid_count=Count('pk', filter=Q(is_paid=False)),
+        unpaid_total=Coalesce(Sum('amount_calculated', filter=Q(is_paid=False)), zero),
+        paid_total=Coalesce(Sum('amount_calculated', filter=Q(is_paid=True)), zero),
+    )
+
+    dashboard = {
+        'listings': grouped,
+        'listing_counts': {status: len(rows) for status, rows in grouped.items()},
+        'upcoming_tours': TourSerializer(tours, many=True).data,
+        'recent_sales': DashboardSaleSerializer(sales, many=True).data,
+        'commissions': CommissionTotalsSerializer(commissions).data,
+        'generated_at': now,
+    }
+    # The first upcoming tour drops off the dashboard when it starts
+    expires_in = timedelta(seconds=cache_timeout())
+    if tours:
+        expires_in = min(expires_in, tours[0].start_time - now)
+    return dashboard, max(int(expires_in.total_seconds()), 1)
+
+
+def dashboard_for(user):
+    """The user's dashboard from the cache, built and stored on a miss."""
+    # Read before building: a write committed meanwhile bumps the version past this key
+    version = cache.get_or_set(dashboard_version_key(user.pk), 1, timeout=None)
+    key = dashboard_cache_key(user.pk, version)
+    dashboard = cache.get(key)
+    registry.record_cache('dashboards', hits=int(dashboard is not None), misses=int(dashboard is None))
+    if dashboard is None:
+        dashboard, timeout = build_dashboard(user)
+        cache.set(key, dashboard, timeout)
+    return dashboard
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0006_sale_admin_notes_sale_approval_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingsalerequest',
+            name='anomaly_score',
+            field=models.FloatField(blank=True, help_text='Robust z-score of the price per sqm against comparable sales', null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0007_pendingsalerequest_anomaly_score'),
+        ('listings', '0009_savedsearch_savedsearchnotification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['updated_at', 'id'], name='sale_updated_idx'),
+        ),
+    ]
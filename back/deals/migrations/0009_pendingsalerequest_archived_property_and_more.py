@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0008_sale_sale_updated_idx'),
+        ('listings', '0011_archivedproperty_archivedamenity_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingsalerequest',
+            name='archived_property',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pending_sale_requests', to='listings.archivedproperty'),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='archived_property',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sale_record', to='listings.archivedproperty'),
+        ),
+        migrations.AlterField(
+            model_name='pendingsalerequest',
+            name='property',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pending_sale_requests', to='listings.property'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='property',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sale_record', to='listings.property'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0009_pendingsalerequest_archived_property_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commission',
+            index=models.Index(fields=['agent', 'is_paid'], name='commission_agent_paid_idx'),
+        ),
+    ]
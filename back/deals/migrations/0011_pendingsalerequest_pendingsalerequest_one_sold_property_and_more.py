@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0010_commission_commission_agent_paid_idx'),
+        ('listings', '0013_property_property_owner_status_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='pendingsalerequest',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('archived_property__isnull', True), ('property__isnull', False)), models.Q(('archived_property__isnull', False), ('property__isnull', True)), _connector='OR'), name='pendingsalerequest_one_sold_property'),
+        ),
+        migrations.AddConstraint(
+            model_name='sale',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('archived_property__isnull', True), ('property__isnull', False)), models.Q(('archived_property__isnull', False), ('property__isnull', True)), _connector='OR'), name='sale_one_sold_property'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0011_pendingsalerequest_pendingsalerequest_one_sold_property_and_more'),
+        ('listings', '0013_property_property_owner_status_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='change_seq',
+            field=models.BigIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['change_seq', 'id'], name='sale_change_idx'),
+        ),
+    ]
@@ -1,10 +1,52 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
-from listings.models import Property
+from listings.models import ArchivedProperty, Property
 from django.contrib.auth.models import User
+from sync.models import ChangeTracked, ChangeTrackedQuerySet
 
 
-class Sale(models.Model):
+# Property fields read through Sale.property or, once the listing is
+# archived, Sale.archived_property
+PROPERTY_FACTS = {
+    'sold_property_id': 'id',
+    'sold_property_name': 'property_name',
+    'sold_municipality_id': 'property_municipality_id',
+    'sold_type': 'type',
+    'sold_size': 'property_size',
+    'sold_bedrooms': 'num_bedrooms',
+    'sold_bathrooms': 'num_bathrooms',
+}
+
+# Exactly one of property and archived_property is set
+SOLD_PROPERTY_SET = (
+    Q(property__isnull=False, archived_property__isnull=True)
+    | Q(property__isnull=True, archived_property__isnull=False)
+)
+
+
+class SaleQuerySet(ChangeTrackedQuerySet):
+
+    def with_property_facts(self):
+        """
+        Annotate each sale with the sold property's facts (PROPERTY_FACTS),
+        whether the property is still live or has been archived.
+        """
+        return self.annotate(**{
+            name: Coalesce(f'property__{field}', f'archived_property__{field}')
+            for name, field in PROPERTY_FACTS.items()
+        })
+
+    def visible_to(self, user):
+        """Sales of properties the user owns or is the agent of."""
+        return self.filter(
+            Q(property__owner=user) | Q(property__agent=user)
+            | Q(archived_property__owner=user) | Q(archived_property__agent=user)
+        )
+
+
+class Sale(ChangeTracked):
     APPROVAL_STATUS_CHOICES = [
         ('PENDING_REVIEW', 'Pending Review'),
         ('APPROVED', 'Approved'),
@@ -12,7 +54,9 @@ class Sale(models.Model):
         ('COMPLETED', 'Completed'),
     ]
 
-    property = models.OneToOneField(Property,on_delete=models.CASCADE,related_name='sale_record')
+    # The archival job moves the link from property to archived_property
+    property = models.OneToOneField(Property,on_delete=models.CASCADE,null=True,blank=True,related_name='sale_record')
+    archived_property = models.OneToOneField(ArchivedProperty,on_delete=models.CASCADE,null=True,blank=True,related_name='sale_record')
     date_sold = models.DateField()
     final_price = models.DecimalField(max_digits=15,decimal_places=2,validators=[MinValueValidator(0)])
     buyer = models.ForeignKey(User,on_delete=models.SET_NULL,null=True,blank=True,related_name='purchases')
@@ -22,8 +66,22 @@ class Sale(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SaleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='sale_updated_idx'),
+            models.Index(fields=['change_seq', 'id'], name='sale_change_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=SOLD_PROPERTY_SET, name='sale_one_sold_property'),
+        ]
+
+    def get_sold_property(self):
+        return self.property or self.archived_property
+
     def __str__(self):
-        return f"Sale of {self.property.property_name} on {self.date_sold} for ₱{self.final_price}"
+        return f"Sale of {self.get_sold_property().property_name} on {self.date_sold} for ₱{self.final_price}"
 
 
 class Commission(models.Model):
@@ -35,6 +93,11 @@ class Commission(models.Model):
     date_paid = models.DateField(auto_now_add=True)
     is_paid = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['agent', 'is_paid'], name='commission_agent_paid_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.amount_calculated and self.sale and self.commission_rate:
             self.amount_calculated = (self.sale.final_price * self.commission_rate) / 100
@@ -52,15 +115,25 @@ class PendingSaleRequest(models.Model):
         ('REJECTED', 'Rejected'),
     ]
 
-    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='pending_sale_requests')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, null=True, blank=True, related_name='pending_sale_requests')
+    archived_property = models.ForeignKey(ArchivedProperty, on_delete=models.CASCADE, null=True, blank=True, related_name='pending_sale_requests')
     final_price = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0)])
     proposed_buyer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='proposed_purchases')
     reason_for_review = models.TextField(help_text="Explanation of why this sale requires admin review")
+    anomaly_score = models.FloatField(blank=True, null=True, help_text="Robust z-score of the price per sqm against comparable sales")
     status = models.CharField(max_length=20, choices=REQUEST_STATUS_CHOICES, default='PENDING')
     admin_notes = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_sale_requests')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=SOLD_PROPERTY_SET, name='pendingsalerequest_one_sold_property'),
+        ]
+
+    def get_sold_property(self):
+        return self.property or self.archived_property
+
     def __str__(self):
-        return f"Pending Sale Request for {self.property.property_name} - {self.status}"
\ No newline at end of file
+        return f"Pending Sale Request for {self.get_sold_property().property_name} - {self.status}"
\ No newline at end of file
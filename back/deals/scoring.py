@@ -0,0 +1,219 @@
+"""
+Price-anomaly scoring for incoming sales.
+
+Sales are compared against the price-per-sqm distribution of past sales in
+the same municipality and listing type. Distributions are built with NumPy
+from the Sale history and kept in process memory.
+
+Refreshes run on a worker thread, never in the request scoring a sale: the
+first request a process serves starts loading the history (see
+deals.apps), and assess() starts a refresh when the last one is more than
+REFRESH_SECONDS old. Each refresh reads the sales changed since the last
+one, through the change-feed sequence (sync.models): new, edited, approved
+or rejected sales, sales whose property was edited, and deleted sales from
+their tombstones. Only the groups those sales enter or leave are
+recomputed.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from django.db import connections
+from django.db.models import Max, Q
+
+from listings.models import Property
+from sync.models import Tombstone
+from .models import Sale
+
+
+logger = logging.getLogger(__name__)
+
+# Sales that count as real market evidence
+SCORED_APPROVAL_STATUSES = ('COMPLETED', 'APPROVED')
+
+# Fewer comparable sales than this and we fall back to the ratio rule
+MIN_SAMPLES = 8
+
+# Robust z-score above which a sale is sent for review (Iglewicz & Hoaglin)
+ANOMALY_THRESHOLD = 3.5
+
+# Scales the MAD so it estimates the standard deviation of a normal sample
+MAD_SCALE = 1.4826
+
+# How stale the distributions may get before assess() starts a refresh
+REFRESH_SECONDS = 5.0
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+TYPE_CODES = {code: index for index, (code, _label) in enumerate(Property.LISTING_TYPES)}
+
+
+@dataclass(frozen=True)
+class PriceDistribution:
+    count: int
+    q05: float
+    q25: float
+    median: float
+    q75: float
+    q95: float
+    mad: float
+
+    @property
+    def spread(self):
+        if self.mad > 0:
+            return self.mad * MAD_SCALE
+        # Over half the sales share one price; fall back to the IQR
+        return (self.q75 - self.q25) / 1.349
+
+    @classmethod
+    def from_samples(cls, samples):
+        q05, q25, median, q75, q95 = np.quantile(samples, QUANTILES)
+        mad = np.median(np.abs(samples - median))
+        return cls(len(samples), float(q05), float(q25), float(median), float(q75), float(q95), float(mad))
+
+
+@dataclass(frozen=True)
+class PriceAssessment:
+    score: float | None = None
+    reason: str = ""
+
+    @property
+    def is_anomalous(self):
+        return self.score is not None and abs(self.score) > ANOMALY_THRESHOLD
+
+
+class PriceAnomalyScorer:
+    """
+    Keeps price-per-sqm samples, keyed by sale id, and their summary
+    statistics per (municipality, listing type) group. Scoring a sale is a
+    dictionary lookup plus a few float operations.
+    """
+
+    def __init__(self):
+        # Held for the whole of a refresh; scoring never waits for it
+        self._lock = threading.Lock()
+        self._samples = {}          # group -> {sale id: price per sqm}
+        self._groups = {}           # sale id -> group
+        self._distributions = {}
+        # Rows written outside the ORM (benchmarks.dataset) keep change_seq 0
+        self._sale_seq = self._property_seq = self._tombstone_seq = -1
+        self._refreshed_at = None
+
+    @staticmethod
+    def _head(queryset):
+        return queryset.aggregate(head=Max('change_seq'))['head'] or 0
+
+    def _read_changes(self):
+        """Sales changed since the last refresh, as (sale id, group or None), and deleted sale ids."""
+        tombstones = Tombstone.objects.filter(model_label=Sale._meta.label_lower)
+        # Read before the changes: anything committed in between is read again next time
+        heads = self._head(Sale.objects.all()), self._head(Property.objects.all()), self._head(tombstones)
+        rows = (
+            Sale.objects.with_property_facts()
+            .filter(Q(change_seq__gt=self._sale_seq) | Q(property__change_seq__gt=self._property_seq))
+            .values_list('id', 'approval_status', 'sold_municipality_id', 'sold_type', 'final_price', 'sold_size')
+        )
+        changed = []
+        for sale_id, approval_status, municipality_id, sold_type, final_price, size in rows.iterator():
+            if approval_status in SCORED_APPROVAL_STATUSES and size and sold_type in TYPE_CODES:
+                changed.append((sale_id, (municipality_id, sold_type), float(final_price) / size))
+            else:
+                changed.append((sale_id, None, None))
+        deleted = list(tombstones.filter(change_seq__gt=self._tombstone_seq).values_list('object_id', flat=True))
+        self._sale_seq, self._property_seq, self._tombstone_seq = heads
+        return changed, deleted
+
+    def _refresh(self):
+        changed, deleted = self._read_changes()
+        touched = set()
+        for sale_id in deleted:
+            group = self._groups.pop(sale_id, None)
+            if group is not None:
+                del self._samples[group][sale_id]
+                touched.add(group)
+        for sale_id, group, price_per_sqm in changed:
+            previous = self._groups.pop(sale_id, None)
+            if previous is not None:
+                del self._samples[previous][sale_id]
+                touched.add(previous)
+            if group is not None:
+                self._groups[sale_id] = group
+                self._samples.setdefault(group, {})[sale_id] = price_per_sqm
+                touched.add(group)
+
+        # Swapped in whole, so assess() never sees a half-updated dictionary
+        distributions = dict(self._distributions)
+        for group in touched:
+            samples = self._samples.get(group)
+            if samples:
+                values = np.fromiter(samples.values(), dtype=np.float64, count=len(samples))
+                distributions[group] = PriceDistribution.from_samples(values)
+            else:
+                self._samples.pop(group, None)
+                distributions.pop(group, None)
+        self._distributions = distributions
+        self._refreshed_at = time.monotonic()
+
+    def refresh(self):
+        """Fold the sales changed since the last refresh into the distributions, waiting for it."""
+        with self._lock:
+            self._refresh()
+
+    def _refresh_in_thread(self):
+        try:
+            self._refresh()
+        except Exception:
+            logger.exception("Price scorer refresh failed")
+        finally:
+            self._lock.release()
+            connections.close_all()
+
+    def refresh_in_background(self):
+        """Start a refresh on a worker thread unless one is already running."""
+        if self._lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_thread, name='price-scorer-refresh', daemon=True).start()
+
+    def warm(self, **kwargs):
+        """Start loading the sales history if it never was; usable as a signal receiver."""
+        if self._refreshed_at is None:
+            self.refresh_in_background()
+
+    def is_stale(self):
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at >= REFRESH_SECONDS
+
+    def distribution_for(self, property_obj):
+        return self._distributions.get((property_obj.property_municipality_id, property_obj.type))
+
+    def assess(self, property_obj, final_price):
+        """
+        Score a proposed sale price against comparable sales. The score is a
+        robust z-score of the price per sqm; it is None when there is not
+        enough history for the property's municipality and type, or while
+        the history is still loading.
+        """
+        if self.is_stale():
+            self.refresh_in_background()
+
+        distribution = self.distribution_for(property_obj)
+        if distribution is None or distribution.count < MIN_SAMPLES or not property_obj.property_size:
+            return PriceAssessment()
+
+        spread = distribution.spread
+        if spread <= 0:
+            return PriceAssessment()
+
+        price_per_sqm = float(final_price) / property_obj.property_size
+        score = (price_per_sqm - distribution.median) / spread
+        direction = "above" if score > 0 else "below"
+        reason = (
+            f"Price per sqm (₱{price_per_sqm:,.2f}) is {abs(score):.1f} robust deviations {direction} "
+            f"the median (₱{distribution.median:,.2f}) of {distribution.count} comparable "
+            f"{property_obj.get_type_display()} sales in {property_obj.get_municipality()}; "
+            f"90% of those sold between ₱{distribution.q05:,.2f} and ₱{distribution.q95:,.2f} per sqm"
+        )
+        return PriceAssessment(score=round(score, 4), reason=reason)
+
+
+price_scorer = PriceAnomalyScorer()
@@ -1,7 +1,9 @@
 from rest_framework import serializers
+from core.serializers import CompiledListSerializer
+from monitoring.instrumentation import TimedSerializerMixin
 from .models import Sale, Commission, PendingSaleRequest
 from listings.models import Property
-from listings.serializers import PropertySerializer
+from listings.serializers import ArchivedPropertySerializer, PropertySerializer
 
 
 class CommissionSerializer(serializers.ModelSerializer):
@@ -12,8 +14,31 @@ class CommissionSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class SaleSerializer(serializers.ModelSerializer):
+class CommissionTotalsSerializer(serializers.Serializer):
+    unpaid_count = serializers.IntegerField()
+    unpaid_total = serializers.DecimalField(max_digits=15, decimal_places=2)
+    paid_total = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class DashboardSaleSerializer(serializers.ModelSerializer):
+    """A sale read from Sale.objects.with_property_facts(), live or archived listing alike."""
+    property_id = serializers.IntegerField(source='sold_property_id', read_only=True)
+    property_name = serializers.CharField(source='sold_property_name', read_only=True)
+    is_archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Sale
+        list_serializer_class = CompiledListSerializer
+        fields = ['id', 'property_id', 'property_name', 'date_sold', 'final_price', 'buyer', 'approval_status',
+                  'is_archived']
+
+    def get_is_archived(self, obj):
+        return obj.archived_property_id is not None
+
+
+class SaleSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     property = PropertySerializer(read_only=True)
+    archived_property = ArchivedPropertySerializer(read_only=True)
     commissions = CommissionSerializer(many=True, read_only=True)
     property_id = serializers.PrimaryKeyRelatedField(queryset=Property.objects.all(), write_only=True)
 
@@ -48,7 +73,7 @@ class SaleCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Sale
-        exclude = ['property']
+        exclude = ['property', 'archived_property']
 
     def validate(self, attrs):
         # If final_price is not provided, automatically set it to the property's total_price
@@ -67,10 +92,10 @@ class SaleCreateSerializer(serializers.ModelSerializer):
 
 
 class PendingSaleRequestSerializer(serializers.ModelSerializer):
-    property_name = serializers.CharField(source='property.property_name', read_only=True)
+    property_name = serializers.CharField(source='get_sold_property.property_name', read_only=True)
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
 
     class Meta:
         model = PendingSaleRequest
         fields = '__all__'
-        read_only_fields = ('status', 'created_at', 'updated_at')
\ No newline at end of file
+        read_only_fields = ('status', 'anomaly_score', 'archived_property', 'created_at', 'updated_at')
\ No newline at end of file
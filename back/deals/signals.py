@@ -0,0 +1,55 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from listings.models import Property
+from tours.models import Tour
+from .dashboard import invalidate_dashboards
+from .models import Commission, Sale
+
+
+def _listing_people(property_id):
+    """Owner and agent ids of a live listing; none once it is gone."""
+    return Property.objects.filter(pk=property_id).values_list('owner_id', 'agent_id').first() or ()
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        # The previous owner and agent lose the listing when either changes
+        invalidate_dashboards([
+            instance.owner_id, instance.agent_id,
+            instance.loaded_value('owner_id'), instance.loaded_value('agent_id'),
+        ])
+
+
+@receiver(post_save, sender=Tour)
+@receiver(post_delete, sender=Tour)
+def invalidate_tour_dashboards(sender, instance, raw=False, origin=None, **kwargs):
+    # Dashboards only list scheduled tours, so deleting any other changes none
+    if raw or (kwargs['signal'] is post_delete and instance.status != 'Scheduled'):
+        return
+    user_ids = [instance.agent_id, instance.buyer_id]
+    # Tours cascading from a deleted property: its own receiver covers the owner and agent
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is not Property:
+        user_ids.extend(_listing_people(instance.property_id))
+    invalidate_dashboards(user_ids)
+
+
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def invalidate_sale_dashboards(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sold_property = instance.get_sold_property()
+    people = [sold_property.owner_id, sold_property.agent_id] if sold_property else []
+    invalidate_dashboards([instance.buyer_id, *people])
+
+
+@receiver(post_save, sender=Commission)
+@receiver(post_delete, sender=Commission)
+def invalidate_commission_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_dashboards([instance.agent_id])
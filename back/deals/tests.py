@@ -1,3 +1,141 @@
+from datetime import date
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core.testing import NoIndexWarmingMixin
+from listings.archive import archive_batch
+from listings.models import Amenity, Municipality, Property
+from .models import PendingSaleRequest, Sale
+from .valuation import ComparableSalesIndex
+
+
+class ComparableSalesIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.municipality = Municipality.objects.create(municipality_name='Oslo', price_per_sqm=1000)
+        cls.subject = cls.create_property(status='ACTIVE')
+
+    @classmethod
+    def create_property(cls, **fields):
+        fields = {
+            'property_name': 'Flat', 'property_address': 'Street 1', 'property_municipality': cls.municipality,
+            'property_size': 50, 'type': 'SALE', 'status': 'SOLD', **fields,
+        }
+        return Property.objects.create(**fields)
+
+    def setUp(self):
+        self.index = ComparableSalesIndex()
+
+    def sell(self, price, **fields):
+        return Sale.objects.create(property=self.create_property(), date_sold=date(2024, 1, 1),
+                                   final_price=price, **fields)
+
+    def comparables(self):
+        self.index.refresh()
+        return {row['sale_id']: row['final_price'] for row in self.index.value(self.subject).comparables}
+
+    def test_sale_approved_later_is_added(self):
+        sale = self.sell(100000, approval_status='PENDING_REVIEW')
+        self.assertEqual(self.comparables(), {})
+
+        sale.approval_status = 'APPROVED'
+        sale.save()
+
+        self.assertEqual(self.comparables(), {sale.pk: 100000})
+
+    def test_rejected_sale_is_removed(self):
+        sale = self.sell(100000)
+        self.assertEqual(self.comparables(), {sale.pk: 100000})
+
+        sale.approval_status = 'REJECTED'
+        sale.save()
+
+        self.assertEqual(self.comparables(), {})
+
+    def test_edited_sale_replaces_its_row(self):
+        sale = self.sell(100000)
+        other = self.sell(120000)
+        self.assertEqual(self.comparables(), {sale.pk: 100000, other.pk: 120000})
+
+        sale.final_price = 110000
+        sale.save()
+
+        self.assertEqual(self.comparables(), {sale.pk: 110000, other.pk: 120000})
+
+    def test_property_and_amenity_edits_are_picked_up(self):
+        sale = self.sell(100000)
+        self.comparables()
+
+        sale.property.property_size = 80
+        sale.property.save()
+        Amenity.objects.create(property=sale.property, name='Sauna', price=1000)
+        self.index.refresh()
+
+        count, columns, _rows = self.index._published
+        live = columns['live']
+        self.assertEqual(columns['size'][live].tolist(), [80])
+        self.assertEqual(columns['amenity_total'][live].tolist(), [1000])
+
+    def test_deleted_sale_is_removed(self):
+        sale = self.sell(100000)
+        kept = self.sell(120000)
+        self.assertEqual(set(self.comparables()), {sale.pk, kept.pk})
+
+        sale.delete()
+
+        self.assertEqual(set(self.comparables()), {kept.pk})
+
+    def test_archived_sale_stays(self):
+        sale = self.sell(100000)
+        self.comparables()
+
+        archive_batch([sale.property_id])
+
+        self.assertEqual(self.comparables(), {sale.pk: 100000})
+        count, columns, _rows = self.index._published
+        self.assertEqual(int(columns['live'].sum()), 1)
+
+    def test_compaction_keeps_live_rows(self):
+        sales = [self.sell(100000 + step) for step in range(3)]
+        self.comparables()
+        sales[0].delete()
+        sales[1].final_price = 150000
+        sales[1].save()
+        self.index.refresh()
+
+        self.index._compact()
+        self.index.refresh()
+
+        self.assertEqual(self.comparables(), {sales[1].pk: 150000, sales[2].pk: 100002})
+        count, columns, _rows = self.index._published
+        self.assertEqual(count, 2)
+
+
+class ArchivedSaleRequestTests(NoIndexWarmingMixin, TestCase):
+
+    def test_archived_request_keeps_its_status(self):
+        admin = User.objects.create_user('admin', password='password', is_staff=True)
+        municipality = Municipality.objects.create(municipality_name='Oslo', price_per_sqm=1000)
+        property_obj = Property.objects.create(
+            property_name='Flat', property_address='Street 1', property_municipality=municipality,
+            property_size=50, type='SALE', status='SOLD',
+        )
+        Sale.objects.create(property=property_obj, date_sold=date(2020, 1, 1), final_price=100000)
+        sale_request = PendingSaleRequest.objects.create(
+            property=property_obj, final_price=100000, status='REJECTED',
+            reason_for_review='Price far above comparable sales', created_by=admin,
+        )
+        archive_batch([property_obj.pk])
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.patch(f'/api/pending-sales/{sale_request.pk}/',
+                                {'status': 'APPROVED', 'admin_notes': 'Checked'}, format='json')
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200, response.data)
+        sale_request.refresh_from_db()
+        self.assertEqual((sale_request.status, sale_request.admin_notes), ('REJECTED', 'Checked'))
+        self.assertEqual(Sale.objects.count(), 1)
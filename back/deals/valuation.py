@@ -0,0 +1,286 @@
+"""
+Comparable-sales valuation.
+
+Features of every sold property are held in flat NumPy columns so that a
+valuation is a handful of vectorised operations over the sales in the
+subject's municipality.
+
+As in deals.scoring, refreshes run on a worker thread: the first request a
+process serves starts loading the sales (see deals.apps), and value()
+starts a refresh when the last one is more than REFRESH_SECONDS old. Each
+refresh reads the sales changed since the last one through the change-feed
+sequence (sync.models): new, edited, approved or rejected sales, sales
+whose property or its amenities were edited or archived, and deleted sales
+from their tombstones. A changed sale's row is marked dead and the sale
+appended again; the columns grow geometrically and are compacted once most
+rows are dead, so refreshing never rebuilds what is still current.
+"""
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from itertools import islice
+
+import numpy as np
+from django.db import connections
+from django.db.models import Exists, Max, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from listings.models import Amenity, Property
+from sync.models import Tombstone
+from .models import Sale
+from .scoring import REFRESH_SECONDS, SCORED_APPROVAL_STATUSES
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_K = 10
+MAX_K = 50
+LOAD_BATCH_SIZE = 50000
+
+# Feature scales: a difference of one unit on each contributes 1 to the distance
+SIZE_LOG_SCALE = math.log(1.25)       # 25% difference in floor area
+ROOM_SCALE = 1.0                      # one bedroom / bathroom
+AMENITY_SCALE = 250000.0              # one luxury amenity
+AGE_SCALE_DAYS = 365.0                # one year since the sale
+# Added to comparables from other municipalities when the subject's has too few sales
+MUNICIPALITY_PENALTY = 2.0
+# Keeps exact matches from taking all the weight
+DISTANCE_SMOOTHING = 0.1
+
+COLUMNS = (
+    ('sale_id', np.int64),
+    ('property_id', np.int64),
+    ('size', np.float32),
+    ('bedrooms', np.float32),
+    ('bathrooms', np.float32),
+    ('municipality', np.int64),
+    ('amenity_total', np.float32),
+    ('sold_on', np.int32),
+    ('price', np.float64),
+    # False once the sale was changed or deleted; a changed sale is appended again
+    ('live', np.bool_),
+)
+
+
+@dataclass(frozen=True)
+class Valuation:
+    property_id: int
+    estimate: int | None
+    comparables: list
+
+    def as_dict(self):
+        return {
+            'property_id': self.property_id,
+            'estimate': self.estimate,
+            'comparables': self.comparables,
+        }
+
+
+class ComparableSalesIndex:
+    """In-memory index of sold property features, keyed by row number."""
+
+    def __init__(self):
+        # Held for the whole of a refresh; valuations never wait for it
+        self._lock = threading.Lock()
+        self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        self._count = 0
+        self._dead = 0
+        self._rows_by_municipality = {}
+        self._row_by_sale = {}
+        # Rows written outside the ORM (benchmarks.dataset) keep change_seq 0
+        self._sale_seq = self._property_seq = self._amenity_seq = self._tombstone_seq = -1
+        self._published = (0, dict(self._columns), {})
+        self._refreshed_at = None
+
+    def _reserve(self, extra):
+        needed = self._count + extra
+        capacity = len(self._columns['sale_id'])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for name, dtype in COLUMNS:
+            grown = np.empty(capacity, dtype=dtype)
+            grown[:self._count] = self._columns[name][:self._count]
+            self._columns[name] = grown
+
+    def _append(self, rows):
+        count = len(rows)
+        if not count:
+            return
+        self._reserve(count)
+        start, end = self._count, self._count + count
+        for position, (name, dtype) in enumerate(COLUMNS[:7]):
+            self._columns[name][start:end] = np.fromiter((row[position] for row in rows), dtype=dtype, count=count)
+        self._columns['sold_on'][start:end] = np.fromiter((row[7].toordinal() for row in rows), dtype=np.int32, count=count)
+        self._columns['price'][start:end] = np.fromiter((row[8] for row in rows), dtype=np.float64, count=count)
+        self._columns['live'][start:end] = True
+
+        municipalities = self._columns['municipality'][start:end]
+        for municipality_id in np.unique(municipalities).tolist():
+            new_rows = np.flatnonzero(municipalities == municipality_id) + start
+            existing = self._rows_by_municipality.get(municipality_id)
+            self._rows_by_municipality[municipality_id] = (
+                new_rows if existing is None else np.concatenate((existing, new_rows))
+            )
+        self._row_by_sale.update((row[0], start + position) for position, row in enumerate(rows))
+        self._count = end
+
+    def _drop(self, sale_ids):
+        for sale_id in sale_ids:
+            row = self._row_by_sale.pop(sale_id, None)
+            if row is not None:
+                self._columns['live'][row] = False
+                self._dead += 1
+
+    def _compact(self):
+        """Rebuild the columns from the live rows once most of them are dead."""
+        keep = np.flatnonzero(self._columns['live'][:self._count])
+        # New arrays: valuations may still be reading the published ones
+        self._columns = {name: column[keep] for name, column in self._columns.items()}
+        self._count, self._dead = len(keep), 0
+        self._row_by_sale = {sale_id: row for row, sale_id in enumerate(self._columns['sale_id'].tolist())}
+        municipalities = self._columns['municipality']
+        self._rows_by_municipality = {
+            municipality_id: np.flatnonzero(municipalities == municipality_id)
+            for municipality_id in np.unique(municipalities).tolist()
+        }
+
+    @staticmethod
+    def _head(queryset):
+        return queryset.aggregate(head=Max('change_seq'))['head'] or 0
+
+    def _refresh(self):
+        tombstones = Tombstone.objects.filter(model_label=Sale._meta.label_lower)
+        # Read before the changes: anything committed in between is read again next time
+        heads = (self._head(Sale.objects.all()), self._head(Property.objects.all()),
+                 self._head(Amenity.objects.all()), self._head(tombstones))
+        rows = (
+            Sale.objects.with_property_facts()
+            .filter(
+                Q(change_seq__gt=self._sale_seq)
+                | Q(property__change_seq__gt=self._property_seq)
+                | Exists(Amenity.objects.filter(property=OuterRef('property_id'), change_seq__gt=self._amenity_seq))
+            )
+            .annotate(amenity_total=Coalesce(
+                Sum('property__amenities__price'), Sum('archived_property__amenities__price'), Value(0)
+            ))
+            .values_list('id', 'sold_property_id', 'sold_size', 'sold_bedrooms', 'sold_bathrooms',
+                         'sold_municipality_id', 'amenity_total', 'date_sold', 'final_price', 'approval_status')
+        )
+        deleted = tombstones.filter(change_seq__gt=self._tombstone_seq).values_list('object_id', flat=True)
+
+        # The published columns are shared with valuations; flags are flipped on a copy
+        self._columns['live'] = self._columns['live'].copy()
+        self._drop(deleted.iterator())
+        rows = rows.iterator(chunk_size=LOAD_BATCH_SIZE)
+        while batch := list(islice(rows, LOAD_BATCH_SIZE)):
+            # A changed sale leaves its old row and, while it still counts, enters a new one
+            self._drop(row[0] for row in batch)
+            self._append([row[:-1] for row in batch if row[-1] in SCORED_APPROVAL_STATUSES and row[2]])
+        if self._dead > max(self._count // 2, 1024):
+            self._compact()
+        self._sale_seq, self._property_seq, self._amenity_seq, self._tombstone_seq = heads
+
+        count = self._count
+        self._published = (count, {name: column[:count] for name, column in self._columns.items()},
+                           dict(self._rows_by_municipality))
+        self._refreshed_at = time.monotonic()
+
+    def refresh(self):
+        """Fold the sales changed since the last refresh into the index, waiting for it."""
+        with self._lock:
+            self._refresh()
+
+    def _refresh_in_thread(self):
+        try:
+            self._refresh()
+        except Exception:
+            logger.exception("Comparable sales refresh failed")
+        finally:
+            self._lock.release()
+            connections.close_all()
+
+    def refresh_in_background(self):
+        """Start a refresh on a worker thread unless one is already running."""
+        if self._lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_thread, name='comparable-sales-refresh', daemon=True).start()
+
+    def warm(self, **kwargs):
+        """Start loading the sales if they never were; usable as a signal receiver."""
+        if self._refreshed_at is None:
+            self.refresh_in_background()
+
+    def is_stale(self):
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at >= REFRESH_SECONDS
+
+    def value(self, property_obj, k=DEFAULT_K, today=None):
+        """
+        Return the k nearest comparable sales for ``property_obj`` and an
+        inverse-distance weighted price estimate. There are none while the
+        sales are still loading.
+        """
+        if self.is_stale():
+            self.refresh_in_background()
+
+        count, columns, rows_by_municipality = self._published
+        if count == 0 or not property_obj.property_size:
+            return Valuation(property_obj.pk, None, [])
+
+        today = (today or timezone.localdate()).toordinal()
+        subject_amenities = float(property_obj.amenity_price_total())
+
+        rows = rows_by_municipality.get(property_obj.property_municipality_id)
+        if rows is not None:
+            rows = rows[columns['live'][rows]]
+        if rows is None or len(rows) < k:
+            rows = np.flatnonzero(columns['live'])
+        rows = rows[columns['property_id'][rows] != property_obj.pk]
+        if len(rows) == 0:
+            return Valuation(property_obj.pk, None, [])
+
+        size = columns['size'][rows]
+        distance_sq = (np.log(size / property_obj.property_size) / SIZE_LOG_SCALE) ** 2
+        distance_sq += ((columns['bedrooms'][rows] - property_obj.num_bedrooms) / ROOM_SCALE) ** 2
+        distance_sq += ((columns['bathrooms'][rows] - property_obj.num_bathrooms) / ROOM_SCALE) ** 2
+        distance_sq += ((columns['amenity_total'][rows] - subject_amenities) / AMENITY_SCALE) ** 2
+        distance_sq += ((today - columns['sold_on'][rows]) / AGE_SCALE_DAYS) ** 2
+        distance_sq += np.where(columns['municipality'][rows] == property_obj.property_municipality_id,
+                                0.0, MUNICIPALITY_PENALTY ** 2)
+        distance = np.sqrt(distance_sq)
+
+        k = min(k, len(rows))
+        nearest = np.argpartition(distance, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        nearest = nearest[np.argsort(distance[nearest])]
+        picked = rows[nearest]
+        picked_distance = distance[nearest]
+
+        # Scale each comparable's structure price to the subject's size, then add the subject's amenities
+        structure_per_sqm = (columns['price'][picked] - columns['amenity_total'][picked]) / columns['size'][picked]
+        adjusted = structure_per_sqm * property_obj.property_size + subject_amenities
+        weights = 1.0 / (picked_distance + DISTANCE_SMOOTHING)
+        weights /= weights.sum()
+        estimate = int(round(float(np.dot(weights, adjusted))))
+
+        comparables = [
+            {
+                'sale_id': int(columns['sale_id'][row]),
+                'property_id': int(columns['property_id'][row]),
+                'final_price': float(columns['price'][row]),
+                'date_sold': date.fromordinal(int(columns['sold_on'][row])).isoformat(),
+                'property_size': int(columns['size'][row]),
+                'num_bedrooms': int(columns['bedrooms'][row]),
+                'num_bathrooms': int(columns['bathrooms'][row]),
+                'distance': round(float(dist), 4),
+                'weight': round(float(weight), 4),
+            }
+            for row, dist, weight in zip(picked.tolist(), picked_distance, weights)
+        ]
+        return Valuation(property_obj.pk, estimate, comparables)
+
+
+comparable_sales = ComparableSalesIndex()
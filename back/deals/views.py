@@ -1,7 +1,13 @@
 from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from .models import Sale, Commission, PendingSaleRequest
 from .serializers import SaleSerializer, SaleCreateSerializer, CommissionSerializer, PendingSaleRequestSerializer
+from .scoring import price_scorer
+from .valuation import comparable_sales, DEFAULT_K, MAX_K
+from .dashboard import dashboard_for
+from core.permissions import IsAdminOrAgentOrOwnerGroup
 from listings.models import Property
 from django.db import transaction
 from decimal import Decimal
@@ -30,9 +36,10 @@ class IsPropertyOwnerOrAgent(permissions.BasePermission):
         if request.user.is_staff:
             return True
         # For object-level permissions (sale records), check against property
-        if hasattr(obj, 'property'):
-            return (request.user == obj.property.owner or
-                   request.user == obj.property.agent)
+        sold_property = obj.get_sold_property() if hasattr(obj, 'get_sold_property') else None
+        if sold_property is not None:
+            return (request.user == sold_property.owner or
+                   request.user == sold_property.agent)
         return False
 
 
@@ -49,10 +56,7 @@ class SaleListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         if self.request.user.is_staff:
             return Sale.objects.all()
-        from django.db.models import Q
-        return Sale.objects.filter(
-            Q(property__owner=self.request.user) | Q(property__agent=self.request.user)
-        )
+        return Sale.objects.visible_to(self.request.user)
 
     def perform_create(self, serializer):
         with transaction.atomic():
@@ -75,13 +79,21 @@ class SaleListCreateView(generics.ListCreateAPIView):
             requires_admin_approval = False
             reason_for_review = ""
 
-            # Compare final_price with property's set price (property.total_price())
-            if final_price > property_set_price * Decimal('2.0'):
-                requires_admin_approval = True
-                reason_for_review = f"Final price ({final_price}) is more than 2x the property set price ({property_set_price})"
-            elif final_price < property_set_price * Decimal('0.5'):
+            # Score the price against comparable sales in the same municipality and type
+            assessment = price_scorer.assess(property_obj, final_price)
+            anomaly_score = assessment.score
+
+            if assessment.is_anomalous:
                 requires_admin_approval = True
-                reason_for_review = f"Final price ({final_price}) is less than half the property set price ({property_set_price})"
+                reason_for_review = assessment.reason
+            elif anomaly_score is None:
+                # Not enough sales history yet, compare with property's set price (property.total_price())
+                if final_price > property_set_price * Decimal('2.0'):
+                    requires_admin_approval = True
+                    reason_for_review = f"Final price ({final_price}) is more than 2x the property set price ({property_set_price})"
+                elif final_price < property_set_price * Decimal('0.5'):
+                    requires_admin_approval = True
+                    reason_for_review = f"Final price ({final_price}) is less than half the property set price ({property_set_price})"
 
             if requires_admin_approval:
                 # Create a pending sale request instead of completing the sale
@@ -90,6 +102,7 @@ class SaleListCreateView(generics.ListCreateAPIView):
                     final_price=final_price,
                     proposed_buyer=buyer,
                     reason_for_review=reason_for_review,
+                    anomaly_score=anomaly_score,
                     created_by=self.request.user
                 )
 
@@ -125,10 +138,7 @@ class SaleDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         if self.request.user.is_staff:
             return Sale.objects.all()
-        from django.db.models import Q
-        return Sale.objects.filter(
-            Q(property__owner=self.request.user) | Q(property__agent=self.request.user)
-        )
+        return Sale.objects.visible_to(self.request.user)
 
 
 class CommissionListView(generics.ListAPIView):
@@ -176,6 +186,11 @@ class PendingSaleRequestDetailView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAdminUser]
 
     def perform_update(self, serializer):
+        if serializer.instance.property_id is None:
+            # Archived with its sold listing: there is no property left to sell or relist
+            serializer.save()
+            return
+
         # When admin approves the request, create the actual sale
         instance = serializer.save()
 
@@ -220,4 +235,37 @@ class AdminSaleApprovalView(generics.UpdateAPIView):
     queryset = Sale.objects.filter(approval_status='PENDING_REVIEW')
     serializer_class = SaleSerializer
     authentication_classes = [JWTAuthentication]
-    permission_classes = [permissions.IsAdminUser]
\ No newline at end of file
+    permission_classes = [permissions.IsAdminUser]
+
+
+class PropertyValuationView(generics.RetrieveAPIView):
+    """
+    Suggested price for a property from its k nearest comparable sales
+    """
+    queryset = Property.objects.all()
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminOrAgentOrOwnerGroup]
+
+    def retrieve(self, request, *args, **kwargs):
+        property_obj = self.get_object()
+
+        try:
+            k = int(request.query_params.get('k', DEFAULT_K))
+        except ValueError:
+            raise ValidationError({'k': 'Must be an integer.'})
+        if not 1 <= k <= MAX_K:
+            raise ValidationError({'k': f'Must be between 1 and {MAX_K}.'})
+
+        valuation = comparable_sales.value(property_obj, k=k)
+        return Response(valuation.as_dict())
+
+
+class DashboardView(generics.GenericAPIView):
+    """
+    The user's listings by status, upcoming tours, recent sales and commission totals
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminOrAgentOrOwnerGroup]
+
+    def get(self, request, *args, **kwargs):
+        return Response(dashboard_for(request.user))
@@ -6,4 +6,10 @@ from .models import *
 admin.site.register(Property)
 admin.site.register(Municipality)
 admin.site.register(Amenity)
-admin.site.register(PropertyImage)
\ No newline at end of file
+admin.site.register(PropertyImage)
+admin.site.register(SimilarProperty)
+admin.site.register(SavedSearch)
+admin.site.register(SavedSearchNotification)
+admin.site.register(ArchivedProperty)
+admin.site.register(ArchivedAmenity)
+admin.site.register(ArchivedPropertyImage)
@@ -0,0 +1,104 @@
+"""
+Archival of sold listings.
+
+SOLD properties are kept out of the listing endpoints but would otherwise
+stay in the live tables forever, growing every index the active-listing
+queries use. The archival job moves old SOLD properties, with their
+amenities, images and tours, into the Archived* tables one batch per
+transaction. Rows keep their ids, so sales and pending sale requests are
+relinked to the archived property and Sale.objects.with_property_facts()
+reads either side. Image files are not moved.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from deals.models import PendingSaleRequest, Sale
+from tours.models import ArchivedTour, Tour
+from .models import (
+    Amenity, ArchivedAmenity, ArchivedProperty, ArchivedPropertyImage, Property, PropertyImage,
+)
+
+
+DEFAULT_BATCH_SIZE = 500
+
+# Live model -> archive model, in insertion order
+ARCHIVED_MODELS = (
+    (Property, ArchivedProperty),
+    (Amenity, ArchivedAmenity),
+    (PropertyImage, ArchivedPropertyImage),
+    (Tour, ArchivedTour),
+)
+
+
+def archive_after_days():
+    return getattr(settings, 'ARCHIVE_SOLD_AFTER_DAYS', 365)
+
+
+def archivable(older_than_days=None):
+    """
+    SOLD properties whose sale (or, without one, last change) is older than
+    the cutoff and that have no sale request still waiting for review.
+    """
+    if older_than_days is None:
+        older_than_days = archive_after_days()
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return (
+        Property.objects.filter(status='SOLD')
+        .filter(
+            Q(sale_record__date_sold__lt=timezone.localdate(cutoff))
+            | Q(sale_record__isnull=True, updated_at__lt=cutoff)
+        )
+        .exclude(pending_sale_requests__status='PENDING')
+    )
+
+
+def _copy_rows(live_model, archive_model, filters):
+    fields = [field.attname for field in archive_model._meta.concrete_fields if field.name != 'archived_at']
+    rows = live_model.objects.filter(**filters).values(*fields)
+    return len(archive_model.objects.bulk_create(archive_model(**row) for row in rows))
+
+
+def archive_batch(property_ids):
+    """Move the given properties and their rows to the archive; return the counts copied per model."""
+    copied = {}
+    with transaction.atomic():
+        # Skip properties that stopped being SOLD since they were selected
+        property_ids = list(
+            Property.objects.select_for_update().filter(pk__in=property_ids, status='SOLD')
+            .values_list('pk', flat=True)
+        )
+        for live_model, archive_model in ARCHIVED_MODELS:
+            filters = {'pk__in': property_ids} if live_model is Property else {'property_id__in': property_ids}
+            copied[archive_model._meta.label] = _copy_rows(live_model, archive_model, filters)
+
+        # Relink before deleting, or the CASCADE would take the sales with it
+        Sale.objects.filter(property_id__in=property_ids).update(
+            archived_property_id=F('property_id'), property=None, updated_at=timezone.now()
+        )
+        PendingSaleRequest.objects.filter(property_id__in=property_ids).update(
+            archived_property_id=F('property_id'), property=None, updated_at=timezone.now()
+        )
+        Property.objects.filter(pk__in=property_ids).delete()
+    return copied
+
+
+def archive_sold_properties(older_than_days=None, batch_size=DEFAULT_BATCH_SIZE, limit=None, log=None):
+    """Archive properties in batches of ``batch_size``; return the number of properties archived."""
+    queryset = archivable(older_than_days).order_by('pk').values_list('pk', flat=True)
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        # Archived rows leave the live table, so every batch reads from the head
+        property_ids = list(queryset[:size])
+        if not property_ids:
+            break
+        copied = archive_batch(property_ids)
+        archived += len(property_ids)
+        if log:
+            log(f"Archived {archived} properties "
+                f"({', '.join(f'{count} {label}' for label, count in copied.items())} in the last batch)")
+    return archived
@@ -0,0 +1,103 @@
+"""
+Process-local cache of the municipality table.
+
+Municipalities are few and rarely written, yet nearly every property read
+needs one: for the nested municipality in PropertySerializer and
+ArchivedPropertySerializer, for Property.__str__ (and so every tour's
+property) and ArchivedProperty.__str__, and for base_price().
+The whole table is loaded once per process and lookups are dictionary
+reads instead of joins.
+
+Writes bump a version number in the shared cache (see listings.signals)
+and mark this process's copy stale, so its next lookup off the event loop
+reloads it; lookups on the event loop keep using the stale copy. Other processes compare versions
+at most every VERSION_CHECK_SECONDS and reload when theirs is stale; an
+id missing from the copy also triggers a reload, so a municipality created
+elsewhere is found immediately.
+
+The cached instances are shared between threads: read them, don't modify
+or save them. Async views call ``await municipality_cache.aensure_current()``
+before serializing; on the event loop lookups use the copy already loaded.
+"""
+import asyncio
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .models import Municipality
+
+
+VERSION_CACHE_KEY = 'municipality-cache:version'
+VERSION_CHECK_SECONDS = 1.0
+
+
+def _on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class MunicipalityCache:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _load(self, version):
+        self._by_id = {municipality.pk: municipality for municipality in Municipality.objects.order_by('pk')}
+        self._version = version
+        self._checked_at = time.monotonic()
+
+    def _ensure_current(self, force=False):
+        if self._by_id is not None and _on_event_loop():
+            return
+        if not force and self._by_id is not None and time.monotonic() - self._checked_at < VERSION_CHECK_SECONDS:
+            return
+        version = cache.get_or_set(VERSION_CACHE_KEY, 1, timeout=None)
+        if force or version != self._version or self._by_id is None:
+            self._load(version)
+        else:
+            self._checked_at = time.monotonic()
+
+    def ensure_current(self):
+        with self._lock:
+            self._ensure_current()
+
+    async def aensure_current(self):
+        await sync_to_async(self.ensure_current)()
+
+    def get(self, municipality_id):
+        """The municipality with this id, or None when there is none."""
+        with self._lock:
+            self._ensure_current()
+            municipality = self._by_id.get(municipality_id)
+            if municipality is None and municipality_id is not None and not _on_event_loop():
+                self._ensure_current(force=True)
+                municipality = self._by_id.get(municipality_id)
+            return municipality
+
+    def all(self):
+        """Every municipality, ordered by id."""
+        with self._lock:
+            self._ensure_current()
+            return list(self._by_id.values())
+
+    def invalidate(self, **kwargs):
+        """Make every process reload its copy on its next check; usable as a signal receiver."""
+        with self._lock:
+            # Keep the dictionary: lookups on the event loop never load it
+            self._version = None
+            self._checked_at = 0.0
+            try:
+                cache.incr(VERSION_CACHE_KEY)
+            except ValueError:
+                cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+
+
+municipality_cache = MunicipalityCache()
@@ -0,0 +1,112 @@
+"""
+Map clusters for zoomed-out views.
+
+A zoom level maps to a geohash precision; properties whose geo_cell share
+that prefix form one cluster. Clusters are computed and cached per tile, a
+coarser geohash cell, so a request is served from cache or with one grouped
+query for the tiles it is missing.
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Count, Max, Min, Q
+from django.db.models.functions import Substr
+
+from monitoring.metrics import registry
+from . import geo
+from .models import Property
+
+
+MAX_ZOOM = 20
+MAX_TILES = 64
+CACHE_TIMEOUT = 60 * 10
+CACHE_KEY_PREFIX = 'property-clusters'
+CLUSTERED_STATUSES = ('ACTIVE', 'UNDER_REVIEW')
+
+# Geohash precision of a cluster at each web-map zoom level
+ZOOM_PRECISION = (2, 2, 2, 3, 3, 4, 4, 4, 5, 5, 6, 6, 7, 7, 7, 8, 8, 8, 9, 9, 9)
+
+# Each tile holds up to 32 x 32 clusters
+TILE_PRECISION_OFFSET = 2
+
+
+def cluster_precision(zoom):
+    return ZOOM_PRECISION[max(0, min(zoom, MAX_ZOOM))]
+
+
+def tile_precision(precision):
+    return max(1, precision - TILE_PRECISION_OFFSET)
+
+
+def tile_cache_key(precision, tile):
+    return f'{CACHE_KEY_PREFIX}:{precision}:{tile}'
+
+
+def _query_tiles(precision, tiles):
+    """Compute clusters for ``tiles`` with one grouped query."""
+    range_filter = Q()
+    for start, end in geo.cell_ranges(tiles):
+        range_filter |= Q(geo_cell__gte=start, geo_cell__lt=end)
+
+    rows = (
+        Property.objects.filter(range_filter, status__in=CLUSTERED_STATUSES)
+        .annotate(cell=Substr('geo_cell', 1, precision))
+        .values('cell')
+        .annotate(
+            count=Count('id'),
+            first_id=Min('id'),
+            latitude=Avg('latitude'),
+            longitude=Avg('longitude'),
+            min_price=Min('price'),
+            max_price=Max('price'),
+        )
+        .order_by()
+    )
+
+    per_tile = {tile: [] for tile in tiles}
+    prefix_length = tile_precision(precision)
+    for row in rows:
+        per_tile[row['cell'][:prefix_length]].append({
+            'cell': row['cell'],
+            'count': row['count'],
+            'property_id': row['first_id'] if row['count'] == 1 else None,
+            'latitude': row['latitude'],
+            'longitude': row['longitude'],
+            'min_price': row['min_price'],
+            'max_price': row['max_price'],
+        })
+    return per_tile
+
+
+def clusters_in_bbox(min_lat, min_lng, max_lat, max_lng, zoom):
+    """
+    Return the clusters of every tile overlapping the bounding box, or None
+    when the box spans more than MAX_TILES tiles at this zoom level.
+    """
+    precision = cluster_precision(zoom)
+    tiles = geo.cells_in_bbox(min_lat, min_lng, max_lat, max_lng, tile_precision(precision), MAX_TILES)
+    if tiles is None:
+        return None
+
+    keys = {tile_cache_key(precision, tile): tile for tile in tiles}
+    cached = cache.get_many(list(keys))
+    clusters_by_tile = {keys[key]: value for key, value in cached.items()}
+
+    missing = [tile for tile in tiles if tile not in clusters_by_tile]
+    registry.record_cache('property-clusters', hits=len(clusters_by_tile), misses=len(missing))
+    if missing:
+        computed = _query_tiles(precision, missing)
+        cache.set_many({tile_cache_key(precision, tile): value for tile, value in computed.items()}, CACHE_TIMEOUT)
+        clusters_by_tile.update(computed)
+
+    return [cluster for tile in tiles for cluster in clusters_by_tile[tile]]
+
+
+def invalidate_cells(*cells):
+    """Drop every cached tile, at every zoom level, that contains one of ``cells``."""
+    keys = set()
+    for cell in cells:
+        if not cell:
+            continue
+        for precision in set(ZOOM_PRECISION):
+            keys.add(tile_cache_key(precision, cell[:tile_precision(precision)]))
+    if keys:
+        cache.delete_many(list(keys))
@@ -0,0 +1,85 @@
+"""
+Denormalized list-card fields on Property.
+
+primary_image and the image, amenity and upcoming tour counts are derived
+from other tables so that list cards render from the property row alone.
+refresh_counters() recomputes them with a single UPDATE of correlated
+subqueries. The signals in listings.signals call it after single-row
+writes; code writing images, amenities or tours in bulk calls it itself,
+and deletes such rows inside ``refreshed_by_caller()`` so the signals
+don't refresh the counters once per row deleted.
+
+A tour stops being upcoming when its start time passes, which no write
+records: run `manage.py repair_property_counters` periodically to age the
+tour counts and to repair anything written around the ORM.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.response_cache import bump_version
+from tours.models import Tour
+from .models import Amenity, Property, PropertyImage
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+_caller_refreshes = threading.local()
+
+
+@contextmanager
+def refreshed_by_caller():
+    """Within the block, the signals in listings.signals leave the counters to the caller."""
+    _caller_refreshes.depth = getattr(_caller_refreshes, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _caller_refreshes.depth -= 1
+
+
+def is_refreshed_by_caller():
+    return getattr(_caller_refreshes, 'depth', 0) > 0
+
+
+def _count(queryset):
+    return Coalesce(Subquery(
+        queryset.filter(property=OuterRef('pk')).order_by().values('property')
+        .annotate(count=Count('pk')).values('count')
+    ), Value(0))
+
+
+def refresh_counters(property_ids=None, now=None):
+    """Recompute the card fields of the given properties (all when None); return the rows updated."""
+    now = now or timezone.now()
+    queryset = Property.objects.all() if property_ids is None else Property.objects.filter(pk__in=property_ids)
+    # update() sends no signal to invalidate the cached listing responses
+    bump_version()
+    return queryset.update(
+        # The flagged primary image, else the first one uploaded
+        primary_image=Subquery(
+            PropertyImage.objects.filter(property=OuterRef('pk')).order_by('-is_primary', 'id').values('pk')[:1]
+        ),
+        image_count=_count(PropertyImage.objects.all()),
+        amenity_count=_count(Amenity.objects.all()),
+        upcoming_tour_count=_count(Tour.objects.filter(status='Scheduled', start_time__gte=now)),
+    )
+
+
+def repair_all(batch_size=DEFAULT_BATCH_SIZE, log=None):
+    """Recompute every property's card fields, ``batch_size`` properties per UPDATE."""
+    now = timezone.now()
+    last_id = 0
+    repaired = 0
+    while True:
+        property_ids = list(
+            Property.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not property_ids:
+            return repaired
+        repaired += refresh_counters(property_ids, now)
+        last_id = property_ids[-1]
+        if log:
+            log(f"Repaired {repaired} properties")
@@ -0,0 +1,157 @@
+"""
+Geohash helpers for property map search.
+
+Each property stores the geohash of its coordinates in an indexed column.
+Geohashes sharing a prefix share a cell, so a bounding box can be covered
+by a few prefixes and answered with index range scans before the exact
+coordinate check; no spatial extension is needed.
+"""
+import math
+
+from django.db.models import Q
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9           # ~4.8m x 4.8m cells
+MAX_COVER_CELLS = 32
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Sorts after every geohash character, closing a prefix range
+PREFIX_RANGE_END = '~'
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    """Return the (height, width) of a geohash cell in degrees."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def _cell_span(low, high, origin, step):
+    return int(math.floor((low - origin) / step)), int(math.floor((high - origin) / step))
+
+
+def cells_in_bbox(min_lat, min_lng, max_lat, max_lng, precision, max_cells=None):
+    """
+    Return the sorted geohash cells of ``precision`` that cover the bounding
+    box, or None if that would take more than ``max_cells`` of them.
+    """
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lng, max_lng = max(min_lng, -180.0), min(max_lng, 180.0)
+
+    height, width = cell_size(precision)
+    first_row, last_row = _cell_span(min_lat, max_lat, -90.0, height)
+    first_col, last_col = _cell_span(min_lng, max_lng, -180.0, width)
+    if max_cells is not None and (last_row - first_row + 1) * (last_col - first_col + 1) > max_cells:
+        return None
+
+    cells = set()
+    for row in range(first_row, last_row + 1):
+        latitude = min(-90.0 + (row + 0.5) * height, 90.0)
+        for col in range(first_col, last_col + 1):
+            longitude = min(-180.0 + (col + 0.5) * width, 180.0)
+            cells.add(encode(latitude, longitude, precision))
+    return sorted(cells)
+
+
+def covering_cells(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVER_CELLS):
+    """
+    Return the geohash prefixes, at the finest precision that needs no more
+    than ``max_cells`` of them, whose cells cover the bounding box.
+    """
+    for precision in range(GEOHASH_PRECISION, 1, -1):
+        cells = cells_in_bbox(min_lat, min_lng, max_lat, max_lng, precision, max_cells)
+        if cells is not None:
+            return cells
+    return cells_in_bbox(min_lat, min_lng, max_lat, max_lng, 1)
+
+
+def _next_cell(cell):
+    """Return the geohash immediately after ``cell`` at the same precision, or None."""
+    chars = list(cell)
+    for position in range(len(chars) - 1, -1, -1):
+        index = BASE32.index(chars[position])
+        if index < len(BASE32) - 1:
+            chars[position] = BASE32[index + 1]
+            return ''.join(chars)
+        chars[position] = BASE32[0]
+    return None
+
+
+def cell_ranges(cells):
+    """Merge sorted, equal-length cells into contiguous [start, end) ranges."""
+    ranges = []
+    for cell in cells:
+        end = _next_cell(cell) or PREFIX_RANGE_END
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((cell, end))
+    return ranges
+
+
+def bbox_filter(min_lat, min_lng, max_lat, max_lng, field='geo_cell'):
+    """
+    Build a Q object selecting rows inside the bounding box: geohash range
+    scans prune the candidates, the coordinate ranges make it exact.
+    """
+    prefix_filter = Q()
+    for start, end in cell_ranges(covering_cells(min_lat, min_lng, max_lat, max_lng)):
+        prefix_filter |= Q(**{f'{field}__gte': start, f'{field}__lt': end})
+
+    return prefix_filter & Q(
+        latitude__gte=min_lat,
+        latitude__lte=max_lat,
+        longitude__gte=min_lng,
+        longitude__lte=max_lng,
+    )
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    """Return the (min_lat, min_lng, max_lat, max_lng) box enclosing a circle."""
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(latitude))
+    lng_delta = 180.0 if cos_lat < 1e-9 else min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return latitude - lat_delta, longitude - lng_delta, latitude + lat_delta, longitude + lng_delta
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
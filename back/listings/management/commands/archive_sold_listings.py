@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from listings import archive
+
+
+class Command(BaseCommand):
+    help = "Move old SOLD properties, with their amenities, images and tours, to the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help="Archive properties sold more than this many days ago "
+                                 "(default: settings.ARCHIVE_SOLD_AFTER_DAYS).")
+        parser.add_argument('--batch-size', type=int, default=archive.DEFAULT_BATCH_SIZE,
+                            help="Properties moved per transaction.")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Stop after archiving this many properties.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many properties would be archived.")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archive.archivable(options['older_than_days']).count()
+            self.stdout.write(f"{count} properties would be archived.")
+            return
+
+        started = time.perf_counter()
+        archived = archive.archive_sold_properties(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            log=lambda message: self.stdout.write(message) if options['verbosity'] > 1 else None,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} properties in {elapsed:.1f}s."))
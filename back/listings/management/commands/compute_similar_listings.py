@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from listings import similarity
+
+
+class Command(BaseCommand):
+    help = "Precompute the most similar active listings for each property."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help="Recompute every property instead of only those affected by recent changes.")
+        parser.add_argument('--top-n', type=int, default=similarity.TOP_N,
+                            help="Number of similar listings to keep per property.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['full']:
+            processed = similarity.rebuild_all(options['top_n'])
+        else:
+            processed = similarity.refresh_changed(options['top_n'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated similar listings for {processed} properties in {elapsed:.1f}s."
+        ))
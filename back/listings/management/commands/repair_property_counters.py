@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from listings import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute every property's primary image and image, amenity and upcoming tour counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=counters.DEFAULT_BATCH_SIZE,
+                            help="Properties recomputed per UPDATE.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        repaired = counters.repair_all(
+            batch_size=options['batch_size'],
+            log=lambda message: self.stdout.write(message) if options['verbosity'] > 1 else None,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Repaired counters of {repaired} properties in {elapsed:.1f}s."))
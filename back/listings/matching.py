@@ -0,0 +1,135 @@
+"""
+Saved-search matching for new and repriced listings.
+
+Active saved searches are kept in an in-memory inverted index keyed by
+(municipality, type, price band, bedroom band), with None standing for
+"any". A listing probes the four municipality/type combinations for its
+own bands and only the searches found there are checked exactly, so the
+work per listing does not grow with the number of saved searches.
+
+The index is updated in place when this process writes a saved search.
+Writes from other processes bump a version number in the shared cache,
+and a stale index is rebuilt on the next probe.
+"""
+import math
+import threading
+
+from django.core.cache import cache
+
+from .models import SavedSearch, SavedSearchNotification
+
+
+VERSION_CACHE_KEY = 'saved-search-index:version'
+
+# Price bands double in width: band 1 starts at PRICE_BAND_BASE, band 2 at twice that, ...
+PRICE_BAND_BASE = 100000
+MAX_PRICE_BAND = 24
+MAX_BEDROOM_BAND = 6
+
+
+def price_band(price):
+    if not price or price < PRICE_BAND_BASE:
+        return 0
+    return min(int(math.log2(price / PRICE_BAND_BASE)) + 1, MAX_PRICE_BAND)
+
+
+def bedroom_band(bedrooms):
+    return min(max(bedrooms or 0, 0), MAX_BEDROOM_BAND)
+
+
+def _search_keys(search):
+    municipality = search.municipality_id
+    listing_type = search.type or None
+    first_price = price_band(search.min_price)
+    last_price = MAX_PRICE_BAND if search.max_price is None else price_band(search.max_price)
+    first_bedroom = bedroom_band(search.min_bedrooms)
+    last_bedroom = MAX_BEDROOM_BAND if search.max_bedrooms is None else bedroom_band(search.max_bedrooms)
+    for band in range(first_price, last_price + 1):
+        for bedrooms in range(first_bedroom, last_bedroom + 1):
+            yield (municipality, listing_type, band, bedrooms)
+
+
+class SavedSearchIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {}
+        self._searches = {}
+        self._version = None
+
+    def _add(self, search):
+        self._searches[search.pk] = search
+        for key in _search_keys(search):
+            self._index.setdefault(key, set()).add(search.pk)
+
+    def _remove(self, search_id):
+        search = self._searches.pop(search_id, None)
+        if search is None:
+            return
+        for key in _search_keys(search):
+            bucket = self._index.get(key)
+            if bucket is not None:
+                bucket.discard(search_id)
+                if not bucket:
+                    del self._index[key]
+
+    def _rebuild(self, version):
+        self._index = {}
+        self._searches = {}
+        for search in SavedSearch.objects.filter(is_active=True).iterator(chunk_size=2000):
+            self._add(search)
+        self._version = version
+
+    def _ensure_current(self):
+        version = cache.get_or_set(VERSION_CACHE_KEY, 1, timeout=None)
+        if version != self._version:
+            self._rebuild(version)
+
+    def _bump_version(self):
+        known = self._version
+        try:
+            version = cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+            version = 1
+        # Another process changed searches since we last synced; rebuild on the next probe
+        self._version = version if known is not None and version == known + 1 else None
+
+    def saved(self, search):
+        """Write-through for a created or updated saved search."""
+        with self._lock:
+            self._remove(search.pk)
+            if search.is_active:
+                self._add(search)
+            self._bump_version()
+
+    def deleted(self, search_id):
+        with self._lock:
+            self._remove(search_id)
+            self._bump_version()
+
+    def match(self, property_obj):
+        """Return the active saved searches the listing satisfies."""
+        with self._lock:
+            self._ensure_current()
+            price = price_band(property_obj.price)
+            bedrooms = bedroom_band(property_obj.num_bedrooms)
+            candidate_ids = set()
+            for municipality in (property_obj.property_municipality_id, None):
+                for listing_type in (property_obj.type, None):
+                    candidate_ids |= self._index.get((municipality, listing_type, price, bedrooms), set())
+            return [self._searches[pk] for pk in candidate_ids if self._searches[pk].matches(property_obj)]
+
+
+saved_search_index = SavedSearchIndex()
+
+
+def enqueue_matches(property_obj, reason):
+    """Queue a notification for every saved search, other than the owner's own, the listing matches."""
+    notifications = [
+        SavedSearchNotification(saved_search=search, property=property_obj, reason=reason)
+        for search in saved_search_index.match(property_obj)
+        if search.user_id != property_obj.owner_id
+    ]
+    SavedSearchNotification.objects.bulk_create(notifications)
+    return notifications
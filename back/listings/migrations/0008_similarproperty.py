@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_property_geo_cell_property_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarProperty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField(db_index=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_listings', to='listings.property')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_of', to='listings.property')),
+            ],
+            options={
+                'verbose_name_plural': 'Similar properties',
+                'constraints': [models.UniqueConstraint(fields=('property', 'rank'), name='unique_similar_property_rank')],
+            },
+        ),
+    ]
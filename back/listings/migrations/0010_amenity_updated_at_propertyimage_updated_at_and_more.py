@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0009_savedsearch_savedsearchnotification'),
+        ('tours', '0002_tour_agent_tour_buyer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amenity',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='amenity',
+            index=models.Index(fields=['updated_at', 'id'], name='amenity_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['updated_at', 'id'], name='property_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertyimage',
+            index=models.Index(fields=['updated_at', 'id'], name='propertyimage_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:56
+
+import django.db.models.deletion
+import listings.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0010_amenity_updated_at_propertyimage_updated_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedProperty',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('property_name', models.CharField(max_length=255)),
+                ('property_description', models.TextField(blank=True, null=True)),
+                ('property_address', models.CharField(max_length=1000)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('property_size', models.IntegerField()),
+                ('num_bedrooms', models.IntegerField(default=0)),
+                ('num_bathrooms', models.IntegerField(default=0)),
+                ('price', models.IntegerField(blank=True, null=True)),
+                ('type', models.CharField(choices=[('SALE', 'For Sale'), ('RENT', 'For Rent'), ('LEASE', 'For Lease'), ('FORECLOSURE', 'Foreclosure')], max_length=12)),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('SOLD', 'Sold'), ('UNDER_REVIEW', 'Under Review')], default='SOLD', max_length=15)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_listed_properties', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_owned_properties', to=settings.AUTH_USER_MODEL)),
+                ('property_municipality', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_properties', to='listings.municipality')),
+            ],
+            options={
+                'verbose_name_plural': 'Archived properties',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAmenity',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('amenity_type', models.CharField(choices=[('Basic', 'Basic'), ('Luxury', 'Luxury')], default='Basic', max_length=6)),
+                ('price', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('added_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_added_amenities', to=settings.AUTH_USER_MODEL)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='amenities', to='listings.archivedproperty')),
+            ],
+            options={
+                'verbose_name_plural': 'Archived amenities',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPropertyImage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('image', models.ImageField(upload_to=listings.models.property_image_upload_path)),
+                ('alt_text', models.CharField(blank=True, max_length=200, null=True)),
+                ('is_primary', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='listings.archivedproperty')),
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def keep_first_primary_image(apps, schema_editor):
+    PropertyImage = apps.get_model('listings', 'PropertyImage')
+    duplicated = (
+        PropertyImage.objects.filter(is_primary=True).values('property')
+        .annotate(count=Count('pk'), first=Min('pk')).filter(count__gt=1)
+    )
+    for row in duplicated:
+        PropertyImage.objects.filter(property_id=row['property'], is_primary=True).exclude(pk=row['first']).update(
+            is_primary=False
+        )
+
+
+def fill_card_fields(apps, schema_editor):
+    # Same computation as listings.counters.refresh_counters, on the historical models
+    Property = apps.get_model('listings', 'Property')
+    PropertyImage = apps.get_model('listings', 'PropertyImage')
+    Amenity = apps.get_model('listings', 'Amenity')
+    Tour = apps.get_model('tours', 'Tour')
+
+    def count(queryset):
+        return Coalesce(Subquery(
+            queryset.filter(property=OuterRef('pk')).order_by().values('property')
+            .annotate(count=Count('pk')).values('count')
+        ), Value(0))
+
+    Property.objects.update(
+        primary_image=Subquery(
+            PropertyImage.objects.filter(property=OuterRef('pk')).order_by('-is_primary', 'id').values('pk')[:1]
+        ),
+        image_count=count(PropertyImage.objects.all()),
+        amenity_count=count(Amenity.objects.all()),
+        upcoming_tour_count=count(Tour.objects.filter(status='Scheduled', start_time__gte=timezone.now())),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_archivedproperty_archivedamenity_and_more'),
+        ('tours', '0004_archivedtour'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='amenity_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='image_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='listings.propertyimage'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='upcoming_tour_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(keep_first_primary_image, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='propertyimage',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('property',), name='unique_primary_image'),
+        ),
+        migrations.RunPython(fill_card_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_property_amenity_count_property_image_count_and_more'),
+        ('tours', '0004_archivedtour'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['owner', 'status'], name='property_owner_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['agent', 'status'], name='property_agent_status_idx'),
+        ),
+    ]
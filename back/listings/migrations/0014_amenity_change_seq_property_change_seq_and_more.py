@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_property_property_owner_status_idx_and_more'),
+        ('tours', '0006_tour_tour_status_end_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amenity',
+            name='change_seq',
+            field=models.BigIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='change_seq',
+            field=models.BigIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='change_seq',
+            field=models.BigIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='amenity',
+            index=models.Index(fields=['change_seq', 'id'], name='amenity_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['change_seq', 'id'], name='property_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertyimage',
+            index=models.Index(fields=['change_seq', 'id'], name='propertyimage_change_idx'),
+        ),
+    ]
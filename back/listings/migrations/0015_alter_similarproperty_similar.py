@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_amenity_change_seq_property_change_seq_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='similarproperty',
+            name='similar',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='similar_of', to='listings.property'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
-from django.core.validators import MinValueValidator
+from django.utils import timezone
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
+from sync.models import ChangeTracked
 from tours.models import Tour
+from . import geo
 
 class Municipality(models.Model):
     municipality_name = models.CharField(max_length=100)
@@ -13,7 +16,7 @@ class Municipality(models.Model):
     def __str__(self):
         return self.municipality_name
 
-class Property(models.Model):
+class Property(ChangeTracked):
     LISTING_TYPES= [
         ("SALE", "For Sale"),
         ("RENT", "For Rent"),
@@ -28,6 +31,9 @@ class Property(models.Model):
     property_name = models.CharField(max_length=255)
     property_description = models.TextField(blank=True, null=True)
     property_address = models.CharField(max_length=1000)
+    latitude = models.FloatField(validators=[MinValueValidator(-90), MaxValueValidator(90)], blank=True, null=True)
+    longitude = models.FloatField(validators=[MinValueValidator(-180), MaxValueValidator(180)], blank=True, null=True)
+    geo_cell = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False)
     property_municipality = models.ForeignKey(Municipality, on_delete=models.CASCADE, related_name="properties")
     owner = models.ForeignKey(User,on_delete=models.SET_NULL,null=True,blank=True,related_name="owned_properties")
     agent = models.ForeignKey(User,on_delete=models.SET_NULL,null=True,blank=True,related_name="listed_properties")
@@ -39,54 +45,118 @@ class Property(models.Model):
     is_available_for_tour = models.BooleanField(default=False)
     property_tours = models.ManyToManyField(Tour,blank=True,related_name="properties_on_tour")
     status = models.CharField(max_length=15, choices=STATUS_TYPES, default="ACTIVE")
+    # Denormalized for list cards; written only by listings.counters
+    primary_image = models.ForeignKey('PropertyImage', on_delete=models.SET_NULL, null=True, blank=True,
+                                      editable=False, related_name='+')
+    image_count = models.PositiveIntegerField(default=0, editable=False)
+    amenity_count = models.PositiveIntegerField(default=0, editable=False)
+    upcoming_tour_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Fields whose changes invalidate derived data (map clusters, saved search matches)
+    TRACKED_FIELDS = ('geo_cell', 'status', 'price')
+    COUNTER_FIELDS = ('primary_image', 'image_count', 'amenity_count', 'upcoming_tour_count')
+
     class Meta:
         verbose_name_plural = "Properties"
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='property_updated_idx'),
+            models.Index(fields=['change_seq', 'id'], name='property_change_idx'),
+            # Dashboards (deals.dashboard)
+            models.Index(fields=['owner', 'status'], name='property_owner_status_idx'),
+            models.Index(fields=['agent', 'status'], name='property_agent_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def loaded_value(self, field_name):
+        """Value of a tracked field as it was last read from or written to the database."""
+        return getattr(self, '_loaded_values', {}).get(field_name)
+
+    def changed_fields(self):
+        """Tracked fields changed since the instance was loaded; all of them if it never was."""
+        if not hasattr(self, '_loaded_values'):
+            return set(self.TRACKED_FIELDS)
+        return {
+            name for name in self.TRACKED_FIELDS
+            if name in self._loaded_values and self._loaded_values[name] != self.__dict__.get(name)
+        }
+
+    def get_municipality(self):
+        """The property's municipality from the process-local cache (listings.cache)."""
+        from .cache import municipality_cache
+        return municipality_cache.get(self.property_municipality_id)
 
     def base_price(self):
-        if self.property_municipality and self.property_size:
-            return self.property_size * self.property_municipality.price_per_sqm
+        municipality = self.get_municipality()
+        if municipality and self.property_size:
+            return self.property_size * municipality.price_per_sqm
         return 0
 
     def amenity_price_total(self):
-
-        total = 0
-        for amenity in self.amenities.all():
-            if amenity.amenity_type == "Basic" and amenity.price > 100000:
-                total += 100000  
-            elif amenity.amenity_type == "Luxury" and amenity.price > 250000:
-                total += 250000  
-            else:
-                total += amenity.price
-        return total
+        return sum(Amenity.capped_price(amenity.amenity_type, amenity.price) for amenity in self.amenities.all())
 
     def total_price(self):
         return self.base_price() + self.amenity_price_total()
 
     def save(self, *args, **kwargs):
         if not self.pk and (self.price is None or self.price == 0):
-            self.price = self.total_price() 
+            # An unsaved property has no amenities yet; PropertyCreateSerializer adds theirs to the price
+            self.price = self.base_price()
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geo_cell = None
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Don't write back counters that were refreshed since this instance was loaded
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
+        self._loaded_values = {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
 
     def __str__(self):
-        return f"{self.type} in {self.property_municipality}, {self.property_name} at ₱{self.price:,}"
+        return f"{self.type} in {self.get_municipality()}, {self.property_name} at ₱{self.price:,}"
 
 def property_image_upload_path(instance, filename):
     return f'propertyimg/property_{instance.property.id}/{filename}'
 
-class PropertyImage(models.Model):
+class PropertyImage(ChangeTracked):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to=property_image_upload_path)
     alt_text = models.CharField(max_length=200, blank=True, null=True)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='propertyimage_updated_idx'),
+            models.Index(fields=['change_seq', 'id'], name='propertyimage_change_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['property'], condition=models.Q(is_primary=True),
+                                    name='unique_primary_image'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.is_primary:
+            # A new primary image replaces the old one
+            PropertyImage.objects.filter(property_id=self.property_id, is_primary=True).exclude(pk=self.pk).update(
+                is_primary=False, updated_at=timezone.now()
+            )
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Image for {self.property.property_name}"
 
-class Amenity(models.Model):
+class Amenity(ChangeTracked):
     AMENITY_TYPES = [("Basic", "Basic"), ("Luxury", "Luxury")]
 
     property = models.ForeignKey(
@@ -105,20 +175,159 @@ class Amenity(models.Model):
         related_name="added_amenities"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Amenities"
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='amenity_updated_idx'),
+            models.Index(fields=['change_seq', 'id'], name='amenity_change_idx'),
+        ]
+
+    PRICE_CAPS = {"Basic": 100000, "Luxury": 250000}
+
+    @classmethod
+    def capped_price(cls, amenity_type, price):
+        cap = cls.PRICE_CAPS.get(amenity_type)
+        return min(price, cap) if cap is not None else price
 
     def save(self, *args, **kwargs):
-        if self.amenity_type == "Basic" and self.price > 100000:
-            self.price = 100000
-        elif self.amenity_type == "Luxury" and self.price > 250000:
-            self.price = 250000
+        self.price = self.capped_price(self.amenity_type, self.price)
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.name} in {self.property}"
 
 
+class SimilarProperty(models.Model):
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="similar_listings")
+    # Left in place when the similar property is deleted, so listings.similarity
+    # can find and recompute the lists that pointed at it; joins drop them meanwhile
+    similar = models.ForeignKey(Property, on_delete=models.DO_NOTHING, db_constraint=False, related_name="similar_of")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Similar properties"
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'rank'], name='unique_similar_property_rank'),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} similar to {self.property_id}: {self.similar_id}"
+
+
+class SavedSearch(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="saved_searches")
+    name = models.CharField(max_length=100, blank=True)
+    municipality = models.ForeignKey(Municipality, on_delete=models.CASCADE, null=True, blank=True, related_name="saved_searches")
+    type = models.CharField(max_length=12, choices=Property.LISTING_TYPES, blank=True, null=True)
+    min_price = models.IntegerField(validators=[MinValueValidator(0)], blank=True, null=True)
+    max_price = models.IntegerField(validators=[MinValueValidator(0)], blank=True, null=True)
+    min_bedrooms = models.IntegerField(validators=[MinValueValidator(0)], blank=True, null=True)
+    max_bedrooms = models.IntegerField(validators=[MinValueValidator(0)], blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Saved searches"
+
+    def matches(self, property_obj):
+        price = property_obj.price or 0
+        return (
+            self.is_active
+            and (self.municipality_id is None or self.municipality_id == property_obj.property_municipality_id)
+            and (not self.type or self.type == property_obj.type)
+            and (self.min_price is None or price >= self.min_price)
+            and (self.max_price is None or price <= self.max_price)
+            and (self.min_bedrooms is None or property_obj.num_bedrooms >= self.min_bedrooms)
+            and (self.max_bedrooms is None or property_obj.num_bedrooms <= self.max_bedrooms)
+        )
+
+    def __str__(self):
+        return self.name or f"Saved search {self.pk} for {self.user}"
+
+
+class SavedSearchNotification(models.Model):
+    REASONS = [
+        ("NEW_LISTING", "New listing"),
+        ("PRICE_CHANGE", "Price change"),
+    ]
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="notifications")
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="saved_search_notifications")
+    reason = models.CharField(max_length=12, choices=REASONS)
+    is_sent = models.BooleanField(default=False, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_reason_display()}: {self.property.property_name} for {self.saved_search}"
+
+
+# Archive of sold listings (listings.archive). Rows keep the id they had in
+# the live tables, so references and sync tombstones stay meaningful.
+
+class ArchivedProperty(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    property_name = models.CharField(max_length=255)
+    property_description = models.TextField(blank=True, null=True)
+    property_address = models.CharField(max_length=1000)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    property_municipality = models.ForeignKey(Municipality, on_delete=models.CASCADE, related_name="archived_properties")
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="archived_owned_properties")
+    agent = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="archived_listed_properties")
+    property_size = models.IntegerField()
+    num_bedrooms = models.IntegerField(default=0)
+    num_bathrooms = models.IntegerField(default=0)
+    price = models.IntegerField(blank=True, null=True)
+    type = models.CharField(max_length=12, choices=Property.LISTING_TYPES)
+    status = models.CharField(max_length=15, choices=Property.STATUS_TYPES, default="SOLD")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Archived properties"
+
+    def get_municipality(self):
+        """The property's municipality from the process-local cache (listings.cache)."""
+        from .cache import municipality_cache
+        return municipality_cache.get(self.property_municipality_id)
+
+    def amenity_price_total(self):
+        return sum(Amenity.capped_price(amenity.amenity_type, amenity.price) for amenity in self.amenities.all())
 
+    def __str__(self):
+        return f"{self.type} in {self.get_municipality()}, {self.property_name} (archived)"
+
+
+class ArchivedPropertyImage(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    property = models.ForeignKey(ArchivedProperty, on_delete=models.CASCADE, related_name='images')
+    image = models.ImageField(upload_to=property_image_upload_path)
+    alt_text = models.CharField(max_length=200, blank=True, null=True)
+    is_primary = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Image for {self.property.property_name} (archived)"
 
+
+class ArchivedAmenity(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    property = models.ForeignKey(ArchivedProperty, on_delete=models.CASCADE, related_name="amenities")
+    name = models.CharField(max_length=100)
+    amenity_type = models.CharField(max_length=6, choices=Amenity.AMENITY_TYPES, default="Basic")
+    price = models.IntegerField(default=0)
+    added_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="archived_added_amenities")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "Archived amenities"
+
+    def __str__(self):
+        return f"{self.name} in {self.property}"
@@ -1,16 +1,24 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
+from core.serializers import CompiledListSerializer
+from monitoring.instrumentation import TimedSerializerMixin
+from tours.serializers import TourSerializer
+from .counters import refresh_counters, refreshed_by_caller
 from .models import *
 
 
 class MunicipalitySerializer(serializers.ModelSerializer):
     class Meta:
         model = Municipality
+        list_serializer_class = CompiledListSerializer
         fields = '__all__'
 
 
 class AmenitySerializer(serializers.ModelSerializer):
     class Meta:
         model = Amenity
+        list_serializer_class = CompiledListSerializer
         fields = '__all__'
 
     def validate(self, data):
@@ -25,16 +33,30 @@ class AmenitySerializer(serializers.ModelSerializer):
         return data
 
 
+class PropertyAmenityWriteSerializer(AmenitySerializer):
+    """An amenity nested in a property write; ``id`` selects an existing amenity of that property."""
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Amenity
+        exclude = ['property', 'added_by']
+
+
 class PropertyImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyImage
+        list_serializer_class = CompiledListSerializer
         fields = '__all__'
 
 
 class PropertyImageCreateSerializer(serializers.ModelSerializer):
+    # Set to update or keep an existing image of the property; omit to add a new one
+    id = serializers.IntegerField(required=False)
+
     class Meta:
         model = PropertyImage
-        fields = ['image', 'alt_text', 'is_primary']
+        fields = ['id', 'image', 'alt_text', 'is_primary']
+        extra_kwargs = {'image': {'required': False}}
 
     def validate_image(self, value):
         valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
@@ -52,26 +74,109 @@ class PropertyImageCreateSerializer(serializers.ModelSerializer):
         return value
 
 
-class PropertySerializer(serializers.ModelSerializer):
+class PropertySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     amenities = AmenitySerializer(many=True, read_only=True)
     images = PropertyImageSerializer(many=True, read_only=True)
-    property_tours = serializers.SerializerMethodField() 
+    property_tours = TourSerializer(source='tours', many=True, read_only=True)
     owner = serializers.StringRelatedField(read_only=True)
     agent = serializers.StringRelatedField(read_only=True)
-    property_municipality = MunicipalitySerializer(read_only=True)
+    property_municipality = MunicipalitySerializer(source='get_municipality', read_only=True)
 
     class Meta:
         model = Property
+        list_serializer_class = CompiledListSerializer
         fields = '__all__'
 
-    def get_property_tours(self, obj):
-        from tours.serializers import TourSerializer
-        tours = obj.tours.all() 
-        return TourSerializer(tours, many=True, context=self.context).data
+
+class ArchivedAmenitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedAmenity
+        fields = '__all__'
+
+
+class ArchivedPropertyImageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedPropertyImage
+        fields = '__all__'
+
+
+class ArchivedPropertySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    amenities = ArchivedAmenitySerializer(many=True, read_only=True)
+    images = ArchivedPropertyImageSerializer(many=True, read_only=True)
+    owner = serializers.StringRelatedField(read_only=True)
+    agent = serializers.StringRelatedField(read_only=True)
+    property_municipality = MunicipalitySerializer(source='get_municipality', read_only=True)
+
+    class Meta:
+        model = ArchivedProperty
+        fields = '__all__'
+
+
+class PropertySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Property
+        list_serializer_class = CompiledListSerializer
+        fields = [
+            'id', 'property_name', 'property_address', 'property_municipality', 'type', 'status',
+            'price', 'property_size', 'num_bedrooms', 'num_bathrooms', 'latitude', 'longitude',
+        ]
+
+
+class PropertyCardSerializer(serializers.ModelSerializer):
+    """List card read from the property row and its primary image only."""
+    primary_image = serializers.ImageField(source='primary_image.image', read_only=True, allow_null=True)
+
+    class Meta:
+        model = Property
+        list_serializer_class = CompiledListSerializer
+        fields = [
+            'id', 'property_name', 'property_address', 'property_municipality', 'type', 'status',
+            'price', 'property_size', 'num_bedrooms', 'num_bathrooms', 'latitude', 'longitude',
+            'primary_image', 'image_count', 'amenity_count', 'upcoming_tour_count',
+        ]
+
+
+class SimilarPropertySerializer(serializers.ModelSerializer):
+    property = PropertySummarySerializer(source='similar', read_only=True)
+
+    class Meta:
+        model = SimilarProperty
+        fields = ['rank', 'score', 'property']
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        exclude = ['user']
+
+    def validate(self, data):
+        for low, high in (('min_price', 'max_price'), ('min_bedrooms', 'max_bedrooms')):
+            low_value = data.get(low, getattr(self.instance, low, None))
+            high_value = data.get(high, getattr(self.instance, high, None))
+            if low_value is not None and high_value is not None and low_value > high_value:
+                raise serializers.ValidationError(f"{low} cannot be greater than {high}.")
+        return data
+
+
+class SavedSearchNotificationSerializer(serializers.ModelSerializer):
+    property = PropertySummarySerializer(read_only=True)
+    saved_search_name = serializers.CharField(source='saved_search.name', read_only=True)
+
+    class Meta:
+        model = SavedSearchNotification
+        fields = '__all__'
 
 
 class PropertyCreateSerializer(serializers.ModelSerializer):
-    amenities = AmenitySerializer(many=True, required=False)
+    """
+    Writes a property together with its amenities and images.
+
+    On update, a list that is sent replaces the current one: entries with an
+    ``id`` update that row, entries without one are added, and rows left out
+    are deleted. Each list is applied with one bulk_create, one bulk_update
+    and one delete. A list that is not sent is left alone.
+    """
+    amenities = PropertyAmenityWriteSerializer(many=True, required=False)
     images = PropertyImageCreateSerializer(many=True, required=False)
 
     class Meta:
@@ -81,18 +186,115 @@ class PropertyCreateSerializer(serializers.ModelSerializer):
     def validate_images(self, value):
         if len(value) > 20:
             raise serializers.ValidationError("A property cannot have more than 20 images.")
+        if any('id' not in image and not image.get('image') for image in value):
+            raise serializers.ValidationError("New images must include an image file.")
+        if sum(1 for image in value if image.get('is_primary')) > 1:
+            raise serializers.ValidationError("Only one image can be the primary image.")
         return value
 
+    def validate_amenities(self, value):
+        if any('id' not in amenity and not amenity.get('name') for amenity in value):
+            raise serializers.ValidationError("New amenities must include a name.")
+        return value
+
+    def _existing_rows(self, manager, items, field_name):
+        existing = {row.pk: row for row in manager.all()}
+        unknown = sorted({item['id'] for item in items if 'id' in item} - set(existing))
+        if unknown:
+            raise serializers.ValidationError({field_name: f"Unknown ids for this property: {unknown}"})
+        return existing
+
+    def _apply(self, model, existing, items, build):
+        """Diff ``items`` against ``existing`` rows and write the changes in bulk."""
+        new_rows = [build(item) for item in items if 'id' not in item]
+        kept = {}
+        for item in items:
+            if 'id' in item:
+                row = kept[item['id']] = existing[item['id']]
+                for field, value in item.items():
+                    setattr(row, field, value)
+
+        with refreshed_by_caller():
+            model.objects.filter(pk__in=[pk for pk in existing if pk not in kept]).delete()
+        if kept:
+            now = timezone.now()
+            update_fields = sorted({field for item in items if 'id' in item for field in item} - {'id'})
+            for row in kept.values():
+                row.updated_at = now
+                if model is Amenity:
+                    row.price = Amenity.capped_price(row.amenity_type, row.price)
+            model.objects.bulk_update(list(kept.values()), update_fields + ['updated_at'])
+        model.objects.bulk_create(new_rows)
+
+    def _amenity_builder(self, property_obj):
+        added_by = self.context['request'].user if 'request' in self.context else None
+
+        def build(item):
+            amenity = Amenity(property=property_obj, added_by=added_by, **item)
+            # bulk_create skips Amenity.save(), which applies the cap
+            amenity.price = Amenity.capped_price(amenity.amenity_type, amenity.price)
+            return amenity
+        return build
+
+    @staticmethod
+    def _refresh_counters(property_obj):
+        # Bulk writes send no signals, so the card fields are refreshed here
+        refresh_counters([property_obj.pk])
+        property_obj.refresh_from_db(fields=Property.COUNTER_FIELDS)
+
+    @staticmethod
+    def _amenity_total(amenities):
+        return sum(Amenity.capped_price(amenity.amenity_type, amenity.price) for amenity in amenities)
+
+    @transaction.atomic
     def create(self, validated_data):
         amenities_data = validated_data.pop('amenities', [])
         images_data = validated_data.pop('images', [])
 
-        property_obj = Property.objects.create(**validated_data)
+        property_obj = Property(**validated_data)
+        amenities = [self._amenity_builder(property_obj)(item) for item in amenities_data]
+        if not property_obj.price:
+            # Priced once, with the amenities, before anything is written
+            property_obj.price = property_obj.base_price() + self._amenity_total(amenities)
+        property_obj.save()
+
+        for amenity in amenities:
+            amenity.property = property_obj
+        Amenity.objects.bulk_create(amenities)
+        PropertyImage.objects.bulk_create(
+            PropertyImage(property=property_obj, **image_data) for image_data in images_data
+        )
+        self._refresh_counters(property_obj)
+        return property_obj
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        amenities_data = validated_data.pop('amenities', None)
+        images_data = validated_data.pop('images', None)
 
-        for amenity_data in amenities_data:
-            Amenity.objects.create(property=property_obj, **amenity_data)
+        if amenities_data is not None:
+            existing_amenities = self._existing_rows(instance.amenities, amenities_data, 'amenities')
+            # Keep an automatically computed price in step with the amenities; a price set by hand stays
+            auto_priced = instance.price == instance.base_price() + self._amenity_total(existing_amenities.values())
+        if images_data is not None:
+            existing_images = self._existing_rows(instance.images, images_data, 'images')
 
-        for image_data in images_data:
-            PropertyImage.objects.create(property=property_obj, **image_data)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
 
-        return property_obj
\ No newline at end of file
+        if amenities_data is not None:
+            self._apply(Amenity, existing_amenities, amenities_data, self._amenity_builder(instance))
+            if auto_priced and 'price' not in validated_data:
+                instance.price = instance.base_price() + self._amenity_total(instance.amenities.all())
+        if images_data is not None:
+            if any(item.get('is_primary') for item in images_data):
+                # The primary image sent replaces the current one
+                instance.images.filter(is_primary=True).update(is_primary=False, updated_at=timezone.now())
+                for image in existing_images.values():
+                    image.is_primary = False
+            self._apply(PropertyImage, existing_images, images_data,
+                        lambda item: PropertyImage(property=instance, **item))
+        instance.save()
+        if amenities_data is not None or images_data is not None:
+            self._refresh_counters(instance)
+        return instance
@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.response_cache import bump_version
+from tours.models import Tour
+from .cache import municipality_cache
+from .clusters import invalidate_cells
+from .counters import is_refreshed_by_caller, refresh_counters
+from .matching import enqueue_matches, saved_search_index
+from .models import Amenity, Municipality, Property, PropertyImage, SavedSearch
+
+
+# Models whose writes can change a response in core.response_cache
+CACHED_RESPONSE_MODELS = (Property, Amenity, PropertyImage, Tour, Municipality)
+
+for model in CACHED_RESPONSE_MODELS:
+    for signal in (post_save, post_delete):
+        signal.connect(bump_version, sender=model, dispatch_uid=f'response-cache-{model._meta.label_lower}')
+
+
+# Tiles are dropped once the write commits: a map request rebuilding one
+# before then would read, and cache, the rows as they were
+
+@receiver(post_save, sender=Property)
+def invalidate_property_clusters(sender, instance, created, **kwargs):
+    if created:
+        cells = (instance.geo_cell,)
+    elif instance.changed_fields():
+        cells = (instance.loaded_value('geo_cell'), instance.geo_cell)
+    else:
+        return
+    transaction.on_commit(lambda: invalidate_cells(*cells))
+
+
+@receiver(post_delete, sender=Property)
+def invalidate_deleted_property_clusters(sender, instance, **kwargs):
+    cell = instance.geo_cell
+    transaction.on_commit(lambda: invalidate_cells(cell))
+
+
+@receiver(post_save, sender=Property)
+def notify_saved_searches(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.status != 'ACTIVE':
+        return
+    if created:
+        reason = 'NEW_LISTING'
+    elif 'price' in instance.changed_fields():
+        reason = 'PRICE_CHANGE'
+    else:
+        return
+    transaction.on_commit(lambda: enqueue_matches(instance, reason))
+
+
+@receiver(post_save, sender=SavedSearch)
+def index_saved_search(sender, instance, **kwargs):
+    transaction.on_commit(lambda: saved_search_index.saved(instance))
+
+
+@receiver(post_delete, sender=SavedSearch)
+def unindex_saved_search(sender, instance, **kwargs):
+    search_id = instance.pk
+    transaction.on_commit(lambda: saved_search_index.deleted(search_id))
+
+
+@receiver(post_save, sender=Amenity)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_save, sender=Tour)
+def refresh_property_counters(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_counters([instance.property_id])
+
+
+@receiver(post_delete, sender=Amenity)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_delete, sender=Tour)
+def refresh_property_counters_after_delete(sender, instance, origin=None, **kwargs):
+    # Rows cascading from a deleted property have no counters left to keep, and
+    # bulk deletes (nested property writes, tours.lifecycle) refresh them once themselves;
+    # any other delete, such as the admin's "delete selected", refreshes them here
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is not Property and not is_refreshed_by_caller():
+        refresh_counters([instance.property_id])
+
+
+@receiver(post_save, sender=Municipality)
+@receiver(post_delete, sender=Municipality)
+def invalidate_municipality_cache(sender, **kwargs):
+    transaction.on_commit(municipality_cache.invalidate)
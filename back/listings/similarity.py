@@ -0,0 +1,190 @@
+"""
+Precomputed "similar listings".
+
+Active properties are compared within their listing type on standardised
+price, size and room counts, with a penalty for a different municipality.
+Distances are computed a block of rows at a time with NumPy and the top-N
+neighbours of each property are stored in SimilarProperty, so serving them
+is a single indexed lookup.
+
+Deleting a property leaves the rows pointing at it in place (see
+SimilarProperty.similar); refresh_changed() finds the deleted ids from the
+sync tombstones and recomputes those lists.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from sync.models import Tombstone
+from .models import Property, SimilarProperty
+
+
+TOP_N = 10
+BLOCK_SIZE = 128
+ACTIVE_STATUSES = ('ACTIVE', 'UNDER_REVIEW')
+MUNICIPALITY_PENALTY = 1.5
+WRITE_BATCH_SIZE = 5000
+
+
+class _TypeMatrix:
+    """Standardised features of all active properties of one listing type."""
+
+    def __init__(self, rows):
+        count = len(rows)
+        self.ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+        self.municipalities = np.fromiter((row[1] for row in rows), dtype=np.int64, count=count)
+        raw = np.empty((count, 4), dtype=np.float64)
+        raw[:, 0] = np.log1p(np.fromiter((row[2] or 0 for row in rows), dtype=np.float64, count=count))
+        raw[:, 1] = np.log1p(np.fromiter((row[3] or 0 for row in rows), dtype=np.float64, count=count))
+        raw[:, 2] = np.fromiter((row[4] for row in rows), dtype=np.float64, count=count)
+        raw[:, 3] = np.fromiter((row[5] for row in rows), dtype=np.float64, count=count)
+        std = raw.std(axis=0)
+        std[std == 0] = 1.0
+        self.features = ((raw - raw.mean(axis=0)) / std).astype(np.float32)
+        self.norms = np.einsum('ij,ij->i', self.features, self.features)
+        self.position = {pk: index for index, pk in enumerate(self.ids.tolist())}
+
+    def distances(self, rows):
+        """Distances from the given row positions to every property, shape (len(rows), n)."""
+        block = self.features[rows]
+        distance_sq = self.norms[rows][:, None] + self.norms[None, :] - 2.0 * (block @ self.features.T)
+        distance_sq += (self.municipalities[rows][:, None] != self.municipalities[None, :]) * np.float32(
+            MUNICIPALITY_PENALTY ** 2
+        )
+        np.maximum(distance_sq, 0.0, out=distance_sq)
+        distance_sq[np.arange(len(rows)), rows] = np.inf
+        return np.sqrt(distance_sq)
+
+    def neighbours(self, rows, top_n):
+        """Yield (property_id, [(similar_id, score), ...]) for the given row positions."""
+        top_n = min(top_n, len(self.ids) - 1)
+        if top_n <= 0:
+            for row in rows:
+                yield int(self.ids[row]), []
+            return
+        for start in range(0, len(rows), BLOCK_SIZE):
+            block_rows = np.asarray(rows[start:start + BLOCK_SIZE])
+            distance = self.distances(block_rows)
+            nearest = np.argpartition(distance, top_n - 1, axis=1)[:, :top_n]
+            nearest_distance = np.take_along_axis(distance, nearest, axis=1)
+            order = np.argsort(nearest_distance, axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            scores = 1.0 / (1.0 + np.take_along_axis(nearest_distance, order, axis=1))
+            for row, picked, picked_scores in zip(block_rows.tolist(), nearest, scores):
+                yield int(self.ids[row]), list(zip(self.ids[picked].tolist(), picked_scores.tolist()))
+
+
+def _load_matrices():
+    rows_by_type = {}
+    rows = (
+        Property.objects.filter(status__in=ACTIVE_STATUSES)
+        .order_by('id')
+        .values_list('id', 'property_municipality_id', 'price', 'property_size',
+                     'num_bedrooms', 'num_bathrooms', 'type')
+    )
+    for row in rows.iterator(chunk_size=WRITE_BATCH_SIZE):
+        rows_by_type.setdefault(row[6], []).append(row)
+    return {listing_type: _TypeMatrix(type_rows) for listing_type, type_rows in rows_by_type.items()}
+
+
+def _write(results, computed_at):
+    """Replace the stored neighbour lists of the properties in ``results``."""
+    property_ids = [property_id for property_id, _neighbours in results]
+    records = [
+        SimilarProperty(property_id=property_id, similar_id=similar_id, rank=rank,
+                        score=round(score, 6), computed_at=computed_at)
+        for property_id, neighbours in results
+        for rank, (similar_id, score) in enumerate(neighbours, start=1)
+    ]
+    with transaction.atomic():
+        for start in range(0, len(property_ids), WRITE_BATCH_SIZE):
+            SimilarProperty.objects.filter(property_id__in=property_ids[start:start + WRITE_BATCH_SIZE]).delete()
+        SimilarProperty.objects.bulk_create(records, batch_size=WRITE_BATCH_SIZE)
+
+
+def rebuild_all(top_n=TOP_N):
+    """Recompute every active property's neighbours. Returns the number of properties processed."""
+    computed_at = timezone.now()
+    processed = 0
+    for matrix in _load_matrices().values():
+        results = list(matrix.neighbours(list(range(len(matrix.ids))), top_n))
+        _write(results, computed_at)
+        processed += len(results)
+    SimilarProperty.objects.filter(computed_at__lt=computed_at).delete()
+    return processed
+
+
+def _worst_neighbours(property_ids):
+    """{property id: (lowest score, list length)} of the stored lists of these properties."""
+    worst = {}
+    for start in range(0, len(property_ids), WRITE_BATCH_SIZE):
+        rows = (
+            SimilarProperty.objects.filter(property_id__in=property_ids[start:start + WRITE_BATCH_SIZE])
+            .values('property_id').annotate(worst=Min('score'), count=Count('id'))
+        )
+        worst.update((row['property_id'], (row['worst'], row['count'])) for row in rows)
+    return worst
+
+
+def refresh_changed(top_n=TOP_N, since=None):
+    """
+    Recompute only the neighbour lists that properties changed or deleted
+    since the last run can affect: the changed properties themselves, lists
+    that point at a changed or deleted property, and lists a changed
+    property would now enter. Returns the number of properties processed.
+    """
+    if since is None:
+        since = SimilarProperty.objects.aggregate(last=Max('computed_at'))['last']
+        if since is None:
+            return rebuild_all(top_n)
+    computed_at = timezone.now()
+
+    changed = dict(Property.objects.filter(updated_at__gte=since).values_list('id', 'status'))
+    deleted = list(
+        Tombstone.objects.filter(model_label=Property._meta.label_lower, deleted_at__gte=since)
+        .values_list('object_id', flat=True)
+    )
+    if not changed and not deleted:
+        return 0
+    inactive = [pk for pk, status in changed.items() if status not in ACTIVE_STATUSES]
+    SimilarProperty.objects.filter(property_id__in=inactive).delete()
+
+    affected = set(
+        SimilarProperty.objects.filter(similar_id__in=[*changed, *deleted]).values_list('property_id', flat=True)
+    )
+    # Lowest score stored in any list: a changed property farther than this enters none
+    lowest_score = SimilarProperty.objects.aggregate(lowest=Min('score'))['lowest']
+    entry_distance = np.inf if lowest_score is None else 1.0 / lowest_score - 1.0
+
+    processed = 0
+    for matrix in _load_matrices().values():
+        changed_rows = [matrix.position[pk] for pk in changed if pk in matrix.position]
+        expected = min(top_n, len(matrix.ids) - 1)
+        if changed_rows and expected < top_n:
+            # Every list of a type this small holds all the others
+            affected.update(matrix.ids.tolist())
+        elif changed_rows:
+            # Lists a changed property would now enter: closer than their current worst neighbour
+            best = np.full(len(matrix.ids), np.inf)
+            for start in range(0, len(changed_rows), BLOCK_SIZE):
+                block = np.asarray(changed_rows[start:start + BLOCK_SIZE])
+                best = np.minimum(best, matrix.distances(block).min(axis=0))
+            candidates = matrix.ids[best < entry_distance].tolist()
+            worst = _worst_neighbours(candidates)
+            affected.update(
+                pk for pk in candidates
+                if pk not in worst or worst[pk][1] < expected
+                or best[matrix.position[pk]] < 1.0 / worst[pk][0] - 1.0
+            )
+
+        rows = sorted(
+            set(changed_rows) | {matrix.position[pk] for pk in affected if pk in matrix.position}
+        )
+        if rows:
+            results = list(matrix.neighbours(rows, top_n))
+            _write(results, computed_at)
+            processed += len(results)
+    # Rows still pointing at deleted properties from lists not recomputed above
+    SimilarProperty.objects.filter(similar_id__in=deleted).delete()
+    return processed
@@ -1,3 +1,248 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.testing import NoIndexWarmingMixin
+from deals.models import PendingSaleRequest, Sale
+from tours.models import Tour
+from .archive import archive_sold_properties
+from .cache import municipality_cache
+from .clusters import ZOOM_PRECISION, tile_cache_key, tile_precision
+from .models import Amenity, ArchivedProperty, Municipality, Property, PropertyImage
+from .serializers import ArchivedPropertySerializer
+
+
+class PropertyTestCase(NoIndexWarmingMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.owner.groups.add(Group.objects.create(name='Owner'))
+        cls.municipality = Municipality.objects.create(municipality_name='Oslo', price_per_sqm=1000)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def create_property(self, **fields):
+        fields = {
+            'property_name': 'Flat', 'property_address': 'Street 1', 'property_municipality': self.municipality,
+            'owner': self.owner, 'property_size': 50, 'type': 'SALE', **fields,
+        }
+        return Property.objects.create(**fields)
+
+
+class PropertyCreateTests(PropertyTestCase):
+
+    def test_price_includes_amenities(self):
+        response = self.client.post('/api/properties/', {
+            'property_name': 'Flat', 'property_address': 'Street 1',
+            'property_municipality': self.municipality.pk, 'property_size': 50, 'type': 'SALE',
+            'amenities': [
+                {'name': 'Balcony', 'amenity_type': 'Basic', 'price': 20000},
+                {'name': 'Sauna', 'amenity_type': 'Luxury', 'price': 150000},
+            ],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        property_obj = Property.objects.get(pk=response.data['id'])
+        self.assertEqual(property_obj.price, 50 * 1000 + 20000 + 150000)
+        self.assertEqual(set(property_obj.amenities.values_list('added_by', flat=True)), {self.owner.pk})
+
+    def test_price_sent_is_kept(self):
+        response = self.client.post('/api/properties/', {
+            'property_name': 'Flat', 'property_address': 'Street 1', 'price': 90000,
+            'property_municipality': self.municipality.pk, 'property_size': 50, 'type': 'SALE',
+            'amenities': [{'name': 'Balcony', 'amenity_type': 'Basic', 'price': 20000}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(Property.objects.get(pk=response.data['id']).price, 90000)
+
+
+class PropertyUpdateTests(PropertyTestCase):
+
+    def test_unknown_amenity_id_is_rejected(self):
+        property_obj = self.create_property()
+        other = self.create_property()
+        amenity = Amenity.objects.create(property=other, name='Pool', price=1000)
+
+        response = self.client.patch(f'/api/properties/{property_obj.pk}/', {
+            'amenities': [{'id': amenity.pk}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('amenities', response.data)
+        self.assertTrue(Amenity.objects.filter(pk=amenity.pk, property=other).exists())
+
+    def test_unknown_image_id_is_rejected(self):
+        property_obj = self.create_property()
+
+        response = self.client.patch(f'/api/properties/{property_obj.pk}/', {
+            'images': [{'id': 999999}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('images', response.data)
+
+    def test_primary_image_is_replaced(self):
+        property_obj = self.create_property()
+        first = PropertyImage.objects.create(property=property_obj, image='propertyimg/first.jpg', is_primary=True)
+        second = PropertyImage.objects.create(property=property_obj, image='propertyimg/second.jpg')
+
+        response = self.client.patch(f'/api/properties/{property_obj.pk}/', {
+            'images': [{'id': first.pk}, {'id': second.pk, 'is_primary': True}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(
+            dict(PropertyImage.objects.filter(property=property_obj).values_list('pk', 'is_primary')),
+            {first.pk: False, second.pk: True},
+        )
+
+    def test_images_left_out_are_deleted(self):
+        property_obj = self.create_property()
+        kept = PropertyImage.objects.create(property=property_obj, image='propertyimg/kept.jpg', is_primary=True)
+        PropertyImage.objects.create(property=property_obj, image='propertyimg/dropped.jpg')
+
+        response = self.client.patch(f'/api/properties/{property_obj.pk}/', {
+            'images': [{'id': kept.pk}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(list(property_obj.images.values_list('pk', flat=True)), [kept.pk])
+
+
+class CounterTests(PropertyTestCase):
+
+    def test_nested_create_sets_counters(self):
+        response = self.client.post('/api/properties/', {
+            'property_name': 'Flat', 'property_address': 'Street 1',
+            'property_municipality': self.municipality.pk, 'property_size': 50, 'type': 'SALE',
+            'amenities': [{'name': 'Balcony'}, {'name': 'Garden'}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        property_obj = Property.objects.get(pk=response.data['id'])
+        self.assertEqual((property_obj.amenity_count, property_obj.image_count), (2, 0))
+
+    def test_nested_update_refreshes_primary_image_and_counts(self):
+        property_obj = self.create_property()
+        first = PropertyImage.objects.create(property=property_obj, image='propertyimg/first.jpg', is_primary=True)
+        second = PropertyImage.objects.create(property=property_obj, image='propertyimg/second.jpg')
+        PropertyImage.objects.create(property=property_obj, image='propertyimg/third.jpg')
+
+        response = self.client.patch(f'/api/properties/{property_obj.pk}/', {
+            'images': [{'id': first.pk}, {'id': second.pk, 'is_primary': True}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        property_obj.refresh_from_db()
+        self.assertEqual((property_obj.primary_image_id, property_obj.image_count), (second.pk, 2))
+
+    def test_primary_image_falls_back_to_first_uploaded(self):
+        property_obj = self.create_property()
+        first = PropertyImage.objects.create(property=property_obj, image='propertyimg/first.jpg')
+        primary = PropertyImage.objects.create(property=property_obj, image='propertyimg/primary.jpg', is_primary=True)
+        property_obj.refresh_from_db()
+        self.assertEqual(property_obj.primary_image_id, primary.pk)
+
+        primary.delete()
+
+        property_obj.refresh_from_db()
+        self.assertEqual((property_obj.primary_image_id, property_obj.image_count), (first.pk, 1))
+
+    def test_upcoming_tour_count_follows_tour_status(self):
+        property_obj = self.create_property()
+        start_time = timezone.now() + timedelta(days=1)
+        tour = Tour.objects.create(property=property_obj, start_time=start_time, end_time=start_time + timedelta(hours=1))
+        Tour.objects.create(property=property_obj, start_time=start_time - timedelta(days=2),
+                            end_time=start_time - timedelta(days=2, hours=-1))
+        property_obj.refresh_from_db()
+        self.assertEqual(property_obj.upcoming_tour_count, 1)
+
+        tour.status = 'Cancelled'
+        tour.save()
+
+        property_obj.refresh_from_db()
+        self.assertEqual(property_obj.upcoming_tour_count, 0)
+
+    def test_queryset_delete_refreshes_counters(self):
+        property_obj = self.create_property()
+        kept = PropertyImage.objects.create(property=property_obj, image='propertyimg/kept.jpg')
+        dropped = PropertyImage.objects.create(property=property_obj, image='propertyimg/dropped.jpg', is_primary=True)
+
+        # As the admin's "delete selected" does
+        PropertyImage.objects.filter(pk=dropped.pk).delete()
+
+        property_obj.refresh_from_db()
+        self.assertEqual((property_obj.image_count, property_obj.primary_image_id), (1, kept.pk))
+
+class ClusterCacheTests(PropertyTestCase):
+
+    def test_tiles_are_dropped_once_the_write_commits(self):
+        property_obj = self.create_property(latitude=59.91, longitude=10.75)
+        keys = [
+            tile_cache_key(precision, property_obj.geo_cell[:tile_precision(precision)])
+            for precision in set(ZOOM_PRECISION)
+        ]
+        cache.set_many({key: [] for key in keys})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            property_obj.latitude, property_obj.longitude = 60.39, 5.32
+            property_obj.save()
+            self.assertEqual(len(cache.get_many(keys)), len(keys))
+
+        self.assertEqual(cache.get_many(keys), {})
+
+
+class ArchiveTests(PropertyTestCase):
+
+    def test_sale_and_requests_follow_the_archived_property(self):
+        property_obj = self.create_property(status='SOLD', price=100000)
+        sale = Sale.objects.create(property=property_obj, date_sold=date(2020, 1, 1), final_price=100000)
+        sale_request = PendingSaleRequest.objects.create(
+            property=property_obj, final_price=100000, status='APPROVED',
+            reason_for_review='Price far above comparable sales', created_by=self.owner,
+        )
+
+        self.assertEqual(archive_sold_properties(older_than_days=30), 1)
+
+        self.assertFalse(Property.objects.filter(pk=property_obj.pk).exists())
+        self.assertTrue(ArchivedProperty.objects.filter(pk=property_obj.pk).exists())
+        sale.refresh_from_db()
+        sale_request.refresh_from_db()
+        self.assertEqual((sale.property_id, sale.archived_property_id), (None, property_obj.pk))
+        self.assertEqual((sale_request.property_id, sale_request.archived_property_id), (None, property_obj.pk))
+
+    def test_archived_property_reads_its_municipality_from_the_cache(self):
+        property_obj = self.create_property(status='SOLD', price=100000)
+        archive_sold_properties(older_than_days=0)
+        archived = ArchivedProperty.objects.get(pk=property_obj.pk)
+        municipality_cache.invalidate()
+        municipality_cache.get(self.municipality.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(str(archived), "SALE in Oslo, Flat (archived)")
+        with CaptureQueriesContext(connection) as queries:
+            data = ArchivedPropertySerializer(archived).data
+        self.assertEqual(data['property_municipality']['municipality_name'], 'Oslo')
+        self.assertFalse([query for query in queries if 'listings_municipality' in query['sql']])
+
+    def test_pending_request_blocks_archival(self):
+        property_obj = self.create_property(status='SOLD', price=100000)
+        Sale.objects.create(property=property_obj, date_sold=date(2020, 1, 1), final_price=100000)
+        PendingSaleRequest.objects.create(
+            property=property_obj, final_price=100000,
+            reason_for_review='Price far above comparable sales', created_by=self.owner,
+        )
 
-# Create your tests here.
+        self.assertEqual(archive_sold_properties(older_than_days=30), 0)
+        self.assertTrue(Property.objects.filter(pk=property_obj.pk).exists())
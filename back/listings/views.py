@@ -1,7 +1,19 @@
+import heapq
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch, Q
 from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from .models import *
 from .serializers import *
+from . import geo
+from .cache import municipality_cache
+from .clusters import clusters_in_bbox, cluster_precision, MAX_ZOOM
+from core.async_views import AsyncReadView
+from core.response_cache import CachedResponseMixin
+from tours.models import Tour
 
 # Import custom permissions from core
 from core.permissions import (
@@ -58,12 +70,31 @@ class IsAdminUser(permissions.BasePermission):
         return request.user and request.user.is_staff and request.user.is_authenticated
 
 
-class MunicipalityListCreateView(generics.ListCreateAPIView):
+def property_card_queryset():
+    """Listed properties with what PropertyCardSerializer reads."""
+    return Property.objects.select_related('primary_image').filter(status__in=['ACTIVE', 'UNDER_REVIEW'])
+
+
+def property_read_queryset():
+    """Properties with everything PropertySerializer reads loaded up front."""
+    return Property.objects.select_related('owner', 'agent').prefetch_related(
+        'amenities',
+        'images',
+        Prefetch('tours', queryset=Tour.objects.select_related('agent', 'buyer')),
+    )
+
+
+class MunicipalityListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Municipality.objects.all()
     serializer_class = MunicipalitySerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return municipality_cache.all()
+        return super().get_queryset()
+
     def get_permissions(self):
         if self.request.method == 'POST':
             permission_classes = [IsAdminUser]
@@ -138,16 +169,16 @@ class AmenityDetailView(generics.RetrieveUpdateDestroyAPIView):
             return Amenity.objects.filter(id=self.kwargs['pk'])
 
 
-class PropertyListCreateView(generics.ListCreateAPIView):
+class PropertyListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     authentication_classes = [JWTAuthentication]
 
     def get_queryset(self):
-        return Property.objects.filter(status__in=['ACTIVE', 'UNDER_REVIEW'])
+        return property_card_queryset()
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return PropertyCreateSerializer
-        return PropertySerializer
+        return PropertyCardSerializer
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -160,10 +191,157 @@ class PropertyListCreateView(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MapQueryParamsMixin:
+    def _float_param(self, name):
+        try:
+            return float(self.request.query_params[name])
+        except KeyError:
+            raise ValidationError({name: 'This parameter is required.'})
+        except ValueError:
+            raise ValidationError({name: 'Must be a number.'})
+
+    def _parse_bbox(self):
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(v) for v in self.request.query_params['bbox'].split(','))
+        except KeyError:
+            raise ValidationError({'bbox': 'This parameter is required.'})
+        except ValueError:
+            raise ValidationError({'bbox': 'Expected min_lng,min_lat,max_lng,max_lat.'})
+        if min_lat > max_lat or min_lng > max_lng:
+            raise ValidationError({'bbox': 'Minimum corner must be south-west of the maximum corner.'})
+        if not (-90 <= min_lat and max_lat <= 90 and -180 <= min_lng and max_lng <= 180):
+            raise ValidationError({'bbox': 'Latitudes must be within [-90, 90] and longitudes within [-180, 180].'})
+        return min_lat, min_lng, max_lat, max_lng
+
+    def _coordinate_param(self, name, limit):
+        value = self._float_param(name)
+        if not -limit <= value <= limit:
+            raise ValidationError({name: f'Must be between -{limit} and {limit}.'})
+        return value
+
+
+class PropertyGeoSearchView(MapQueryParamsMixin, generics.ListAPIView):
+    """
+    Listings inside a map viewport (?bbox=min_lng,min_lat,max_lng,max_lat)
+    or within a radius of a point (?lat=&lng=&radius_km=), nearest first.
+    """
+    serializer_class = PropertySerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    max_results = 500
+    max_radius_km = 100
+
+    def get_queryset(self):
+        listed = Q(status__in=['ACTIVE', 'UNDER_REVIEW'])
+
+        if 'bbox' in self.request.query_params:
+            return property_read_queryset().filter(listed, geo.bbox_filter(*self._parse_bbox()))[:self.max_results]
+
+        latitude = self._coordinate_param('lat', 90)
+        longitude = self._coordinate_param('lng', 180)
+        radius_km = self._float_param('radius_km')
+        if not 0 < radius_km <= self.max_radius_km:
+            raise ValidationError({'radius_km': f'Must be greater than 0 and at most {self.max_radius_km}.'})
+
+        # Rank the candidates on their coordinates alone, then load the chosen rows
+        candidates = Property.objects.filter(
+            listed, geo.bbox_filter(*geo.radius_bbox(latitude, longitude, radius_km))
+        ).values_list('id', 'latitude', 'longitude')
+        nearby = []
+        for pk, candidate_lat, candidate_lng in candidates.iterator():
+            distance = geo.haversine_km(latitude, longitude, candidate_lat, candidate_lng)
+            if distance <= radius_km:
+                nearby.append((distance, pk))
+        nearby = heapq.nsmallest(self.max_results, nearby)
+        chosen = property_read_queryset().in_bulk([pk for _distance, pk in nearby])
+        return [chosen[pk] for _distance, pk in nearby if pk in chosen]
+
+
+class PropertyClusterView(MapQueryParamsMixin, generics.GenericAPIView):
+    """
+    Aggregated map pins for a viewport: ?bbox=min_lng,min_lat,max_lng,max_lat&zoom=
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        bbox = self._parse_bbox()
+        try:
+            zoom = int(request.query_params.get('zoom', ''))
+        except ValueError:
+            raise ValidationError({'zoom': 'Must be an integer.'})
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ValidationError({'zoom': f'Must be between 0 and {MAX_ZOOM}.'})
+
+        clusters = clusters_in_bbox(*bbox, zoom)
+        if clusters is None:
+            raise ValidationError({'bbox': 'Viewport is too large for this zoom level.'})
+        return Response({
+            'zoom': zoom,
+            'precision': cluster_precision(zoom),
+            'clusters': clusters,
+        })
+
+
+class SimilarPropertyListView(generics.ListAPIView):
+    """
+    Precomputed similar listings for a property, best match first
+    """
+    serializer_class = SimilarPropertySerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            SimilarProperty.objects.filter(property_id=self.kwargs['pk'])
+            .select_related('similar')
+            .order_by('rank')
+        )
+
+
+class SavedSearchListCreateView(generics.ListCreateAPIView):
+    serializer_class = SavedSearchSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class SavedSearchDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = SavedSearchSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+
+class SavedSearchNotificationListView(generics.ListAPIView):
+    serializer_class = SavedSearchNotificationSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            SavedSearchNotification.objects.filter(saved_search__user=self.request.user)
+            .select_related('saved_search', 'property')
+            .order_by('-created_at')
+        )
+
+
+class PropertyDetailView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Property.objects.all()
     authentication_classes = [JWTAuthentication]
 
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return property_read_queryset()
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return PropertyCreateSerializer
@@ -202,4 +380,29 @@ class PropertyImageListCreateView(generics.ListCreateAPIView):
 class PropertyImageDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = PropertyImage.objects.all()
     authentication_classes = [JWTAuthentication]
-    permission_classes = [IsOwnerOrAgentOrReadOnly]
\ No newline at end of file
+    permission_classes = [IsOwnerOrAgentOrReadOnly]
+
+
+class AsyncMunicipalityListView(AsyncReadView):
+
+    async def get(self, request, *args, **kwargs):
+        municipalities = await sync_to_async(municipality_cache.all)()
+        return self.render(MunicipalitySerializer(municipalities, many=True).data)
+
+
+class AsyncPropertyListView(AsyncReadView):
+
+    async def get(self, request, *args, **kwargs):
+        properties = [property_obj async for property_obj in property_card_queryset()]
+        return self.render(PropertyCardSerializer(properties, many=True, context={'request': request}).data)
+
+
+class AsyncPropertyDetailView(AsyncReadView):
+
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            property_obj = await property_read_queryset().aget(pk=pk)
+        except Property.DoesNotExist:
+            return self.not_found()
+        await municipality_cache.aensure_current()
+        return self.render(PropertySerializer(property_obj, context={'request': request}).data)
@@ -0,0 +1,57 @@
+import json
+
+from django.contrib import admin
+from django.http import FileResponse, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import RequestProfile
+
+# Register your models here.
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'status_code', 'duration_ms',
+                    'query_count', 'trigger', 'downloads')
+    list_filter = ('trigger', 'method', 'view_name')
+    search_fields = ('path', 'view_name')
+    date_hierarchy = 'created_at'
+    exclude = ('sql_trace', 'profile')
+    readonly_fields = ('view_name', 'method', 'path', 'status_code', 'trigger', 'user', 'duration_ms',
+                       'query_count', 'sql_time_ms', 'created_at', 'downloads', 'summary')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/profile/', self.admin_site.admin_view(self.download_profile),
+                 name='monitoring_requestprofile_profile'),
+            path('<int:pk>/sql/', self.admin_site.admin_view(self.download_sql_trace),
+                 name='monitoring_requestprofile_sql'),
+        ] + super().get_urls()
+
+    @admin.display(description='Downloads')
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">profile</a> | <a href="{}">SQL trace</a>',
+            reverse('admin:monitoring_requestprofile_profile', args=[obj.pk]),
+            reverse('admin:monitoring_requestprofile_sql', args=[obj.pk]),
+        )
+
+    def download_profile(self, request, pk):
+        record = get_object_or_404(RequestProfile, pk=pk)
+        return FileResponse(record.profile.open('rb'), as_attachment=True,
+                            filename=record.profile.name.rsplit('/', 1)[-1])
+
+    def download_sql_trace(self, request, pk):
+        record = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(json.dumps(record.sql_trace, indent=2), content_type='application/json')
+        filename = record.profile.name.rsplit('/', 1)[-1].replace('.prof', '.sql.json')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import instrumentation
+        connection_created.connect(instrumentation.install_query_observer)
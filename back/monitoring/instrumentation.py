@@ -0,0 +1,163 @@
+"""
+Per-request measurements: SQL queries, serialization time and likely N+1s.
+
+The active request's RequestMetrics lives in a context variable, which
+asgiref carries into sync_to_async threads, so sync and async views are
+measured alike. Queries are observed by an execute wrapper installed on
+every new database connection; metrics of a finished request are never
+written to, even by a task that inherited its context. Each query is kept
+as its normalized template, shared by repeats, and at most
+MAX_RECORDED_QUERIES of them per request.
+
+Serialization time is measured by serializers using
+TimedSerializerMixin: CompiledListSerializer, so every list payload, and
+the nested detail serializers.
+"""
+import re
+import sys
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.views import View
+from rest_framework import serializers
+
+
+_current = ContextVar('request_metrics', default=None)
+
+MAX_RECORDED_QUERIES = 1000
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_PROJECT_ROOT = str(settings.BASE_DIR)
+
+
+def sql_template(sql):
+    """Collapse placeholder lists so queries differing only in IN-list length group together."""
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+@dataclass
+class QueryRecord:
+    sql: str
+    duration: float
+    alias: str
+
+
+@dataclass
+class RepeatedQuery:
+    template: str
+    count: int = 0
+    origin: str = ''
+    serializer: str = ''
+
+
+@dataclass
+class RequestMetrics:
+    n_plus_one_threshold: int
+    view_name: str = ''
+    query_count: int = 0
+    sql_time: float = 0.0
+    serialization_time: float = 0.0
+    queries: list = field(default_factory=list)
+    templates: dict = field(default_factory=dict)
+    finished: bool = False
+    _serializing: int = 0
+    _serializer_name: str = ''
+
+    def record_query(self, sql, duration, alias):
+        self.query_count += 1
+        self.sql_time += duration
+
+        template = sql_template(sql)
+        repeated = self.templates.get(template)
+        if repeated is None:
+            repeated = self.templates[template] = RepeatedQuery(template)
+        repeated.count += 1
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append(QueryRecord(repeated.template, duration, alias))
+        if repeated.count == self.n_plus_one_threshold:
+            # Only walk the stack once a template looks like an N+1
+            repeated.origin, repeated.serializer = _query_origin()
+            repeated.serializer = repeated.serializer or self._serializer_name
+
+    def slowest_queries(self, limit):
+        return sorted(self.queries, key=lambda query: query.duration, reverse=True)[:limit]
+
+    def likely_n_plus_ones(self):
+        return [repeated for repeated in self.templates.values() if repeated.count >= self.n_plus_one_threshold]
+
+
+def current_metrics():
+    return _current.get()
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.finished = True
+    _current.reset(token)
+
+
+def _query_origin():
+    """
+    Return ("path:line in function", serializer class) for the innermost
+    project code and serializer on the current stack. The search stops at
+    the view, so middleware wrapping the view is never blamed.
+    """
+    origin = serializer = ''
+    frame = sys._getframe(2)
+    while frame is not None and not (origin and serializer):
+        owner = frame.f_locals.get('self')
+        filename = frame.f_code.co_filename
+        if not origin and filename.startswith(_PROJECT_ROOT) and 'site-packages' not in filename \
+                and filename != __file__:
+            origin = f'{filename[len(_PROJECT_ROOT) + 1:]}:{frame.f_lineno} in {frame.f_code.co_name}'
+        if not serializer and isinstance(owner, serializers.BaseSerializer) \
+                and not isinstance(owner, serializers.ListSerializer):
+            serializer = type(owner).__name__
+        if isinstance(owner, View):
+            origin = origin or f'{type(owner).__name__}.{frame.f_code.co_name}'
+            break
+        frame = frame.f_back
+    return origin, serializer
+
+
+def query_observer(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None or metrics.finished:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started, context['connection'].alias)
+
+
+def install_query_observer(sender, connection, **kwargs):
+    """connection_created receiver."""
+    if query_observer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_observer)
+
+
+class TimedSerializerMixin:
+    """Adds the time spent producing ``.data`` to the request's serialization time."""
+
+    @property
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics.finished or metrics._serializing:
+            return super().data
+        serializer = self.child if isinstance(self, serializers.ListSerializer) else self
+        metrics._serializing += 1
+        metrics._serializer_name = type(serializer).__name__
+        started = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            metrics.serialization_time += time.perf_counter() - started
+            metrics._serializing -= 1
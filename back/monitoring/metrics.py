@@ -0,0 +1,291 @@
+"""
+In-process request metrics with Prometheus text exposition.
+
+Every thread records into its own shard, so recording never takes a lock;
+a scrape sums the shards. When a thread ends, its shard is folded into the
+registry's retired totals, so short-lived threads don't pile up shards. With several worker processes, set METRICS_DIR
+to a directory shared by the workers: each worker periodically writes its
+cumulative totals to <METRICS_DIR>/<pid>.json, and a scrape served by any
+worker adds the other workers' files to its own live totals. Files are
+named <pid>-<start time>.json; a scrape removes those of processes that
+have ended and those left by an earlier process with a reused pid.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+import weakref
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+FLUSH_INTERVAL = 5.0
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class _Shard:
+    """One thread's metrics. Only its owning thread writes to it."""
+
+    def __init__(self):
+        self.requests = Counter()      # (route, method, status) -> count
+        self.latency = {}              # (route, method) -> _Histogram
+        self.queries = {}              # (route,) -> _Histogram
+        self.cache = Counter()         # (cache, result) -> count
+
+    def observe(self, histograms, key, buckets, value):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = _Histogram(len(buckets) + 1)
+        histogram.counts[bisect.bisect_left(buckets, value)] += 1
+        histogram.sum += value
+
+
+def _empty_totals():
+    return {'requests': Counter(), 'latency': {}, 'queries': {}, 'cache': Counter()}
+
+
+def _add_histogram(target, key, counts, total):
+    existing = target.get(key)
+    if existing is None:
+        target[key] = [list(counts), total]
+    else:
+        existing[0] = [a + b for a, b in zip(existing[0], counts)]
+        existing[1] += total
+
+
+def _add_shard(totals, requests, latency, queries, cache):
+    totals['requests'].update(dict(requests))
+    totals['cache'].update(dict(cache))
+    for name, histograms in (('latency', latency), ('queries', queries)):
+        for key, histogram in list(histograms.items()):
+            _add_histogram(totals[name], key, histogram.counts, histogram.sum)
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._local = threading.local()
+        # Only the owning thread's local storage holds a shard strongly
+        self._shards = weakref.WeakSet()
+        self._retired = _empty_totals()     # shards of ended threads
+        self._shards_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._started_ms = time.time_ns() // 1_000_000
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            # Runs once the thread has ended and its local storage dropped the shard
+            weakref.finalize(shard, self._retire, shard.requests, shard.latency, shard.queries, shard.cache)
+            with self._shards_lock:
+                self._shards.add(shard)
+        return shard
+
+    def _retire(self, requests, latency, queries, cache):
+        with self._shards_lock:
+            _add_shard(self._retired, requests, latency, queries, cache)
+
+    def observe_request(self, route, method, status, duration, query_count):
+        shard = self._shard()
+        shard.requests[(route, method, str(status))] += 1
+        shard.observe(shard.latency, (route, method), LATENCY_BUCKETS, duration)
+        shard.observe(shard.queries, (route,), QUERY_COUNT_BUCKETS, query_count)
+        self._maybe_flush()
+
+    def record_cache(self, cache_name, hits=0, misses=0):
+        shard = self._shard()
+        if hits:
+            shard.cache[(cache_name, 'hit')] += hits
+        if misses:
+            shard.cache[(cache_name, 'miss')] += misses
+
+    def local_totals(self):
+        """This process's totals, summed over all thread shards."""
+        totals = _empty_totals()
+        with self._shards_lock:
+            shards = list(self._shards)
+            totals['requests'].update(self._retired['requests'])
+            totals['cache'].update(self._retired['cache'])
+            for name in ('latency', 'queries'):
+                for key, (counts, total) in self._retired[name].items():
+                    _add_histogram(totals[name], key, counts, total)
+        for shard in shards:
+            _add_shard(totals, shard.requests, shard.latency, shard.queries, shard.cache)
+        return totals
+
+    def totals(self):
+        """Totals across all worker processes sharing METRICS_DIR."""
+        totals = self.local_totals()
+        directory = _metrics_dir()
+        if directory is None:
+            return totals
+        for path in self._worker_files(directory):
+            try:
+                worker = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue    # being replaced or removed
+            for name in ('requests', 'cache'):
+                for key, value in worker[name]:
+                    totals[name][tuple(key)] += value
+            for name in ('latency', 'queries'):
+                for key, counts, total in worker[name]:
+                    _add_histogram(totals[name], tuple(key), counts, total)
+        return totals
+
+    def _file_name(self):
+        return f'{os.getpid()}-{self._started_ms}.json'
+
+    def _worker_files(self, directory):
+        """The other live workers' files in ``directory``; removes those of ended processes."""
+        own_pid = os.getpid()
+        newest = {}     # pid -> (start time, path)
+        for path in directory.glob('*.json'):
+            try:
+                pid, started = (int(part) for part in path.stem.split('-'))
+            except ValueError:
+                pid, started = None, None   # named before start times were recorded
+            if pid is None or not _process_alive(pid) or (pid == own_pid and path.name != self._file_name()):
+                path.unlink(missing_ok=True)
+                continue
+            if pid == own_pid:
+                continue
+            previous = newest.get(pid)
+            if previous is not None:
+                # The pid was reused: the older file belongs to a process that has ended
+                older, newer = sorted((previous, (started, path)))
+                older[1].unlink(missing_ok=True)
+                newest[pid] = newer
+            else:
+                newest[pid] = (started, path)
+        return [path for _started, path in newest.values()]
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush < FLUSH_INTERVAL or _metrics_dir() is None:
+            return
+        if self._flush_lock.acquire(blocking=False):
+            try:
+                self.flush()
+            finally:
+                self._flush_lock.release()
+
+    def flush(self):
+        """Write this process's totals for the other workers to read."""
+        directory = _metrics_dir()
+        if directory is None:
+            return
+        self._last_flush = time.monotonic()
+        totals = self.local_totals()
+        payload = {
+            'requests': [[list(key), value] for key, value in totals['requests'].items()],
+            'cache': [[list(key), value] for key, value in totals['cache'].items()],
+            'latency': [[list(key), counts, total] for key, (counts, total) in totals['latency'].items()],
+            'queries': [[list(key), counts, total] for key, (counts, total) in totals['queries'].items()],
+        }
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / self._file_name()
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(payload))
+        os.replace(temporary, path)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True     # alive, under another user
+    return True
+
+
+def _metrics_dir():
+    directory = getattr(settings, 'METRICS_DIR', None)
+    return Path(directory) if directory else None
+
+
+registry = MetricsRegistry()
+
+
+def _labels(**labels):
+    escaped = (
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _histogram_lines(name, histograms, label_names, buckets):
+    lines = []
+    for key, (counts, total) in sorted(histograms.items()):
+        labels = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, count in zip(buckets, counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(**labels, le=f"{bound:g}")} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {cumulative}')
+        lines.append(f'{name}_sum{_labels(**labels)} {total:.6f}')
+        lines.append(f'{name}_count{_labels(**labels)} {cumulative}')
+    return lines
+
+
+def render(totals, gauges):
+    """Prometheus text exposition of ``totals`` plus ``gauges`` ({(name, labels): value})."""
+    lines = [
+        '# HELP http_requests_total Requests by route, method and status code.',
+        '# TYPE http_requests_total counter',
+    ]
+    for (route, method, status), value in sorted(totals['requests'].items()):
+        lines.append(f'http_requests_total{_labels(route=route, method=method, status=status)} {value}')
+
+    lines += [
+        '# HELP http_request_duration_seconds Request latency by route and method.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    lines += _histogram_lines('http_request_duration_seconds', totals['latency'], ('route', 'method'),
+                              LATENCY_BUCKETS)
+
+    lines += [
+        '# HELP http_request_db_queries Database queries per request by route.',
+        '# TYPE http_request_db_queries histogram',
+    ]
+    lines += _histogram_lines('http_request_db_queries', totals['queries'], ('route',), QUERY_COUNT_BUCKETS)
+
+    lines += [
+        '# HELP cache_requests_total Application cache lookups by cache and result.',
+        '# TYPE cache_requests_total counter',
+    ]
+    for (cache_name, result), value in sorted(totals['cache'].items()):
+        lines.append(f'cache_requests_total{_labels(cache=cache_name, result=result)} {value}')
+
+    lines += [
+        '# HELP cache_hit_ratio Share of application cache lookups that hit.',
+        '# TYPE cache_hit_ratio gauge',
+    ]
+    for cache_name in sorted({cache_name for cache_name, _result in totals['cache']}):
+        hits = totals['cache'][(cache_name, 'hit')]
+        lookups = hits + totals['cache'][(cache_name, 'miss')]
+        lines.append(f'cache_hit_ratio{_labels(cache=cache_name)} {hits / lookups if lookups else 0:.4f}')
+
+    lines += [
+        '# HELP queue_depth Items waiting in background queues.',
+        '# TYPE queue_depth gauge',
+    ]
+    for queue, value in sorted(gauges.items()):
+        lines.append(f'queue_depth{_labels(queue=queue)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,191 @@
+import cProfile
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import instrumentation, metrics as request_metrics, profiling
+
+
+logger = logging.getLogger('monitoring.requests')
+
+DEFAULTS = {
+    'SLOW_REQUEST_MS': 500,
+    'MAX_QUERIES': 50,
+    'N_PLUS_ONE_THRESHOLD': 10,
+    'LOGGED_SLOW_QUERIES': 5,
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'MAX_STORED_PROFILES': 500,
+}
+
+
+# cProfile runs one profiler per thread, and concurrent async requests
+# share the event loop's thread: a request arriving while another is
+# profiled on its thread is not profiled
+_profiling = threading.local()
+
+
+def monitoring_setting(name):
+    return getattr(settings, 'MONITORING', {}).get(name, DEFAULTS[name])
+
+
+def _view_name(view_func):
+    view_class = getattr(view_func, 'view_class', None)
+    target = view_class or view_func
+    return f'{target.__module__}.{target.__qualname__}'
+
+
+class RequestTimingMiddleware:
+    """
+    Measures every request's query count, SQL time, serialization time and
+    total latency, reports them in a Server-Timing header and logs requests
+    that are slow, issue too many queries or repeat a query N+1 style.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.deactivate(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.deactivate(token)
+        return self.finish(request, response, metrics, started)
+
+    def start(self, request):
+        metrics = instrumentation.RequestMetrics(monitoring_setting('N_PLUS_ONE_THRESHOLD'))
+        request.metrics = metrics
+        return metrics, instrumentation.activate(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, started):
+        total = time.perf_counter() - started
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.query_count} queries"',
+            f'serialize;dur={metrics.serialization_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        self.report(request, response, metrics, total)
+        route = request.resolver_match.url_name if request.resolver_match else None
+        request_metrics.registry.observe_request(
+            route or 'unmatched', request.method, response.status_code, total, metrics.query_count
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.view_name = _view_name(view_func)
+
+    def report(self, request, response, metrics, total):
+        view = metrics.view_name or request.path
+        repeated = metrics.likely_n_plus_ones()
+        for query in repeated:
+            logger.warning(
+                "Likely N+1 in %s %s: query repeated %d times (view %s, serializer %s, issued from %s): %s",
+                request.method, request.path, query.count, view, query.serializer or '-', query.origin or '-',
+                query.template,
+            )
+
+        slow = total * 1000 >= monitoring_setting('SLOW_REQUEST_MS')
+        chatty = metrics.query_count > monitoring_setting('MAX_QUERIES')
+        if not (slow or chatty):
+            return
+        slowest = '\n'.join(
+            f'  {query.duration * 1000:.1f}ms [{query.alias}] {query.sql}'
+            for query in metrics.slowest_queries(monitoring_setting('LOGGED_SLOW_QUERIES'))
+        )
+        logger.warning(
+            "Slow request %s %s -> %s (view %s): %.1fms total, %d queries in %.1fms, serialization %.1fms\n%s",
+            request.method, request.path, response.status_code, view, total * 1000,
+            metrics.query_count, metrics.sql_time * 1000, metrics.serialization_time * 1000, slowest,
+        )
+
+
+def _claim_profiler():
+    """Take this thread's profiling slot; False when a request already holds it."""
+    if getattr(_profiling, 'active', False):
+        return False
+    _profiling.active = True
+    return True
+
+
+def _release_profiler():
+    _profiling.active = False
+
+
+class ProfilingMiddleware:
+    """
+    Runs selected requests under cProfile and stores the result as a
+    RequestProfile (see monitoring.profiling). Must come after
+    RequestTimingMiddleware, whose metrics supply the SQL trace, and after
+    AuthenticationMiddleware, which identifies staff session users.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trigger, user = profiling.trigger_for(request, monitoring_setting('PROFILE_SAMPLE_RATE'))
+        if trigger is None or not _claim_profiler():
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            _release_profiler()
+        self.store(profiler, request, response, trigger, user, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        trigger, user = await sync_to_async(profiling.trigger_for)(
+            request, monitoring_setting('PROFILE_SAMPLE_RATE')
+        )
+        if trigger is None or not _claim_profiler():
+            return await self.get_response(request)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+            _release_profiler()
+        await sync_to_async(self.store)(profiler, request, response, trigger, user, time.perf_counter() - started)
+        return response
+
+    def store(self, profiler, request, response, trigger, user, duration):
+        metrics = getattr(request, 'metrics', None) or instrumentation.RequestMetrics(0)
+        try:
+            record = profiling.save_profile(profiler, request, response, trigger, user, metrics, duration)
+            profiling.prune(monitoring_setting('MAX_STORED_PROFILES'))
+        except Exception:
+            logger.exception("Could not store profile for %s %s", request.method, request.path)
+            return
+        response['X-Profile-Id'] = str(record.pk)
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """A profiled request: cProfile stats file plus the request's SQL trace."""
+    TRIGGERS = [
+        ("HEADER", "Requested by staff header"),
+        ("SAMPLE", "Random sample"),
+    ]
+
+    view_name = models.CharField(max_length=255, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2048)
+    status_code = models.PositiveSmallIntegerField()
+    trigger = models.CharField(max_length=10, choices=TRIGGERS)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='request_profiles')
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    sql_time_ms = models.FloatField()
+    profile = models.FileField(upload_to='profiles/%Y/%m/%d/')
+    summary = models.TextField(help_text="Top functions by cumulative time.")
+    sql_trace = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.view_name}) {self.duration_ms:.0f}ms"
@@ -0,0 +1,115 @@
+"""
+On-demand request profiling.
+
+A request is profiled when a staff user sends the X-Profile header, or at
+random with probability MONITORING['PROFILE_SAMPLE_RATE']. It runs under
+cProfile and is stored as a RequestProfile: a pstats file named after the
+view, a text summary and the SQL trace recorded by RequestTimingMiddleware.
+
+cProfile only sees the thread it was enabled on. Sync views run there in
+full; for async views the profile covers the event-loop side of the
+request, not ORM calls handed to sync_to_async threads.
+"""
+import io
+import marshal
+import pstats
+import random
+import re
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .models import RequestProfile
+
+
+PROFILE_HEADER = 'X-Profile'
+SUMMARY_LINES = 40
+# Left out of the stored path: the event stream takes its JWT as ?token=
+CREDENTIAL_PARAMS = frozenset({'token', 'access', 'access_token', 'refresh', 'password'})
+
+
+def _staff_user(request):
+    """The staff user behind the request's session or JWT, or None."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_staff else None
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    if authenticated and authenticated[0].is_staff:
+        return authenticated[0]
+    return None
+
+
+def trigger_for(request, sample_rate):
+    """Return (trigger, user) when the request should be profiled, else (None, None)."""
+    if PROFILE_HEADER in request.headers:
+        user = _staff_user(request)
+        if user is not None:
+            return 'HEADER', user
+    if sample_rate and random.random() < sample_rate:
+        return 'SAMPLE', None
+    return None, None
+
+
+def _summary(profiler):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    return stream.getvalue()
+
+
+def _artifact_name(view_name):
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '-', view_name).strip('-') or 'unresolved'
+    return f"{slug}-{timezone.localtime():%Y%m%dT%H%M%S%f}.prof"
+
+
+def _stored_path(request):
+    """The request's path and query string, without parameters that can carry credentials."""
+    query = request.GET.copy()
+    for name in CREDENTIAL_PARAMS.intersection(query):
+        del query[name]
+    query_string = query.urlencode()
+    return f"{request.path}?{query_string}" if query_string else request.path
+
+
+def save_profile(profiler, request, response, trigger, user, metrics, duration):
+    profiler.create_stats()
+    # Same format as pstats.Stats.dump_stats(), loadable with pstats or snakeviz.
+    # Serialize before summarising: pstats.Stats takes the profiler's stats over.
+    stats_file = ContentFile(marshal.dumps(profiler.stats))
+    record = RequestProfile(
+        view_name=metrics.view_name or 'unresolved',
+        method=request.method,
+        path=_stored_path(request)[:2048],
+        status_code=response.status_code,
+        trigger=trigger,
+        user=user,
+        duration_ms=duration * 1000,
+        query_count=metrics.query_count,
+        sql_time_ms=metrics.sql_time * 1000,
+        summary=_summary(profiler),
+        sql_trace=[
+            {'alias': query.alias, 'duration_ms': round(query.duration * 1000, 3), 'sql': query.sql}
+            for query in metrics.queries
+        ],
+    )
+    record.profile.save(_artifact_name(record.view_name), stats_file, save=False)
+    record.save()
+    return record
+
+
+def prune(keep):
+    """Delete all but the ``keep`` newest profiles, along with their files."""
+    stale = list(RequestProfile.objects.order_by('-created_at').values_list('pk', 'profile')[keep:])
+    if not stale:
+        return
+    RequestProfile.objects.filter(pk__in=[pk for pk, _name in stale]).delete()
+    storage = RequestProfile._meta.get_field('profile').storage
+    for _pk, name in stale:
+        if name:
+            storage.delete(name)
+
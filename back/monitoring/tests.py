@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.testing import NoIndexWarmingMixin
+from .metrics import MetricsRegistry
+from .models import RequestProfile
+
+
+class ProfilingTests(NoIndexWarmingMixin, TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.client.force_login(User.objects.create_user('staff', password='password', is_staff=True))
+
+    def test_stored_path_leaves_out_credentials(self):
+        response = self.client.get('/api/municipalities/?token=secret&page=2&access_token=secret',
+                                   HTTP_X_PROFILE='1')
+
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.path, '/api/municipalities/?page=2')
+
+    def test_stored_path_without_query(self):
+        response = self.client.get('/api/municipalities/?token=secret', HTTP_X_PROFILE='1')
+
+        self.assertEqual(RequestProfile.objects.get(pk=response['X-Profile-Id']).path, '/api/municipalities/')
+
+
+class WorkerMetricsFileTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.enterContext(override_settings(METRICS_DIR=str(self.directory)))
+
+    def write_worker(self, name, requests):
+        payload = {'requests': [[['/api/x/', 'GET', '200'], requests]], 'cache': [], 'latency': [], 'queries': []}
+        (self.directory / name).write_text(json.dumps(payload))
+
+    def test_files_of_ended_processes_are_removed(self):
+        ended = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                               capture_output=True, text=True, check=True)
+        ended_pid = int(ended.stdout)
+        live_pid = os.getppid()
+        self.write_worker(f'{ended_pid}-1.json', 100)
+        self.write_worker(f'{live_pid}-1.json', 10)
+        self.write_worker(f'{live_pid}-2.json', 1)
+        self.write_worker(f'{os.getpid()}-1.json', 1000)
+        self.write_worker(f'{live_pid}.json', 10000)
+
+        totals = MetricsRegistry().totals()
+
+        self.assertEqual(totals['requests'][('/api/x/', 'GET', '200')], 1)
+        self.assertEqual([path.name for path in self.directory.iterdir()], [f'{live_pid}-2.json'])
+
+    def test_flush_names_the_file_after_the_process_and_its_start(self):
+        registry = MetricsRegistry()
+        registry.observe_request('/api/x/', 'GET', 200, 0.01, 1)
+        registry.flush()
+
+        self.assertEqual([path.name for path in self.directory.iterdir()], [registry._file_name()])
+        self.assertRegex(registry._file_name(), rf'^{os.getpid()}-\d+\.json$')
+        self.assertEqual(registry.totals()['requests'][('/api/x/', 'GET', '200')], 1)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.views import View
+
+from listings.models import SavedSearchNotification
+from sync.events import hub
+from . import metrics
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def queue_depths():
+    return {
+        'saved_search_notifications': SavedSearchNotification.objects.filter(is_sent=False).count(),
+        # Event hub queues live in this process only
+        'event_stream': hub.queued_events(),
+    }
+
+
+class MetricsView(View):
+    """
+    Prometheus scrape endpoint. Scrapers must send METRICS_TOKEN as a
+    bearer token; without a token the endpoint is only served with DEBUG on.
+    """
+    http_method_names = ['get']
+
+    def get(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if not token and not settings.DEBUG:
+            return HttpResponse("Set METRICS_TOKEN to enable /metrics.", status=403, content_type='text/plain')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponse(status=401)
+        body = metrics.render(metrics.registry.totals(), queue_depths())
+        return HttpResponse(body, content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,201 @@
+"""
+In-process broadcast hub for listing, tour and sale change events.
+
+One polling task per process reads Property, Tour and Sale changes (and
+their tombstones) from the database with the same (change_seq, id) keyset
+scan as the change feed, and fans each event out to the subscribers whose
+filters accept it. Sale events only go to the users who could list the
+sale (Sale.objects.visible_to(): the sold property's owner and agent) and
+to staff, as in the change feed. Every subscriber has a bounded queue; a subscriber that falls behind has
+its backlog replaced by a single "resync" event, telling the client to
+catch up through /api/sync/ instead of holding memory for it.
+"""
+import asyncio
+import contextvars
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+
+from deals.models import Sale
+from listings.models import Property
+from tours.models import Tour
+from .models import Tombstone
+
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+POLL_BATCH_SIZE = 500
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Event type -> (model, fields included in the event, audience). The audience
+# annotates each row with the ids of the only users who may see it (besides
+# staff), under the names Tombstone records them by; None means any user.
+SOURCES = {
+    'property': (Property, ('id', 'status', 'price', 'updated_at'), None),
+    'tour': (Tour, ('id', 'property_id', 'status', 'start_time', 'end_time', 'updated_at'), None),
+    'sale': (Sale, ('id', 'property_id', 'approval_status', 'final_price', 'date_sold', 'updated_at'), {
+        'owner_id': Coalesce('property__owner', 'archived_property__owner'),
+        'agent_id': Coalesce('property__agent', 'archived_property__agent'),
+    }),
+}
+
+# The event field ?status= is matched against, per event type
+STATUS_FIELDS = {'property': 'status', 'tour': 'status', 'sale': 'approval_status'}
+
+RESYNC_EVENT = {'type': 'resync'}
+
+
+class Subscription:
+
+    def __init__(self, user, types=None, property_ids=None, statuses=None, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.user_id = user.pk
+        self.is_staff = user.is_staff
+        self.types = set(types) if types else None
+        self.property_ids = set(property_ids) if property_ids else None
+        self.statuses = set(statuses) if statuses else None
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, event, viewers=None):
+        if self.types is not None and event['type'] not in self.types:
+            return False
+        if viewers is not None and not self.is_staff and self.user_id not in viewers:
+            return False
+        if self.property_ids is not None:
+            property_id = event['id'] if event['type'] == 'property' else event.get('property_id')
+            if property_id not in self.property_ids:
+                return False
+        if (self.statuses is not None and event['action'] == 'changed'
+                and event.get(STATUS_FIELDS[event['type']]) not in self.statuses):
+            return False
+        return True
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+
+class _SourceCursor:
+
+    def __init__(self, model, audience=None):
+        self.model = model
+        self.audience = audience
+        self.label = model._meta.label_lower
+        self.change_seq = 0
+        self.last_id = 0
+        self.tombstone_seq = 0
+        self.tombstone_id = 0
+
+    def _tombstones(self):
+        return Tombstone.objects.filter(model_label=self.label)
+
+    def start_at_head(self):
+        latest = self.model.objects.order_by('-change_seq', '-id').values_list('change_seq', 'id').first()
+        if latest:
+            self.change_seq, self.last_id = latest
+        latest = self._tombstones().order_by('-change_seq', '-id').values_list('change_seq', 'id').first()
+        if latest:
+            self.tombstone_seq, self.tombstone_id = latest
+
+    def _viewers(self, row):
+        """Ids of the users who may see the row, or None when any user may."""
+        if self.audience is None:
+            return None
+        return {row[name] for name in self.audience} - {None}
+
+    def read_changes(self, fields):
+        """Return ([(event fields, viewers)], [(deleted id, viewers)]) since the last read."""
+        audience = self.audience or {}
+        changed = list(
+            self.model.objects.filter(
+                Q(change_seq__gt=self.change_seq) | Q(change_seq=self.change_seq, id__gt=self.last_id)
+            ).annotate(**audience).order_by('change_seq', 'id')
+            .values('change_seq', *fields, *audience)[:POLL_BATCH_SIZE]
+        )
+        if changed:
+            self.change_seq, self.last_id = changed[-1]['change_seq'], changed[-1]['id']
+
+        deleted = list(
+            self._tombstones().filter(
+                Q(change_seq__gt=self.tombstone_seq) | Q(change_seq=self.tombstone_seq, id__gt=self.tombstone_id)
+            ).order_by('change_seq', 'id').values('change_seq', 'id', 'object_id', *audience)[:POLL_BATCH_SIZE]
+        )
+        if deleted:
+            self.tombstone_seq, self.tombstone_id = deleted[-1]['change_seq'], deleted[-1]['id']
+        return (
+            [({field: row[field] for field in fields}, self._viewers(row)) for row in changed],
+            [(row['object_id'], self._viewers(row)) for row in deleted],
+        )
+
+
+class EventHub:
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscribers = set()
+        self._cursors = {}
+        self._task = None
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def queued_events(self):
+        return sum(subscription.queue.qsize() for subscription in self._subscribers)
+
+    def subscribe(self, user, **filters):
+        """Register a subscriber for ``user``; must be called from the event loop serving it."""
+        subscription = Subscription(user, **filters)
+        self._subscribers.add(subscription)
+        if self._task is None or self._task.done():
+            # A fresh context: the task must not inherit this request's RequestMetrics
+            self._task = asyncio.get_running_loop().create_task(self._poll(), context=contextvars.Context())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, event, viewers=None):
+        """Offer ``event`` to the subscribers that want it; only staff and ``viewers`` when given."""
+        for subscription in tuple(self._subscribers):
+            if subscription.wants(event, viewers):
+                subscription.offer(event)
+
+    def _read_all(self):
+        return {
+            event_type: self._cursors[event_type].read_changes(fields)
+            for event_type, (_model, fields, _audience) in SOURCES.items()
+        }
+
+    def _start_at_head(self):
+        self._cursors = {
+            event_type: _SourceCursor(model, audience) for event_type, (model, _fields, audience) in SOURCES.items()
+        }
+        for cursor in self._cursors.values():
+            cursor.start_at_head()
+
+    async def _poll(self):
+        # Stops once the last subscriber leaves; the next subscriber starts
+        # a fresh poller from the current head instead of replaying the gap.
+        await sync_to_async(self._start_at_head)()
+        while self._subscribers:
+            try:
+                batches = await sync_to_async(self._read_all)()
+            except Exception:
+                logger.exception("Event hub failed to read changes")
+                batches = {}
+            for event_type, (changed, deleted) in batches.items():
+                for row, viewers in changed:
+                    self.publish({'type': event_type, 'action': 'changed', **row}, viewers)
+                for object_id, viewers in deleted:
+                    self.publish({'type': event_type, 'action': 'deleted', 'id': object_id}, viewers)
+            await asyncio.sleep(self.poll_interval)
+
+
+hub = EventHub()
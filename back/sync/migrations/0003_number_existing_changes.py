@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+CHUNK_SIZE = 1000
+
+# Existing rows in feed order before change sequences: (updated_at, id) for rows, id for tombstones
+ORDERED_MODELS = [
+    ('listings', 'Property', ('updated_at', 'id')),
+    ('listings', 'Amenity', ('updated_at', 'id')),
+    ('listings', 'PropertyImage', ('updated_at', 'id')),
+    ('tours', 'Tour', ('updated_at', 'id')),
+    ('deals', 'Sale', ('updated_at', 'id')),
+    ('sync', 'Tombstone', ('id',)),
+]
+
+
+def number_existing_changes(apps, schema_editor):
+    change_seq = 0
+    for app_label, model_name, ordering in ORDERED_MODELS:
+        model = apps.get_model(app_label, model_name)
+        rows = []
+        for pk in model.objects.order_by(*ordering).values_list('pk', flat=True).iterator():
+            change_seq += 1
+            rows.append(model(pk=pk, change_seq=change_seq))
+            if len(rows) == CHUNK_SIZE:
+                model.objects.bulk_update(rows, ['change_seq'])
+                rows = []
+        model.objects.bulk_update(rows, ['change_seq'])
+    apps.get_model('sync', 'ChangeCounter').objects.create(pk=1, value=change_seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_changecounter_remove_tombstone_tombstone_model_idx_and_more'),
+        ('listings', '0014_amenity_change_seq_property_change_seq_and_more'),
+        ('tours', '0007_tour_change_seq_tour_tour_change_idx'),
+        ('deals', '0012_sale_change_seq_sale_sale_change_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+    ]
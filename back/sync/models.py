@@ -0,0 +1,100 @@
+from django.db import DEFAULT_DB_ALIAS, models, router, transaction
+from django.db.models import F
+
+
+class ChangeCounter(models.Model):
+    """The single row handing out change-feed positions (see next_change_seq)."""
+    value = models.BigIntegerField(default=0)
+
+
+def next_change_seq(using=DEFAULT_DB_ALIAS):
+    """
+    Take the next change-feed position. Call it in the transaction that
+    writes the changed rows: the counter row stays locked until that
+    transaction ends, so positions commit in the order they are handed out,
+    which updated_at (set before the write) doesn't guarantee.
+    """
+    counter = ChangeCounter.objects.using(using)
+    if not counter.filter(pk=1).update(value=F('value') + 1):
+        counter.create(pk=1, value=1)
+    return counter.values_list('value', flat=True).get(pk=1)
+
+
+class ChangeTrackedQuerySet(models.QuerySet):
+    """Gives rows written in bulk with a new updated_at a new change_seq too."""
+
+    def update(self, **kwargs):
+        if 'updated_at' not in kwargs or 'change_seq' in kwargs:
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            return super().update(change_seq=next_change_seq(self.db), **kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if 'updated_at' not in fields:
+            return super().bulk_update(objs, fields, batch_size)
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            change_seq = next_change_seq(self.db)
+            for obj in objs:
+                obj.change_seq = change_seq
+            return super().bulk_update(objs, [*fields, 'change_seq'], batch_size)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        if not objs:
+            return objs
+        with transaction.atomic(using=self.db, savepoint=False):
+            change_seq = next_change_seq(self.db)
+            for obj in objs:
+                obj.change_seq = change_seq
+            return super().bulk_create(objs, *args, **kwargs)
+
+
+class ChangeTracked(models.Model):
+    """
+    A row served by the change feed and the event stream, which read rows
+    in (change_seq, id) order. Every save, and every bulk write through
+    ChangeTrackedQuerySet that sets updated_at, takes a new change_seq.
+    """
+    change_seq = models.BigIntegerField(default=0, db_default=0, editable=False)
+
+    objects = ChangeTrackedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'updated_at' not in update_fields:
+            return super().save(*args, **kwargs)
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'change_seq'}
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            self.change_seq = next_change_seq(using)
+            super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted row, so change-feed clients can drop it locally.
+    Tombstones are read in (change_seq, id) order, like the live rows.
+
+    Sale tombstones keep the owner and agent of the sold property, so
+    they are only listed to the users who could see the sale.
+    """
+    model_label = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    change_seq = models.BigIntegerField(default=0, db_default=0, editable=False)
+    # User ids rather than foreign keys: tombstones outlive the users
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    agent_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model_label', 'change_seq', 'id'], name='tombstone_model_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label} {self.object_id} deleted at {self.deleted_at}"
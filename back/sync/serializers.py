@@ -0,0 +1,42 @@
+from rest_framework import serializers
+
+from core.serializers import CompiledListSerializer
+from deals.models import Sale
+from listings.models import Amenity, Property, PropertyImage
+from tours.models import Tour
+
+
+class PropertySyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Property
+        list_serializer_class = CompiledListSerializer
+        # Card fields are derived from the synced images, amenities and tours
+        exclude = ['property_tours', *Property.COUNTER_FIELDS]
+
+
+class AmenitySyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Amenity
+        list_serializer_class = CompiledListSerializer
+        fields = '__all__'
+
+
+class PropertyImageSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PropertyImage
+        list_serializer_class = CompiledListSerializer
+        fields = '__all__'
+
+
+class TourSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tour
+        list_serializer_class = CompiledListSerializer
+        fields = '__all__'
+
+
+class SaleSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Sale
+        list_serializer_class = CompiledListSerializer
+        fields = '__all__'
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete
+
+from deals.models import Sale
+from listings.models import Amenity, ArchivedProperty, Property, PropertyImage
+from tours.models import Tour
+from .models import Tombstone, next_change_seq
+
+
+SYNCED_MODELS = (Property, Amenity, PropertyImage, Tour, Sale)
+
+
+def sale_visibility(sale, using):
+    """(owner id, agent id) of the sold property, which Sale.objects.visible_to() goes by."""
+    if sale.property_id is not None:
+        sold = Property.objects.using(using).filter(pk=sale.property_id)
+    else:
+        sold = ArchivedProperty.objects.using(using).filter(pk=sale.archived_property_id)
+    return sold.values_list('owner_id', 'agent_id').first() or (None, None)
+
+
+def record_tombstone(sender, instance, using, **kwargs):
+    # Sent inside the delete's transaction, so the change_seq commits with it
+    owner_id = agent_id = None
+    if sender is Sale:
+        owner_id, agent_id = sale_visibility(instance, using)
+    Tombstone.objects.using(using).create(
+        model_label=sender._meta.label_lower, object_id=instance.pk, change_seq=next_change_seq(using),
+        owner_id=owner_id, agent_id=agent_id,
+    )
+
+
+for model in SYNCED_MODELS:
+    post_delete.connect(record_tombstone, sender=model, dispatch_uid=f'sync-tombstone-{model._meta.label_lower}')
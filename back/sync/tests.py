@@ -0,0 +1,113 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from core.testing import NoIndexWarmingMixin
+from deals.models import Sale
+from listings.models import Amenity, Municipality, Property
+from .events import Subscription
+
+
+class ChangeFeedTests(NoIndexWarmingMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.stranger = User.objects.create_user('stranger', password='password')
+        cls.staff = User.objects.create_user('staff', password='password', is_staff=True)
+        municipality = Municipality.objects.create(municipality_name='Oslo', price_per_sqm=1000)
+        cls.property = Property.objects.create(
+            property_name='Flat', property_address='Street 1', property_municipality=municipality,
+            property_size=50, type='SALE', owner=cls.owner,
+        )
+
+    def feed(self, user, resource, cursor=None, limit=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        params = {key: value for key, value in (('updated_since', cursor), ('limit', limit)) if value}
+        response = client.get(f'/api/sync/{resource}/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def read_all(self, user, resource, cursor=None, limit=None):
+        """Follow the feed to its end; return the ids returned, the ids deleted and the last cursor."""
+        returned, deleted = [], []
+        while True:
+            page = self.feed(user, resource, cursor, limit)
+            returned.extend(row['id'] for row in page['results'])
+            deleted.extend(page['deleted'])
+            cursor = page['cursor']
+            if not page['has_more']:
+                return returned, deleted, cursor
+
+    def test_pages_through_rows_sharing_a_change_seq(self):
+        amenities = Amenity.objects.bulk_create(
+            Amenity(property=self.property, name=f'Amenity {number}') for number in range(5)
+        )
+        self.assertEqual(len({amenity.change_seq for amenity in amenities}), 1)
+
+        returned, deleted, _cursor = self.read_all(self.owner, 'amenities', limit=2)
+
+        self.assertEqual(returned, sorted(amenity.pk for amenity in amenities))
+        self.assertEqual(deleted, [])
+
+    def test_cursor_resumes_after_the_last_change(self):
+        first = Amenity.objects.create(property=self.property, name='Pool')
+        _returned, _deleted, cursor = self.read_all(self.owner, 'amenities')
+
+        second = Amenity.objects.create(property=self.property, name='Sauna')
+        first.name = 'Heated pool'
+        first.save()
+
+        returned, _deleted, _cursor = self.read_all(self.owner, 'amenities', cursor)
+        self.assertEqual(returned, [second.pk, first.pk])
+
+    def test_deletes_are_returned_from_tombstones(self):
+        amenity = Amenity.objects.create(property=self.property, name='Pool')
+        _returned, _deleted, cursor = self.read_all(self.owner, 'amenities')
+        amenity_id = amenity.pk
+
+        amenity.delete()
+
+        returned, deleted, cursor = self.read_all(self.owner, 'amenities', cursor)
+        self.assertEqual((returned, deleted), ([], [amenity_id]))
+        self.assertEqual(self.read_all(self.owner, 'amenities', cursor)[:2], ([], []))
+
+    def test_sale_tombstones_only_reach_the_owner_agent_and_staff(self):
+        sale = Sale.objects.create(property=self.property, date_sold=date(2024, 1, 1), final_price=100000)
+        sale_id = sale.pk
+
+        sale.delete()
+
+        self.assertEqual(self.read_all(self.owner, 'sales')[1], [sale_id])
+        self.assertEqual(self.read_all(self.staff, 'sales')[1], [sale_id])
+        self.assertEqual(self.read_all(self.stranger, 'sales')[:2], ([], []))
+
+
+class SubscriptionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.user = User(pk=1)
+
+    def test_status_filter_matches_sale_approval_status(self):
+        subscription = Subscription(self.user, statuses=['APPROVED'])
+        event = {'type': 'sale', 'action': 'changed', 'id': 5, 'property_id': 2}
+
+        self.assertTrue(subscription.wants({**event, 'approval_status': 'APPROVED'}, viewers={1}))
+        self.assertFalse(subscription.wants({**event, 'approval_status': 'REJECTED'}, viewers={1}))
+
+    def test_status_filter_matches_listing_status(self):
+        subscription = Subscription(self.user, statuses=['SOLD'])
+
+        self.assertTrue(subscription.wants({'type': 'property', 'action': 'changed', 'id': 2, 'status': 'SOLD'}))
+        self.assertFalse(subscription.wants({'type': 'property', 'action': 'changed', 'id': 2, 'status': 'ACTIVE'}))
+        # Deletions carry no status and always pass
+        self.assertTrue(subscription.wants({'type': 'property', 'action': 'deleted', 'id': 2}))
+
+    def test_sale_events_only_reach_viewers_and_staff(self):
+        event = {'type': 'sale', 'action': 'changed', 'id': 5, 'property_id': 2, 'approval_status': 'APPROVED'}
+
+        self.assertFalse(Subscription(self.user).wants(event, viewers={2, 3}))
+        self.assertTrue(Subscription(User(pk=4, is_staff=True)).wants(event, viewers={2, 3}))
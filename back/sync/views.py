@@ -0,0 +1,235 @@
+import asyncio
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Min, Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views import View
+from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from core.async_views import authenticate_jwt
+from deals.models import Sale
+from .events import SOURCES, hub
+from .models import Tombstone
+from .serializers import (
+    AmenitySyncSerializer,
+    PropertyImageSyncSerializer,
+    PropertySyncSerializer,
+    SaleSyncSerializer,
+    TourSyncSerializer,
+)
+
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+
+def _position_at(queryset, timestamp_field, timestamp):
+    """The (change_seq, id) position after which every row of ``queryset`` changed since ``timestamp`` lies."""
+    first = queryset.filter(**{f'{timestamp_field}__gte': timestamp}).aggregate(first=Min('change_seq'))['first']
+    if first is not None:
+        return first, 0
+    return queryset.order_by('-change_seq', '-id').values_list('change_seq', 'id').first() or (0, 0)
+
+
+def _after(queryset, change_seq, last_id):
+    return queryset.filter(Q(change_seq__gt=change_seq) | Q(change_seq=change_seq, id__gt=last_id))
+
+
+class FeedCursor:
+    """
+    Position in a change feed: the (change_seq, id) of the last changed row
+    returned and of the last tombstone returned.
+    """
+
+    def __init__(self, change_seq=0, last_id=0, tombstone_seq=0, tombstone_id=0):
+        self.change_seq = change_seq
+        self.last_id = last_id
+        self.tombstone_seq = tombstone_seq
+        self.tombstone_id = tombstone_id
+
+    def encode(self):
+        raw = f'{self.change_seq}|{self.last_id}|{self.tombstone_seq}|{self.tombstone_id}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @classmethod
+    def decode(cls, value, model):
+        try:
+            raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+            parts = raw.split('|')
+            if len(parts) == 3:
+                # An (updated_at, id, tombstone id) cursor from before change sequences
+                return cls.from_timestamp(parts[0], model) if parts[0] else cls()
+            change_seq, last_id, tombstone_seq, tombstone_id = (int(part) for part in parts)
+            return cls(change_seq, last_id, tombstone_seq, tombstone_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+
+    @classmethod
+    def from_timestamp(cls, value, model):
+        """
+        Start a feed at a client-supplied ISO 8601 timestamp. Rows changed
+        around that time may be returned again, never skipped.
+        """
+        try:
+            timestamp = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+        tombstones = Tombstone.objects.filter(model_label=model._meta.label_lower)
+        return cls(
+            *_position_at(model.objects.all(), 'updated_at', timestamp),
+            *_position_at(tombstones, 'deleted_at', timestamp),
+        )
+
+
+class ChangeFeedView(generics.GenericAPIView):
+    """
+    Rows created, updated or deleted since ?updated_since=, which takes an
+    ISO 8601 timestamp or the cursor returned by the previous page. Without
+    it the feed starts from the beginning.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    resources = {
+        'properties': PropertySyncSerializer,
+        'amenities': AmenitySyncSerializer,
+        'images': PropertyImageSyncSerializer,
+        'tours': TourSyncSerializer,
+        'sales': SaleSyncSerializer,
+    }
+
+    def get_serializer_class(self):
+        try:
+            return self.resources[self.kwargs['resource']]
+        except KeyError:
+            raise Http404
+
+    def get_queryset(self):
+        model = self.get_serializer_class().Meta.model
+        queryset = model.objects.all()
+        if self.kwargs['resource'] == 'sales' and not self.request.user.is_staff:
+            queryset = queryset.visible_to(self.request.user)
+        return queryset
+
+    def get_cursor(self, model):
+        value = self.request.query_params.get('updated_since')
+        if not value:
+            return FeedCursor()
+        cursor = FeedCursor.decode(value, model) or FeedCursor.from_timestamp(value, model)
+        if cursor is None:
+            raise ValidationError({'updated_since': 'Expected an ISO 8601 timestamp or a feed cursor.'})
+        return cursor
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.query_params.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+        return max(1, min(page_size, MAX_PAGE_SIZE))
+
+    def get_tombstones(self, model):
+        tombstones = Tombstone.objects.filter(model_label=model._meta.label_lower)
+        if model is Sale and not self.request.user.is_staff:
+            user_id = self.request.user.pk
+            tombstones = tombstones.filter(Q(owner_id=user_id) | Q(agent_id=user_id))
+        return tombstones
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        model = queryset.model
+        cursor = self.get_cursor(model)
+        page_size = self.get_page_size()
+
+        changed = list(
+            _after(queryset, cursor.change_seq, cursor.last_id).order_by('change_seq', 'id')[:page_size + 1]
+        )
+        tombstones = list(
+            _after(self.get_tombstones(model), cursor.tombstone_seq, cursor.tombstone_id)
+            .order_by('change_seq', 'id')
+            .values_list('change_seq', 'id', 'object_id')[:page_size + 1]
+        )
+        has_more = len(changed) > page_size or len(tombstones) > page_size
+        changed = changed[:page_size]
+        tombstones = tombstones[:page_size]
+
+        next_cursor = FeedCursor(cursor.change_seq, cursor.last_id, cursor.tombstone_seq, cursor.tombstone_id)
+        if changed:
+            next_cursor.change_seq, next_cursor.last_id = changed[-1].change_seq, changed[-1].id
+        if tombstones:
+            next_cursor.tombstone_seq, next_cursor.tombstone_id = tombstones[-1][:2]
+
+        return Response({
+            'results': self.get_serializer(changed, many=True).data,
+            'deleted': [object_id for _change_seq, _tombstone_id, object_id in tombstones],
+            'cursor': next_cursor.encode(),
+            'has_more': has_more,
+        })
+
+
+class EventStreamView(View):
+    """
+    Server-Sent Events stream of property, tour and sale changes; sale
+    events only reach staff and the users the sale is visible to. Filters:
+    ?types=property,tour,sale&property=<id>,<id>&status=SOLD,UNDER_REVIEW
+    (status matches a sale's approval_status).
+    EventSource cannot send headers, so the access token may also be
+    passed as ?token=. Needs an ASGI server (core.asgi).
+    """
+    heartbeat_interval = 15
+
+    def parse_filters(self, request):
+        def listed(name):
+            value = request.GET.get(name)
+            return [item for item in value.split(',') if item] if value else None
+
+        property_ids = listed('property')
+        try:
+            property_ids = [int(pk) for pk in property_ids] if property_ids else None
+        except ValueError:
+            raise ValueError("property must be a comma-separated list of ids.")
+        types = listed('types')
+        if types and not set(types) <= set(SOURCES):
+            raise ValueError(f"types must be drawn from: {', '.join(SOURCES)}.")
+        return {'types': types, 'property_ids': property_ids, 'statuses': listed('status')}
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'detail': 'The event stream is only served by the ASGI application.'}, status=501)
+
+        user = await authenticate_jwt(request, allow_query_token=True)
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+        try:
+            filters = self.parse_filters(request)
+        except ValueError as exc:
+            return JsonResponse({'detail': str(exc)}, status=400)
+
+        subscription = hub.subscribe(user, **filters)
+        response = StreamingHttpResponse(self.stream(subscription), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, subscription):
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import Tour
+from .models import ArchivedTour, Tour
 # Register your models here.
 admin.site.register(Tour)
+admin.site.register(ArchivedTour)
@@ -0,0 +1,94 @@
+"""
+Scheduled tour status transitions.
+
+Nothing marks a tour as done when it ends, so Scheduled tours pile up in
+agent calendars and overlap checks. complete_past_tours() moves tours that
+ended more than a grace period ago to Completed, and
+prune_cancelled_tours() deletes cancelled tours past a retention window.
+Both work in batches of ids read from the head of the
+(status, end_time) index, one transaction per batch; rows leave the
+selection as they are handled, so every batch reads from the start.
+
+Completion is a single UPDATE per batch that also sets updated_at, so the
+change feed and event stream (sync) pick the tours up. The affected
+properties' card counters are refreshed once per batch, which also
+invalidates the cached listing responses.
+
+Run `manage.py expire_tours`, with --interval to keep it running.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from listings.counters import refresh_counters, refreshed_by_caller
+from .models import Tour
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def complete_after_minutes():
+    return getattr(settings, 'TOUR_COMPLETE_AFTER_MINUTES', 30)
+
+
+def cancelled_retention_days():
+    return getattr(settings, 'CANCELLED_TOUR_RETENTION_DAYS', 90)
+
+
+def completable(grace_minutes=None, now=None):
+    """Scheduled tours that ended more than ``grace_minutes`` ago."""
+    if grace_minutes is None:
+        grace_minutes = complete_after_minutes()
+    cutoff = (now or timezone.now()) - timedelta(minutes=grace_minutes)
+    return Tour.objects.filter(status='Scheduled', end_time__lt=cutoff)
+
+
+def prunable(retention_days=None, now=None):
+    """Cancelled tours that ended more than ``retention_days`` ago."""
+    if retention_days is None:
+        retention_days = cancelled_retention_days()
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    return Tour.objects.filter(status='Cancelled', end_time__lt=cutoff)
+
+
+def _batches(queryset, batch_size, limit):
+    """Yield (tour ids, property ids) batches from the head of ``queryset``."""
+    handled = 0
+    while limit is None or handled < limit:
+        size = batch_size if limit is None else min(batch_size, limit - handled)
+        rows = list(queryset.order_by('end_time', 'id').values_list('pk', 'property_id')[:size])
+        if not rows:
+            return
+        handled += len(rows)
+        yield [pk for pk, _ in rows], {property_id for _, property_id in rows}
+
+
+def complete_past_tours(grace_minutes=None, batch_size=DEFAULT_BATCH_SIZE, limit=None, log=None):
+    """Mark ended Scheduled tours Completed; return the number of tours updated."""
+    now = timezone.now()
+    queryset = completable(grace_minutes, now)
+    completed = 0
+    for tour_ids, property_ids in _batches(queryset, batch_size, limit):
+        with transaction.atomic():
+            # Re-checked in the UPDATE: a tour may have been cancelled or moved since it was read
+            completed += queryset.filter(pk__in=tour_ids).update(status='Completed', updated_at=now)
+            refresh_counters(property_ids, now)
+        if log:
+            log(f"Completed {completed} tours")
+    return completed
+
+
+def prune_cancelled_tours(retention_days=None, batch_size=DEFAULT_BATCH_SIZE, limit=None, log=None):
+    """Delete cancelled tours past the retention window; return the number of tours deleted."""
+    queryset = prunable(retention_days)
+    pruned = 0
+    for tour_ids, property_ids in _batches(queryset, batch_size, limit):
+        with transaction.atomic(), refreshed_by_caller():
+            # delete() still records the sync tombstones; counters are refreshed once for the batch
+            pruned += queryset.filter(pk__in=tour_ids).delete()[1].get(Tour._meta.label, 0)
+            refresh_counters(property_ids)
+        if log:
+            log(f"Pruned {pruned} cancelled tours")
+    return pruned
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tours import lifecycle
+
+
+class Command(BaseCommand):
+    help = "Mark ended tours Completed and delete old cancelled tours."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=None,
+                            help="Complete Scheduled tours that ended more than this many minutes ago "
+                                 "(default: settings.TOUR_COMPLETE_AFTER_MINUTES).")
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help="Delete Cancelled tours that ended more than this many days ago "
+                                 "(default: settings.CANCELLED_TOUR_RETENTION_DAYS).")
+        parser.add_argument('--batch-size', type=int, default=lifecycle.DEFAULT_BATCH_SIZE,
+                            help="Tours updated or deleted per transaction.")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Stop each step after this many tours.")
+        parser.add_argument('--interval', type=float, default=None,
+                            help="Keep running, repeating every this many seconds.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many tours would be completed and pruned.")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            completable = lifecycle.completable(options['grace_minutes']).count()
+            prunable = lifecycle.prunable(options['retention_days']).count()
+            self.stdout.write(f"{completable} tours would be completed and {prunable} cancelled tours pruned.")
+            return
+
+        while True:
+            self.run_once(options)
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def run_once(self, options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        started = time.perf_counter()
+        completed = lifecycle.complete_past_tours(
+            grace_minutes=options['grace_minutes'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            log=log,
+        )
+        pruned = lifecycle.prune_cancelled_tours(
+            retention_days=options['retention_days'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            log=log,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Completed {completed} tours and pruned {pruned} cancelled tours in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0010_amenity_updated_at_propertyimage_updated_at_and_more'),
+        ('tours', '0002_tour_agent_tour_buyer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['updated_at', 'id'], name='tour_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_property_property_owner_status_idx_and_more'),
+        ('tours', '0004_archivedtour'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['agent', 'start_time'], name='tour_agent_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['buyer', 'start_time'], name='tour_buyer_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['property', 'start_time'], name='tour_property_start_idx'),
+        ),
+    ]
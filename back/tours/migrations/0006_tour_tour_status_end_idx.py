@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_property_property_owner_status_idx_and_more'),
+        ('tours', '0005_tour_tour_agent_start_idx_tour_tour_buyer_start_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['status', 'end_time'], name='tour_status_end_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_amenity_change_seq_property_change_seq_and_more'),
+        ('tours', '0006_tour_tour_status_end_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tour',
+            name='change_seq',
+            field=models.BigIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['change_seq', 'id'], name='tour_change_idx'),
+        ),
+    ]
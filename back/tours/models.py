@@ -1,10 +1,11 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
+from sync.models import ChangeTracked
 
 
 # Create your models here.
-class Tour(models.Model):
+class Tour(ChangeTracked):
     property = models.ForeignKey('listings.Property', on_delete=models.CASCADE, related_name='tours')
     agent = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='tours_as_agent')
     buyer = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='tours_as_buyer')
@@ -20,6 +21,17 @@ class Tour(models.Model):
     ]
     status = models.CharField(max_length=10, choices=TOUR_STATUS_CHOICES, default="Scheduled")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='tour_updated_idx'),
+            models.Index(fields=['change_seq', 'id'], name='tour_change_idx'),
+            # Upcoming tours on dashboards (deals.dashboard)
+            models.Index(fields=['agent', 'start_time'], name='tour_agent_start_idx'),
+            models.Index(fields=['buyer', 'start_time'], name='tour_buyer_start_idx'),
+            models.Index(fields=['property', 'start_time'], name='tour_property_start_idx'),
+            # Status transitions and pruning (tours.lifecycle)
+            models.Index(fields=['status', 'end_time'], name='tour_status_end_idx'),
+        ]
 
 
     def clean(self):
@@ -58,3 +70,19 @@ class Tour(models.Model):
         start_time_formatted = self.start_time.strftime("%B %d, %Y at %I:%M %p")
         end_time_formatted = self.end_time.strftime("%I:%M %p")
         return f"Tour of {self.property.property_name}{agent_info}{buyer_info} on {start_time_formatted} - {end_time_formatted}"
+
+
+class ArchivedTour(models.Model):
+    """A tour of an archived property (listings.archive); keeps its live id."""
+    id = models.BigIntegerField(primary_key=True)
+    property = models.ForeignKey('listings.ArchivedProperty', on_delete=models.CASCADE, related_name='tours')
+    agent = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_tours_as_agent')
+    buyer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_tours_as_buyer')
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=Tour.TOUR_STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Tour of {self.property.property_name} on {self.start_time:%B %d, %Y} (archived)"
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.serializers import CompiledListSerializer
 from .models import Tour
 from django.utils import timezone
 
@@ -10,6 +11,7 @@ class TourSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Tour
+        list_serializer_class = CompiledListSerializer
         fields = '__all__'
 
 
@@ -1,3 +1,63 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from listings.models import Municipality, Property
+from .lifecycle import complete_past_tours, prune_cancelled_tours
+from .models import Tour
+
+
+class TourLifecycleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user('agent', password='password')
+        municipality = Municipality.objects.create(municipality_name='Oslo', price_per_sqm=1000)
+        cls.property = Property.objects.create(
+            property_name='Flat', property_address='Street 1', property_municipality=municipality,
+            property_size=50, type='SALE', agent=cls.agent,
+        )
+
+    def create_tours(self, count, status, ended_ago):
+        end_time = timezone.now() - ended_ago
+        return [
+            Tour.objects.create(property=self.property, agent=self.agent, status=status,
+                                start_time=end_time - timedelta(hours=1), end_time=end_time)
+            for _ in range(count)
+        ]
+
+    def test_complete_past_tours_counts_every_batch(self):
+        past = self.create_tours(5, 'Scheduled', timedelta(hours=2))
+        recent = self.create_tours(1, 'Scheduled', timedelta(minutes=5))
+        upcoming = self.create_tours(1, 'Scheduled', -timedelta(days=1))
+
+        self.assertEqual(complete_past_tours(grace_minutes=30, batch_size=2), 5)
+
+        self.assertEqual(Tour.objects.filter(pk__in=[tour.pk for tour in past], status='Completed').count(), 5)
+        self.assertEqual(Tour.objects.filter(pk__in=[recent[0].pk, upcoming[0].pk], status='Scheduled').count(), 2)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.upcoming_tour_count, 1)
+
+    def test_complete_past_tours_stops_at_limit(self):
+        self.create_tours(5, 'Scheduled', timedelta(hours=2))
+
+        self.assertEqual(complete_past_tours(grace_minutes=30, batch_size=2, limit=3), 3)
+        self.assertEqual(Tour.objects.filter(status='Completed').count(), 3)
+        self.assertEqual(complete_past_tours(grace_minutes=30, batch_size=2), 2)
+
+    def test_prune_cancelled_tours_counts_every_batch(self):
+        self.create_tours(3, 'Cancelled', timedelta(days=100))
+        kept = self.create_tours(1, 'Cancelled', timedelta(days=10))
+        completed = self.create_tours(1, 'Completed', timedelta(days=100))
+
+        self.assertEqual(prune_cancelled_tours(retention_days=90, batch_size=2), 3)
+
+        self.assertEqual(set(Tour.objects.values_list('pk', flat=True)), {kept[0].pk, completed[0].pk})
+
+    def test_prune_cancelled_tours_stops_at_limit(self):
+        self.create_tours(3, 'Cancelled', timedelta(days=100))
 
-# Create your tests here.
+        self.assertEqual(prune_cancelled_tours(retention_days=90, batch_size=2, limit=1), 1)
+        self.assertEqual(Tour.objects.count(), 2)
@@ -2,6 +2,8 @@ from rest_framework import generics, permissions
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from .models import Tour
 from .serializers import TourSerializer, TourCreateSerializer
+from core.async_views import AsyncReadView
+from listings.cache import municipality_cache
 
 
 class IsOwnerOrAgentOrReadOnly(permissions.BasePermission):
@@ -35,10 +37,11 @@ class TourListCreateView(generics.ListCreateAPIView):
         return TourSerializer
 
     def get_queryset(self):
+        queryset = Tour.objects.select_related('property', 'agent', 'buyer')
         if 'property_id' in self.kwargs:
-            return Tour.objects.filter(property_id=self.kwargs['property_id'])
+            return queryset.filter(property_id=self.kwargs['property_id'])
         else:
-            return Tour.objects.all()
+            return queryset.all()
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -97,3 +100,15 @@ class TourDetailView(generics.RetrieveUpdateDestroyAPIView):
         else:
             permission_classes = [IsOwnerOrAgentOrReadOnly]
         return [permission() for permission in permission_classes]
+
+
+class AsyncTourListView(AsyncReadView):
+
+    async def get(self, request, property_id, *args, **kwargs):
+        # Each tour's property names its municipality
+        await municipality_cache.aensure_current()
+        tours = [
+            tour async for tour in
+            Tour.objects.filter(property_id=property_id).select_related('property', 'agent', 'buyer')
+        ]
+        return self.render(TourSerializer(tours, many=True).data)